@@ -13,13 +13,25 @@ import time
 import hashlib
 import hmac
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, TYPE_CHECKING
 from dataclasses import dataclass, asdict
 from enum import Enum
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+if TYPE_CHECKING:
+    from transfer_matching import ProgramNeed, MatchResult
+
+
+def _transfer_matching():
+    """The local matching engine, imported on first use so the API client does not require NumPy"""
+    if __package__:
+        from . import transfer_matching
+    else:
+        import transfer_matching
+    return transfer_matching
+
 
 # ============================================================================
 # CONFIGURATION
@@ -527,6 +539,43 @@ class NebiusAPIClient:
             }
         )
     
+    def run_transfer_matching_locally(
+        self,
+        athletes: List[Dict[str, Any]],
+        programs: List["ProgramNeed"],
+        top_k: int = 10,
+    ) -> "MatchResult":
+        """Run transfer matching on this machine's CPUs instead of a GPU cluster (needs NumPy)"""
+        engine = _transfer_matching()
+        job = ComputeJob(
+            job_id=f"dhg-job-{self._generate_id()}",
+            name=f"Transfer Match (local): {len(athletes)} athletes",
+            cluster_id="local",
+            job_type="transfer_matching",
+            status=JobStatus.RUNNING,
+            gpu_count=0,
+            submitted_at=datetime.now(),
+            started_at=datetime.now(),
+        )
+        self._jobs[job.job_id] = job
+        
+        try:
+            result = engine.TransferMatchingEngine(top_k=top_k).run(athletes, programs)
+        except Exception:
+            job.status = JobStatus.FAILED
+            job.completed_at = datetime.now()
+            raise
+        
+        job.status = JobStatus.COMPLETED
+        job.completed_at = datetime.now()
+        job.runtime_hours = (job.completed_at - job.started_at).total_seconds() / 3600
+        
+        print(f"✅ Local transfer match: {len(athletes)} athletes x {len(programs)} programs")
+        print(f"   Matches >= {engine.MATCH_THRESHOLD}: {len(result.matches())}")
+        print(f"   Runtime: {sum(result.timings.values()):.2f}s")
+        
+        return result
+    
     def submit_video_processing(self, cluster_id: str, video_count: int) -> ComputeJob:
         """Submit highlight video processing job"""
         return self.submit_job(
@@ -7,36 +7,255 @@ Database connection and operations
 """
 
 import os
+import io
+import csv
+import json
+import math
+import base64
+import binascii
+import asyncio
+import time
+import itertools
+import threading
+import weakref
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from psycopg2.pool import SimpleConnectionPool
-from typing import Optional, Dict, List, Any
-from contextlib import contextmanager
+from psycopg2 import sql as pg2_sql
+from psycopg2.extras import RealDictCursor, NamedTupleCursor
+from psycopg import sql, AsyncCursor, AsyncServerCursor
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg.rows import dict_row, tuple_row, namedtuple_row
+from psycopg.types.numeric import Int4, Int8, Float8
+from psycopg_pool import AsyncConnectionPool, PoolTimeout, TooManyRequests
+from typing import Optional, Dict, List, Any, Tuple, Iterator, AsyncIterator
+from collections import deque
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from contextlib import contextmanager, asynccontextmanager
+from query_metrics import query_metrics, timed_query
 
 # Database configuration
 DATABASE_URL = os.getenv('DATABASE_URL', '')
+ASYNC_POOL_MIN_SIZE = int(os.getenv('DB_ASYNC_POOL_MIN_SIZE', '2'))
+ASYNC_POOL_MAX_SIZE = int(os.getenv('DB_ASYNC_POOL_MAX_SIZE', '20'))
+PREPARED_MAX = int(os.getenv('DB_PREPARED_MAX', '256'))
 
-# Connection pool
-pool: Optional[SimpleConnectionPool] = None
+# Pool sizing and health (shared by the sync and async pools)
+POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '20'))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+POOL_MAX_WAITING = int(os.getenv('DB_POOL_MAX_WAITING', '100'))
+POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))
+POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', '300'))
+POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', '30'))
+
+# Read replica configuration
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL', '')
+READ_YOUR_WRITES_SECONDS = float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', '5'))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', '10'))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', '15'))
+
+# ==================== CONNECTION POOL ====================
+
+class PoolExhausted(Exception):
+    """Raised when no connection frees up within the checkout timeout, or the wait queue is full"""
+
+# Errors meaning "database busy, retry shortly" rather than a failed query
+POOL_UNAVAILABLE_ERRORS = (PoolExhausted, PoolTimeout, TooManyRequests)
+
+class BoundedConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool.
+    
+    Callers that find every connection busy queue for up to `timeout`
+    seconds; at most `max_waiting` may queue at once. Connections are
+    replaced after `max_lifetime`, pinged before reuse when they have sat
+    idle for `ping_after`, and idle ones above `minconn` are closed after
+    `max_idle`.
+    """
+    
+    def __init__(self, dsn: str, minconn: int = POOL_MIN_SIZE, maxconn: int = POOL_MAX_SIZE,
+                 timeout: float = POOL_TIMEOUT, max_waiting: int = POOL_MAX_WAITING,
+                 max_lifetime: float = POOL_MAX_LIFETIME, max_idle: float = POOL_MAX_IDLE,
+                 ping_after: float = POOL_PING_AFTER):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_waiting = max_waiting
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        
+        self._cond = threading.Condition()
+        self._idle: deque = deque()  # (conn, returned_at), most recently returned last
+        self._born: Dict[int, float] = {}
+        self._in_use = 0  # checked out, or being opened for a caller
+        self._waiting = 0
+        self.counters = {"created": 0, "discarded": 0, "timeouts": 0, "rejected": 0, "wait_seconds": 0.0}
+    
+    def warm_up(self):
+        """Open connections until minconn are idle"""
+        while True:
+            with self._cond:
+                if len(self._idle) + self._in_use >= self.minconn:
+                    return
+                self._in_use += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                self._release_slot()
+                raise
+            with self._cond:
+                self._in_use -= 1
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+    
+    def getconn(self):
+        """Check out a connection, waiting up to `timeout` seconds for one to free up"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.maxconn:
+                    conn, returned_at = None, None
+                    self._in_use += 1
+                    break
+                if self._waiting >= self.max_waiting:
+                    self.counters["rejected"] += 1
+                    raise PoolExhausted("Connection pool wait queue is full")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters["timeouts"] += 1
+                    raise PoolExhausted(f"No database connection available within {self.timeout}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self.counters["wait_seconds"] += time.monotonic() - started
+        
+        # Validation and connecting happen outside the lock; the slot is already reserved
+        try:
+            if conn is not None and not self._usable(conn, returned_at):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            self._release_slot()
+            raise
+        return conn
+    
+    def putconn(self, conn, close: bool = False):
+        """Return a connection to the pool"""
+        if not close and not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                close = True
+        
+        if close or conn.closed or self._expired(conn):
+            self._discard(conn)
+            self._release_slot()
+            return
+        
+        now = time.monotonic()
+        stale = []
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, now))
+            # Shrink back towards minconn: oldest idle connections sit at the left
+            while len(self._idle) + self._in_use > self.minconn and now - self._idle[0][1] > self.max_idle:
+                stale.append(self._idle.popleft()[0])
+            self._cond.notify()
+        for old in stale:
+            self._discard(old)
+    
+    def closeall(self):
+        """Close every idle connection"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
+    
+    def gauges(self) -> Dict[str, Any]:
+        """Current pool saturation"""
+        with self._cond:
+            return {
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "size": self._in_use + len(self._idle),
+                "max_size": self.maxconn,
+                **self.counters,
+            }
+    
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self.counters["created"] += 1
+        return conn
+    
+    def _expired(self, conn) -> bool:
+        born = self._born.get(id(conn))
+        return born is not None and time.monotonic() - born > self.max_lifetime
+    
+    def _usable(self, conn, returned_at: float) -> bool:
+        if conn.closed or self._expired(conn):
+            return False
+        if time.monotonic() - returned_at < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def _discard(self, conn):
+        with self._cond:
+            self._born.pop(id(conn), None)
+            self.counters["discarded"] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+    
+    def _release_slot(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+# Connection pools
+pool: Optional[BoundedConnectionPool] = None
+replica_pool: Optional[BoundedConnectionPool] = None
 
 def init_db_pool():
-    """Initialize database connection pool"""
-    global pool
+    """Initialize database connection pool and open its minimum connections"""
+    global pool, replica_pool
     if pool is None:
-        pool = SimpleConnectionPool(
-            minconn=1,
-            maxconn=20,
-            dsn=DATABASE_URL
-        )
+        pool = BoundedConnectionPool(DATABASE_URL)
+        pool.warm_up()
         print("✅ Database connection pool initialized")
+    if replica_pool is None and DATABASE_REPLICA_URL:
+        replica_pool = BoundedConnectionPool(DATABASE_REPLICA_URL)
+        replica_pool.warm_up()
+        print("✅ Replica connection pool initialized")
 
 @contextmanager
-def get_db_connection():
-    """Get database connection from pool"""
+def get_db_connection(read_only: bool = False):
+    """Get database connection from pool, or from the replica pool for read-only work"""
     if pool is None:
         init_db_pool()
     
-    conn = pool.getconn()
+    source = replica_pool if read_only and replica_pool is not None and replica_available() else pool
+    conn = source.getconn()
     try:
         yield conn
         conn.commit()
@@ -44,18 +263,20 @@ def get_db_connection():
         conn.rollback()
         raise e
     finally:
-        pool.putconn(conn)
+        source.putconn(conn)
 
-def execute_query(query: str, params: tuple = None, fetch_one: bool = False, fetch_all: bool = True) -> Any:
+def execute_query(query: str, params: tuple = None, fetch_one: bool = False, fetch_all: bool = True, read_only: bool = False) -> Any:
     """Execute a database query"""
-    with get_db_connection() as conn:
+    with get_db_connection(read_only=read_only) as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            cursor.execute(query, params or ())
+            with timed_query(query, params):
+                cursor.execute(query, params or ())
             
+            # RealDictRow is already a dict; no need to copy every row
             if fetch_one:
-                return dict(cursor.fetchone()) if cursor.rowcount > 0 else None
+                return cursor.fetchone() if cursor.rowcount > 0 else None
             elif fetch_all:
-                return [dict(row) for row in cursor.fetchall()]
+                return cursor.fetchall()
             else:
                 return cursor.rowcount
 
@@ -63,9 +284,566 @@ def execute_many(query: str, params_list: List[tuple]) -> int:
     """Execute multiple queries"""
     with get_db_connection() as conn:
         with conn.cursor() as cursor:
-            cursor.executemany(query, params_list)
+            with timed_query(query):
+                cursor.executemany(query, params_list)
+            return cursor.rowcount
+
+def copy_rows(table: str, columns: List[str], rows: List[tuple]) -> int:
+    """Bulk load rows with COPY in a single round-trip"""
+    buffer = io.StringIO()
+    # Strings are quoted and None is left bare, which COPY CSV reads as NULL
+    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+    buffer.seek(0)
+    
+    statement = pg2_sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+        pg2_sql.Identifier(table),
+        pg2_sql.SQL(', ').join(map(pg2_sql.Identifier, columns))
+    )
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            copy_statement = statement.as_string(conn)
+            with timed_query(copy_statement):
+                cursor.copy_expert(copy_statement, buffer)
+            return cursor.rowcount
+
+# ==================== STREAMING QUERIES ====================
+# Large reads (exports, CRM analytics) go through named server-side cursors:
+# rows stay on the server and arrive batch_size at a time, so memory stays
+# flat no matter how big the result is. row_format picks the row type:
+# 'dict', 'tuple' (smallest) or 'record' (namedtuple).
+
+DEFAULT_STREAM_BATCH_SIZE = int(os.getenv('DB_STREAM_BATCH_SIZE', '2000'))
+_stream_ids = itertools.count(1)
+
+SYNC_ROW_FACTORIES = {
+    'dict': RealDictCursor,
+    'tuple': None,
+    'record': NamedTupleCursor,
+}
+
+def _stream_cursor_name() -> str:
+    return f"athlynx_stream_{os.getpid()}_{next(_stream_ids)}"
+
+def stream_query(query: str, params: tuple = None, batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+                 row_format: str = 'dict', read_only: bool = True) -> Iterator[List[Any]]:
+    """Yield query results in batches from a server-side cursor"""
+    if row_format not in SYNC_ROW_FACTORIES:
+        raise ValueError(f"Unknown row format: {row_format}")
+    
+    with get_db_connection(read_only=read_only) as conn:
+        with conn.cursor(name=_stream_cursor_name(), cursor_factory=SYNC_ROW_FACTORIES[row_format]) as cursor:
+            cursor.itersize = batch_size
+            with timed_query(query, params):
+                cursor.execute(query, params or ())
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+
+# ==================== READ REPLICA ROUTING ====================
+# Reads flagged read_only go to the replica unless the replica is lagging
+# too far behind, or the requesting user wrote within the last
+# READ_YOUR_WRITES_SECONDS (so they always see their own changes). Write
+# times are tracked per worker process.
+
+replica_stats = {
+    "configured": bool(DATABASE_REPLICA_URL),
+    "healthy": True,
+    "lag_seconds": None,
+    "lag_checked_at": None,
+    "replica_reads": 0,
+    "primary_reads": 0,
+}
+
+_recent_writes: Dict[int, float] = {}
+
+def mark_user_write(user_id: int):
+    """Pin a user's reads to the primary for the read-your-writes window"""
+    now = time.monotonic()
+    _recent_writes[user_id] = now
+    if len(_recent_writes) > 10000:
+        cutoff = now - READ_YOUR_WRITES_SECONDS
+        for uid in [uid for uid, at in _recent_writes.items() if at < cutoff]:
+            del _recent_writes[uid]
+
+def wrote_recently(user_id: Optional[int]) -> bool:
+    """Whether the user wrote within the read-your-writes window"""
+    if user_id is None:
+        return False
+    at = _recent_writes.get(user_id)
+    return at is not None and time.monotonic() - at < READ_YOUR_WRITES_SECONDS
+
+def replica_available() -> bool:
+    """Whether the replica is within the allowed lag"""
+    lag = replica_stats["lag_seconds"]
+    return replica_stats["healthy"] and (lag is None or lag <= REPLICA_MAX_LAG_SECONDS)
+
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END AS lag_seconds
+"""
+
+# ==================== ASYNC OPERATIONS ====================
+# Route handlers are async and must not block the event loop, so they use a
+# separate psycopg 3 pool. Queries keep the same %s placeholder style and rows
+# come back as plain dicts.
+
+async_pool: Optional[AsyncConnectionPool] = None
+async_replica_pool: Optional[AsyncConnectionPool] = None
+_async_pool_lock = asyncio.Lock()
+_replica_lag_task: Optional[asyncio.Task] = None
+
+class InstrumentedAsyncCursor(AsyncCursor):
+    """Async cursor that reports every statement to query_metrics"""
+
+    async def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            _record_async(self, query, params, start)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().executemany(query, params_seq, **kwargs)
+        finally:
+            _record_async(self, query, None, start)
+
+class InstrumentedAsyncServerCursor(AsyncServerCursor):
+    """Server-side (streaming) cursor that reports its opening query to query_metrics"""
+
+    async def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            _record_async(self, query, params, start)
+
+def _record_async(cursor, query, params, start: float):
+    duration = time.perf_counter() - start
+    if not isinstance(query, str):
+        query = query.as_string(cursor.connection)
+    query_metrics.record(query, params, duration)
+
+async def _explain_async(query: str, params: Any) -> Any:
+    """EXPLAIN a slow statement on a fresh connection (planning only, nothing is executed)"""
+    if not query.lstrip().upper().startswith(('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')):
+        return None
+    async with async_pool.connection() as conn:
+        cursor = await conn.execute("EXPLAIN (FORMAT JSON) " + query, params)
+        row = await cursor.fetchone()
+        await conn.rollback()
+        return row['QUERY PLAN'] if row else None
+
+query_metrics.explain_handler = _explain_async
+
+async def _configure_async_connection(conn):
+    """Per-connection setup for the async pool"""
+    conn.prepared_max = PREPARED_MAX
+    conn.cursor_factory = InstrumentedAsyncCursor
+    conn.server_cursor_factory = InstrumentedAsyncServerCursor
+
+async def _configure_async_replica_connection(conn):
+    """Per-connection setup for the async replica pool"""
+    await _configure_async_connection(conn)
+    await conn.set_read_only(True)
+
+# When each async connection was last returned, for idle-based pre-ping
+_async_returned_at: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+async def _reset_async_connection(conn):
+    _async_returned_at[conn] = time.monotonic()
+
+async def _check_async_connection(conn):
+    """Ping connections that sat idle long enough to have been dropped"""
+    returned_at = _async_returned_at.get(conn)
+    if returned_at is not None and time.monotonic() - returned_at < POOL_PING_AFTER:
+        return
+    await AsyncConnectionPool.check_connection(conn)
+
+def _new_async_pool(conninfo: str, configure) -> AsyncConnectionPool:
+    return AsyncConnectionPool(
+        conninfo=conninfo,
+        min_size=ASYNC_POOL_MIN_SIZE,
+        max_size=ASYNC_POOL_MAX_SIZE,
+        kwargs={"row_factory": dict_row},
+        configure=configure,
+        reset=_reset_async_connection,
+        check=_check_async_connection,
+        timeout=POOL_TIMEOUT,
+        max_waiting=POOL_MAX_WAITING,
+        max_lifetime=POOL_MAX_LIFETIME,
+        max_idle=POOL_MAX_IDLE,
+        open=False
+    )
+
+async def init_async_db_pool():
+    """Initialize async database connection pools"""
+    global async_pool, async_replica_pool, _replica_lag_task
+    async with _async_pool_lock:
+        if async_pool is None:
+            new_pool = _new_async_pool(DATABASE_URL, _configure_async_connection)
+            await new_pool.open(wait=True, timeout=POOL_TIMEOUT * 6)
+            async_pool = new_pool
+            print("✅ Async database connection pool initialized")
+        if async_replica_pool is None and DATABASE_REPLICA_URL:
+            new_pool = _new_async_pool(DATABASE_REPLICA_URL, _configure_async_replica_connection)
+            await new_pool.open(wait=True, timeout=POOL_TIMEOUT * 6)
+            async_replica_pool = new_pool
+            _replica_lag_task = asyncio.create_task(_monitor_replica_lag())
+            print("✅ Async replica connection pool initialized")
+
+async def close_async_db_pool():
+    """Close async database connection pools"""
+    global async_pool, async_replica_pool, _replica_lag_task
+    async with _async_pool_lock:
+        if _replica_lag_task is not None:
+            _replica_lag_task.cancel()
+            _replica_lag_task = None
+        if async_replica_pool is not None:
+            await async_replica_pool.close()
+            async_replica_pool = None
+        if async_pool is not None:
+            await async_pool.close()
+            async_pool = None
+
+def pool_stats() -> Dict[str, Any]:
+    """In-use, idle and waiting gauges for every pool"""
+    stats = {}
+    for name, sync_pool in (("sync", pool), ("sync_replica", replica_pool)):
+        if sync_pool is not None:
+            stats[name] = sync_pool.gauges()
+    for name, apool in (("async", async_pool), ("async_replica", async_replica_pool)):
+        if apool is not None:
+            raw = apool.get_stats()
+            stats[name] = {
+                "in_use": raw.get("pool_size", 0) - raw.get("pool_available", 0),
+                "idle": raw.get("pool_available", 0),
+                "waiting": raw.get("requests_waiting", 0),
+                "size": raw.get("pool_size", 0),
+                "max_size": apool.max_size,
+                **raw,
+            }
+    return stats
+
+async def check_replica_lag() -> Optional[float]:
+    """Measure replica lag in seconds and record it in replica_stats"""
+    if async_replica_pool is None:
+        return None
+    async with async_replica_pool.connection() as conn:
+        cursor = await conn.execute(REPLICA_LAG_QUERY)
+        row = await cursor.fetchone()
+    lag = float(row['lag_seconds']) if row and row['lag_seconds'] is not None else 0.0
+    replica_stats["lag_seconds"] = lag
+    replica_stats["healthy"] = True
+    replica_stats["lag_checked_at"] = datetime.utcnow().isoformat()
+    return lag
+
+async def _monitor_replica_lag():
+    while True:
+        try:
+            await check_replica_lag()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Unreachable replica: route everything to the primary until it recovers
+            replica_stats["healthy"] = False
+            print(f"[DB] Replica lag check failed: {e}")
+        await asyncio.sleep(REPLICA_LAG_CHECK_INTERVAL)
+
+@asynccontextmanager
+async def get_async_db_connection(read_only: bool = False, user_id: Optional[int] = None):
+    """
+    Get async database connection from pool
+    
+    read_only=True routes to the replica when one is configured and healthy.
+    Passing user_id on a write records it so that user's read_only requests
+    stay on the primary for the read-your-writes window.
+    """
+    if async_pool is None:
+        await init_async_db_pool()
+    
+    source = async_pool
+    if read_only:
+        if async_replica_pool is not None and replica_available() and not wrote_recently(user_id):
+            source = async_replica_pool
+            replica_stats["replica_reads"] += 1
+        else:
+            replica_stats["primary_reads"] += 1
+    
+    async with source.connection() as conn:
+        try:
+            yield conn
+            await conn.commit()
+        except Exception as e:
+            await conn.rollback()
+            raise e
+    
+    if user_id is not None and not read_only:
+        mark_user_write(user_id)
+
+async def execute_query_async(query: str, params: tuple = None, fetch_one: bool = False, fetch_all: bool = True, read_only: bool = False) -> Any:
+    """Execute a database query without blocking the event loop"""
+    async with get_async_db_connection(read_only=read_only) as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params or ())
+            
+            if fetch_one:
+                return await cursor.fetchone()
+            elif fetch_all:
+                return await cursor.fetchall()
+            else:
+                return cursor.rowcount
+
+async def execute_many_async(query: str, params_list: List[tuple]) -> int:
+    """Execute multiple queries without blocking the event loop"""
+    async with get_async_db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.executemany(query, params_list)
             return cursor.rowcount
 
+# ==================== UNIT OF WORK ====================
+# One DbSession per read-only request: the connection is checked out on
+# first use, everything runs in a single transaction, and the FastAPI
+# dependency ends it and returns the connection when the handler is done.
+# gather() pipelines independent statements into one round-trip. Writes
+# stay on get_async_db_connection, which commits before the handler
+# emits its events.
+
+class DbSession:
+    """Request-scoped connection and transaction"""
+
+    def __init__(self, read_only: bool = False, user_id: Optional[int] = None):
+        self.read_only = read_only
+        # May be set by the handler before the first query, for read-your-writes
+        self.user_id = user_id
+        self._context = None
+        self._conn = None
+
+    async def connection(self):
+        """The session's connection, checked out on first use"""
+        if self._conn is None:
+            self._context = get_async_db_connection(read_only=self.read_only, user_id=self.user_id)
+            self._conn = await self._context.__aenter__()
+        return self._conn
+
+    async def fetch_one(self, query, params: tuple = None) -> Optional[Dict]:
+        conn = await self.connection()
+        cursor = await conn.execute(query, params)
+        return await cursor.fetchone()
+
+    async def fetch_all(self, query, params: tuple = None) -> List[Dict]:
+        conn = await self.connection()
+        cursor = await conn.execute(query, params)
+        return await cursor.fetchall()
+
+    async def execute(self, query, params: tuple = None) -> int:
+        conn = await self.connection()
+        cursor = await conn.execute(query, params)
+        return cursor.rowcount
+
+    async def gather(self, *statements: Tuple[str, Optional[tuple]]) -> List[List[Dict]]:
+        """Run independent (query, params) statements in one pipeline; returns each one's rows"""
+        conn = await self.connection()
+        cursors = []
+        async with conn.pipeline():
+            for query, params in statements:
+                cursor = conn.cursor()
+                await cursor.execute(query, params)
+                cursors.append(cursor)
+        return [await cursor.fetchall() for cursor in cursors]
+
+    async def close(self, exc: Optional[BaseException] = None):
+        """Commit (or roll back on exc) and return the connection to the pool"""
+        if self._context is None:
+            return
+        context, self._context, self._conn = self._context, None, None
+        if exc is None:
+            await context.__aexit__(None, None, None)
+        else:
+            await context.__aexit__(type(exc), exc, exc.__traceback__)
+
+async def get_read_session() -> AsyncIterator[DbSession]:
+    """FastAPI dependency: request-scoped read-only session (replica when available)"""
+    session = DbSession(read_only=True)
+    try:
+        yield session
+    except BaseException as e:
+        await session.close(e)
+        raise
+    await session.close()
+
+ASYNC_ROW_FACTORIES = {
+    'dict': dict_row,
+    'tuple': tuple_row,
+    'record': namedtuple_row,
+}
+
+async def stream_query_async(query: str, params: tuple = None, batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+                             row_format: str = 'dict', read_only: bool = True) -> AsyncIterator[List[Any]]:
+    """Yield query results in batches from a server-side cursor without blocking the event loop"""
+    if row_format not in ASYNC_ROW_FACTORIES:
+        raise ValueError(f"Unknown row format: {row_format}")
+    
+    async with get_async_db_connection(read_only=read_only) as conn:
+        async with conn.cursor(name=_stream_cursor_name(), row_factory=ASYNC_ROW_FACTORIES[row_format]) as cursor:
+            cursor.itersize = batch_size
+            await cursor.execute(query, params or ())
+            while True:
+                batch = await cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+
+async def copy_rows_async(conn, table: str, columns: List[str], rows: List[tuple]) -> int:
+    """Bulk load rows with COPY on an open async connection"""
+    statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(table),
+        sql.SQL(', ').join(map(sql.Identifier, columns))
+    )
+    async with conn.cursor() as cursor:
+        async with cursor.copy(statement) as copy:
+            for row in rows:
+                await copy.write_row(row)
+    return len(rows)
+
+async def insert_values_async(conn, table: str, columns: List[str], rows: List[tuple], returning: Tuple[str, ...] = ()) -> List[Dict]:
+    """Insert rows with one multi-row VALUES statement on an open async connection"""
+    row_placeholder = sql.SQL('({})').format(sql.SQL(', ').join(sql.Placeholder() * len(columns)))
+    statement = sql.SQL("INSERT INTO {} ({}) VALUES {}").format(
+        sql.Identifier(table),
+        sql.SQL(', ').join(map(sql.Identifier, columns)),
+        sql.SQL(', ').join([row_placeholder] * len(rows))
+    )
+    if returning:
+        statement += sql.SQL(" RETURNING {}").format(sql.SQL(', ').join(map(sql.Identifier, returning)))
+    
+    params = [value for row in rows for value in row]
+    async with conn.cursor() as cursor:
+        await cursor.execute(statement, params)
+        return await cursor.fetchall() if returning else []
+
+# ==================== PREPARED STATEMENTS ====================
+# Hot statements are registered once by name and executed with prepare=True,
+# so each pooled connection parses and plans them a single time. Parameters
+# are bound with fixed Postgres types: left alone, psycopg picks int2/int4/int8
+# from each value and the same SQL gets prepared several times over.
+
+PARAM_TYPES = {
+    'int4': Int4,
+    'int8': Int8,
+    'float8': Float8,
+    'text': str,
+    'bool': bool,
+    'numeric': Decimal,
+    'timestamptz': lambda v: v if isinstance(v, datetime) else datetime.fromisoformat(v),
+}
+
+class PreparedStatement:
+    """Named query with a fixed parameter signature"""
+
+    def __init__(self, name: str, query: str, param_types: Tuple[str, ...] = ()):
+        unknown = [t for t in param_types if t not in PARAM_TYPES]
+        if unknown:
+            raise ValueError(f"Unknown parameter types for statement '{name}': {unknown}")
+        if query.count('%s') != len(param_types):
+            raise ValueError(f"Statement '{name}' has {query.count('%s')} placeholders but {len(param_types)} types")
+
+        self.name = name
+        self.query = query
+        self.param_types = tuple(param_types)
+        self.executions = 0
+
+    def bind(self, params: tuple = ()) -> tuple:
+        """Coerce parameters to the declared types"""
+        if len(params) != len(self.param_types):
+            raise ValueError(f"Statement '{self.name}' expects {len(self.param_types)} parameters, got {len(params)}")
+        return tuple(
+            None if value is None else PARAM_TYPES[type_name](value)
+            for type_name, value in zip(self.param_types, params)
+        )
+
+    async def execute(self, cursor, params: tuple = ()):
+        """Execute on an async cursor, preparing it on that connection if needed"""
+        self.executions += 1
+        await cursor.execute(self.query, self.bind(params), prepare=True)
+        return cursor
+
+prepared_statements: Dict[str, PreparedStatement] = {}
+
+def register_statement(name: str, query: str, param_types: Tuple[str, ...] = ()) -> PreparedStatement:
+    """Register a named statement, or return the existing one with the same definition"""
+    existing = prepared_statements.get(name)
+    if existing is not None:
+        if existing.query != query or existing.param_types != tuple(param_types):
+            raise ValueError(f"Statement '{name}' is already registered with a different definition")
+        return existing
+
+    statement = PreparedStatement(name, query, param_types)
+    prepared_statements[name] = statement
+    return statement
+
+# ==================== KEYSET PAGINATION ====================
+# List endpoints hand out an opaque cursor holding the sort key of the last
+# row returned. The next page seeks past that key with a row comparison, so
+# page N costs the same as page 1 instead of scanning and discarding N pages.
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def _cursor_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def encode_cursor(values: tuple) -> str:
+    """Encode a sort key as an opaque URL-safe token"""
+    payload = json.dumps([_cursor_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_cursor_value(value: Any, expected: type) -> Any:
+    # Reverses _cursor_value: datetimes and Decimals travel as strings
+    if isinstance(value, bool):
+        raise ValueError("unexpected boolean")
+    if expected is datetime and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if expected is Decimal and isinstance(value, (str, int)):
+        number = Decimal(value)
+        if number.is_finite():
+            return number
+    elif expected is float and isinstance(value, (int, float)) and math.isfinite(value):
+        return float(value)
+    elif expected in (int, str) and isinstance(value, expected):
+        return value
+    raise ValueError(f"expected {expected.__name__}")
+
+def decode_cursor(token: str, types: Tuple[type, ...]) -> tuple:
+    """
+    Decode a token produced by encode_cursor into a key of the given
+    per-position types (int, float, str, datetime or Decimal)
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong key length")
+        return tuple(_decode_cursor_value(value, expected) for value, expected in zip(values, types))
+    except (ValueError, InvalidOperation, binascii.Error) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+
+def next_cursor(rows: List[Dict], limit: int, key_columns: Tuple[str, ...]) -> Optional[str]:
+    """Cursor for the page after rows, or None when this was the last page"""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(tuple(last[column] for column in key_columns))
+
 # ==================== USER OPERATIONS ====================
 
 def get_user_by_email(email: str) -> Optional[Dict]:
@@ -161,60 +939,55 @@ def add_to_waitlist(data: Dict) -> int:
 
 def get_waitlist_count() -> int:
     """Get total waitlist count"""
-    query = "SELECT COUNT(*) as count FROM waitlist"
-    result = execute_query(query, fetch_one=True)
+    # Maintained by the waitlist insert/delete triggers (migrations/010)
+    query = "SELECT total AS count FROM waitlist_counter WHERE id"
+    result = execute_query(query, fetch_one=True, read_only=True)
     return result['count'] if result else 0
 
 # ==================== TRANSFER PORTAL OPERATIONS ====================
 
 def get_transfer_portal_players(filters: Dict = None) -> List[Dict]:
-    """Get transfer portal players with filters"""
+    """
+    Get transfer portal players with filters
+    
+    Pass filters['cursor'] from
+    next_cursor(rows, limit, ('sort_rating', 'sort_nil_valuation', 'id'))
+    to seek past the previous page; otherwise filters['offset'] is used.
+    """
+    filters = filters or {}
     query = """
-        SELECT * FROM transfer_portal_players
+        SELECT *, COALESCE(rating, 0) AS sort_rating, COALESCE(nil_valuation, 0) AS sort_nil_valuation
+        FROM transfer_portal_players
         WHERE 1=1
     """
     params = []
     
-    if filters:
-        if filters.get('sport'):
-            query += " AND sport = %s"
-            params.append(filters['sport'])
-        if filters.get('position'):
-            query += " AND position = %s"
-            params.append(filters['position'])
-        if filters.get('status'):
-            query += " AND status = %s"
-            params.append(filters['status'])
+    if filters.get('sport'):
+        query += " AND sport = %s"
+        params.append(filters['sport'])
+    if filters.get('position'):
+        query += " AND position = %s"
+        params.append(filters['position'])
+    if filters.get('status'):
+        query += " AND status = %s"
+        params.append(filters['status'])
+    if filters.get('cursor'):
+        rating, nil_valuation, player_id = decode_cursor(filters['cursor'], (Decimal, Decimal, int))
+        query += " AND (COALESCE(rating, 0), COALESCE(nil_valuation, 0), id) < (%s, %s, %s)"
+        params.extend([rating, nil_valuation, player_id])
     
-    query += " ORDER BY rating DESC, nil_valuation DESC"
-    query += f" LIMIT {filters.get('limit', 50)} OFFSET {filters.get('offset', 0)}"
+    query += " ORDER BY COALESCE(rating, 0) DESC, COALESCE(nil_valuation, 0) DESC, id DESC"
+    query += " LIMIT %s"
+    params.append(int(filters.get('limit', 50)))
+    if not filters.get('cursor'):
+        query += " OFFSET %s"
+        params.append(int(filters.get('offset', 0)))
     
     return execute_query(query, tuple(params))
 
 # ==================== CRM OPERATIONS ====================
-
-def track_signup(data: Dict) -> int:
-    """Track signup in CRM"""
-    query = """
-        INSERT INTO signup_analytics (
-            full_name, email, phone, role, sport,
-            referral_source, utm_source, utm_medium, utm_campaign,
-            signup_type, ip_address, user_agent, created_at
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
-        RETURNING id
-    """
-    result = execute_query(
-        query,
-        (
-            data.get('fullName'), data.get('email'), data.get('phone'),
-            data.get('role'), data.get('sport'), data.get('referralSource'),
-            data.get('utmSource'), data.get('utmMedium'), data.get('utmCampaign'),
-            data.get('signupType'), data.get('ipAddress'), data.get('userAgent')
-        ),
-        fetch_one=True
-    )
-    return result['id'] if result else None
+# Signup analytics rows are buffered and COPYed in batches by
+# services.ingest.track_signup
 
 # Initialize database pool on module import
 init_db_pool()
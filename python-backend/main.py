@@ -16,9 +16,20 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+from database import init_async_db_pool, close_async_db_pool, replica_stats, POOL_UNAVAILABLE_ERRORS
+from query_metrics import current_route, normalize_route
+from services.ingest import start_ingestors, stop_ingestors
+from services.counters import start_counter_reconciler, stop_counter_reconciler
+from services.timeline import home_timeline
+from services.likes import like_buffer, LIKE_WRITE_BEHIND
+from services.realtime import realtime_hub
+from services.notifications import notification_pipeline
+from services.portal_snapshot import portal_snapshot, PORTAL_SNAPSHOT
+from services.portal_feed import portal_feed
+
 # Import routers
 from routers import auth, verification, waitlist, feed, athlete, social, messages, notifications
-from routers import transfer_portal, crm, stripe_router, vip
+from routers import transfer_portal, crm, stripe_router, vip, admin, realtime
 
 # Create FastAPI app
 app = FastAPI(
@@ -45,6 +56,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tag database queries with the route that issued them
+@app.middleware("http")
+async def query_route_middleware(request: Request, call_next):
+    current_route.set(f"{request.method} {normalize_route(request.url.path)}")
+    return await call_next(request)
+
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
@@ -53,7 +70,8 @@ async def health_check():
         "status": "healthy",
         "service": "ATHLYNX API",
         "version": "1.0.0",
-        "message": "Dreams Do Come True 2026"
+        "message": "Dreams Do Come True 2026",
+        "database": {"replica": replica_stats}
     }
 
 # Root endpoint
@@ -80,6 +98,8 @@ app.include_router(notifications.router, prefix="/api/notifications", tags=["Not
 app.include_router(transfer_portal.router, prefix="/api/transfer-portal", tags=["Transfer Portal"])
 app.include_router(crm.router, prefix="/api/crm", tags=["CRM & Analytics"])
 app.include_router(stripe_router.router, prefix="/api/stripe", tags=["Payments"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+app.include_router(realtime.router, prefix="/api/realtime", tags=["Real-Time"])
 
 # Error handlers
 @app.exception_handler(HTTPException)
@@ -89,6 +109,17 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         content={"error": exc.detail, "success": False}
     )
 
+async def pool_unavailable_handler(request: Request, exc: Exception):
+    # Every connection stayed busy for the whole checkout timeout: ask the client to retry
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Service busy, please retry", "success": False},
+        headers={"Retry-After": "1"}
+    )
+
+for pool_error in POOL_UNAVAILABLE_ERRORS:
+    app.add_exception_handler(pool_error, pool_unavailable_handler)
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     print(f"[ERROR] {exc}")
@@ -104,11 +135,31 @@ async def startup_event():
     print("🦁 Dreams Do Come True 2026")
     print(f"📍 Environment: {os.getenv('ENVIRONMENT', 'development')}")
     print(f"🗄️  Database: {os.getenv('DATABASE_URL', 'Not configured')[:50]}...")
+    await init_async_db_pool()
+    start_ingestors()
+    start_counter_reconciler()
+    home_timeline.start()
+    await realtime_hub.start()
+    notification_pipeline.start()
+    if PORTAL_SNAPSHOT:
+        portal_snapshot.start()
+    portal_feed.start()
+    if LIKE_WRITE_BEHIND:
+        like_buffer.start()
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     print("👋 ATHLYNX API Shutting down...")
+    await portal_feed.stop()
+    await portal_snapshot.stop()
+    await notification_pipeline.stop()
+    await realtime_hub.stop()
+    await like_buffer.stop()
+    await home_timeline.stop()
+    await stop_counter_reconciler()
+    await stop_ingestors()
+    await close_async_db_pool()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,20 @@
+-- ATHLYNX AI Platform - Denormalized post counters
+-- One row per post, kept in step with post_likes / post_comments by the
+-- feed router and repaired by services/counters.py
+
+CREATE TABLE IF NOT EXISTS post_stats (
+    post_id INTEGER PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+    likes_count INTEGER NOT NULL DEFAULT 0,
+    comments_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Backfill existing posts
+INSERT INTO post_stats (post_id, likes_count, comments_count, updated_at)
+SELECT
+    p.id,
+    (SELECT COUNT(*) FROM post_likes WHERE post_id = p.id),
+    (SELECT COUNT(*) FROM post_comments WHERE post_id = p.id),
+    NOW()
+FROM posts p
+ON CONFLICT (post_id) DO NOTHING;
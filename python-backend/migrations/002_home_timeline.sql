@@ -0,0 +1,35 @@
+-- ATHLYNX AI Platform - Home timelines
+-- Per-follower timelines filled on write by services/timeline.py, plus
+-- follower counts used to decide between fan-out-on-write and -on-read
+
+CREATE TABLE IF NOT EXISTS home_timeline (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    post_id INTEGER NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    author_id INTEGER NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (user_id, created_at, post_id)
+);
+
+CREATE INDEX IF NOT EXISTS home_timeline_user_author_idx ON home_timeline (user_id, author_id);
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    followers_count INTEGER NOT NULL DEFAULT 0,
+    following_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Fan-out reads followers by followee; the read path finds followees by follower
+CREATE INDEX IF NOT EXISTS user_connections_following_idx ON user_connections (following_id, follower_id);
+CREATE INDEX IF NOT EXISTS user_connections_follower_idx ON user_connections (follower_id, following_id);
+CREATE INDEX IF NOT EXISTS posts_user_created_idx ON posts (user_id, created_at DESC, id DESC);
+
+-- Backfill follower counts
+INSERT INTO user_stats (user_id, followers_count, following_count, updated_at)
+SELECT
+    u.id,
+    (SELECT COUNT(*) FROM user_connections WHERE following_id = u.id),
+    (SELECT COUNT(*) FROM user_connections WHERE follower_id = u.id),
+    NOW()
+FROM users u
+ON CONFLICT (user_id) DO NOTHING;
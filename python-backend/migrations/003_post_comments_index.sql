@@ -0,0 +1,5 @@
+-- ATHLYNX AI Platform - Comment thread index
+-- Serves both the paginated thread view and the first-K-per-post batch
+-- query with an index range scan per post
+
+CREATE INDEX IF NOT EXISTS post_comments_post_created_idx ON post_comments (post_id, created_at, id);
@@ -0,0 +1,18 @@
+-- ATHLYNX AI Platform - Unique like/follow pairs
+-- The single-statement toggles rely on ON CONFLICT against these indexes,
+-- so concurrent double-clicks can never store the same pair twice
+
+DELETE FROM post_likes a
+USING post_likes b
+WHERE a.post_id = b.post_id AND a.user_id = b.user_id AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS post_likes_post_user_key ON post_likes (post_id, user_id);
+
+DELETE FROM user_connections a
+USING user_connections b
+WHERE a.follower_id = b.follower_id AND a.following_id = b.following_id AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS user_connections_follower_following_key ON user_connections (follower_id, following_id);
+
+-- The unique index covers lookups by follower; the plain one from 002 is redundant
+DROP INDEX IF EXISTS user_connections_follower_idx;
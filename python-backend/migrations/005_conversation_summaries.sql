@@ -0,0 +1,42 @@
+-- ATHLYNX AI Platform - Conversation summaries
+-- One row per (user, peer) pair, updated by send_message and mark-read,
+-- so the inbox never scans the messages table
+
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    peer_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    last_message_id INTEGER NOT NULL,
+    last_sender_id INTEGER NOT NULL,
+    last_message_preview TEXT,
+    last_message_at TIMESTAMPTZ NOT NULL,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, peer_id)
+);
+
+CREATE INDEX IF NOT EXISTS conversation_summaries_inbox_idx
+    ON conversation_summaries (user_id, last_message_at DESC, peer_id DESC);
+
+-- Each direction of a thread is one index range; the thread view merges the two
+CREATE INDEX IF NOT EXISTS messages_pair_created_idx ON messages (sender_id, recipient_id, created_at DESC, id DESC);
+
+-- Backfill from existing messages
+INSERT INTO conversation_summaries (
+    user_id, peer_id, last_message_id, last_sender_id, last_message_preview, last_message_at, unread_count
+)
+SELECT
+    pairs.user_id, pairs.peer_id, last.id, last.sender_id, LEFT(last.content, 200), last.created_at,
+    (SELECT COUNT(*) FROM messages
+     WHERE recipient_id = pairs.user_id AND sender_id = pairs.peer_id AND is_read = 0)
+FROM (
+    SELECT sender_id AS user_id, recipient_id AS peer_id FROM messages
+    UNION
+    SELECT recipient_id, sender_id FROM messages
+) pairs
+CROSS JOIN LATERAL (
+    SELECT id, sender_id, content, created_at FROM messages
+    WHERE (sender_id = pairs.user_id AND recipient_id = pairs.peer_id)
+       OR (sender_id = pairs.peer_id AND recipient_id = pairs.user_id)
+    ORDER BY created_at DESC, id DESC
+    LIMIT 1
+) last
+ON CONFLICT (user_id, peer_id) DO NOTHING;
@@ -0,0 +1,30 @@
+-- ATHLYNX AI Platform - Read watermarks
+-- Read state is the highest message/notification id the user has seen,
+-- per conversation and per user. Unread counts are derived from it.
+
+ALTER TABLE conversation_summaries
+    ADD COLUMN IF NOT EXISTS last_read_message_id INTEGER NOT NULL DEFAULT 0;
+
+UPDATE conversation_summaries s
+SET last_read_message_id = COALESCE((
+    SELECT MAX(id) FROM messages
+    WHERE recipient_id = s.user_id AND sender_id = s.peer_id AND is_read = 1
+), 0);
+
+-- Derived from the watermark from now on
+ALTER TABLE conversation_summaries DROP COLUMN IF EXISTS unread_count;
+
+-- Unread messages of a conversation are one index range past the watermark
+CREATE INDEX IF NOT EXISTS messages_recipient_sender_id_idx ON messages (recipient_id, sender_id, id);
+
+CREATE TABLE IF NOT EXISTS notification_read_state (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    last_read_notification_id INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO notification_read_state (user_id, last_read_notification_id)
+SELECT user_id, MAX(id) FROM notifications WHERE is_read = 1 GROUP BY user_id
+ON CONFLICT (user_id) DO NOTHING;
+
+CREATE INDEX IF NOT EXISTS notifications_user_id_idx ON notifications (user_id, id DESC);
@@ -0,0 +1,40 @@
+-- ATHLYNX AI Platform - Athlete search index
+-- One denormalized row per athlete with a weighted tsvector (name > sport/
+-- position > school) and trigram-indexed text for fuzzy and substring
+-- matches. Kept current by services/search.py.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE TABLE IF NOT EXISTS athlete_search (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    first_name TEXT,
+    last_name TEXT,
+    sport TEXT,
+    position TEXT,
+    school TEXT,
+    grad_year INTEGER,
+    nil_value NUMERIC,
+    search_text TEXT NOT NULL DEFAULT '',
+    document TSVECTOR NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS athlete_search_document_idx ON athlete_search USING GIN (document);
+CREATE INDEX IF NOT EXISTS athlete_search_text_trgm_idx ON athlete_search USING GIN (search_text gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS athlete_search_school_trgm_idx ON athlete_search USING GIN (school gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS athlete_search_sport_position_idx ON athlete_search (sport, position);
+
+-- Backfill (same projection as services/search.py REFRESH_ATHLETE)
+INSERT INTO athlete_search (
+    user_id, first_name, last_name, sport, position, school, grad_year, nil_value, search_text, document, updated_at
+)
+SELECT
+    u.id, u.first_name, u.last_name, a.sport, a.position, a.school, a.grad_year, a.nil_value,
+    LOWER(CONCAT_WS(' ', u.first_name, u.last_name, a.school, a.sport, a.position)),
+    setweight(to_tsvector('simple', CONCAT_WS(' ', u.first_name, u.last_name)), 'A')
+        || setweight(to_tsvector('simple', CONCAT_WS(' ', a.sport, a.position)), 'B')
+        || setweight(to_tsvector('simple', COALESCE(a.school, '')), 'C'),
+    NOW()
+FROM users u
+JOIN athlete_profiles a ON a.user_id = u.id
+ON CONFLICT (user_id) DO NOTHING;
@@ -0,0 +1,21 @@
+-- ATHLYNX AI Platform - Transfer portal change tracking
+-- updated_at moves on every write, whoever makes it, so the in-memory
+-- portal snapshot (services/portal_snapshot.py) can pull just the rows
+-- changed since its last refresh.
+
+ALTER TABLE transfer_portal_players
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION transfer_portal_players_touch() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS transfer_portal_players_touch ON transfer_portal_players;
+CREATE TRIGGER transfer_portal_players_touch
+    BEFORE UPDATE ON transfer_portal_players
+    FOR EACH ROW EXECUTE FUNCTION transfer_portal_players_touch();
+
+CREATE INDEX IF NOT EXISTS transfer_portal_players_updated_idx ON transfer_portal_players (updated_at);
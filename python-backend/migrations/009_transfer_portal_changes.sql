@@ -0,0 +1,38 @@
+-- ATHLYNX AI Platform - Transfer portal change feed
+-- Every insert or update stamps the row with the writing transaction id
+-- and a sequence number. The change feed (services/portal_feed.py) pages
+-- through rows in (change_xid, change_seq) order, only past transactions
+-- that have finished, so a row can never appear behind a client's cursor.
+-- Needs PostgreSQL 13+ (xid8).
+
+CREATE SEQUENCE IF NOT EXISTS transfer_portal_change_seq;
+
+ALTER TABLE transfer_portal_players
+    ADD COLUMN IF NOT EXISTS change_xid XID8,
+    ADD COLUMN IF NOT EXISTS change_seq BIGINT,
+    ADD COLUMN IF NOT EXISTS change_op TEXT;
+
+CREATE OR REPLACE FUNCTION transfer_portal_players_stamp() RETURNS trigger AS $$
+BEGIN
+    NEW.change_xid := pg_current_xact_id();
+    NEW.change_seq := nextval('transfer_portal_change_seq');
+    NEW.change_op := CASE WHEN TG_OP = 'INSERT' THEN 'insert' ELSE 'update' END;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Existing rows: one change each, in the order they entered the portal
+UPDATE transfer_portal_players p
+SET change_xid = pg_current_xact_id(), change_seq = ordered.seq, change_op = 'insert'
+FROM (
+    SELECT id, nextval('transfer_portal_change_seq') AS seq
+    FROM (SELECT id FROM transfer_portal_players ORDER BY entered_portal_date, id) by_entry
+) ordered
+WHERE p.id = ordered.id AND p.change_seq IS NULL;
+
+DROP TRIGGER IF EXISTS transfer_portal_players_stamp ON transfer_portal_players;
+CREATE TRIGGER transfer_portal_players_stamp
+    BEFORE INSERT OR UPDATE ON transfer_portal_players
+    FOR EACH ROW EXECUTE FUNCTION transfer_portal_players_stamp();
+
+CREATE INDEX IF NOT EXISTS transfer_portal_players_change_idx ON transfer_portal_players (change_xid, change_seq);
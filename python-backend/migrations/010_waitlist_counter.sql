@@ -0,0 +1,55 @@
+-- ATHLYNX AI Platform - Waitlist counter
+-- Each signup's position is stamped at insert from a one-row counter, and
+-- the counter also keeps the current total, so neither needs a COUNT.
+-- The counter row is updated in the inserting transaction: a failed batch
+-- leaves no gaps, and concurrent batches take their positions in turn.
+-- services/counters.py reconciles the total against the table.
+
+CREATE TABLE IF NOT EXISTS waitlist_counter (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    issued BIGINT NOT NULL DEFAULT 0,   -- highest position handed out
+    total BIGINT NOT NULL DEFAULT 0,    -- rows currently on the waitlist
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE waitlist ADD COLUMN IF NOT EXISTS position BIGINT;
+
+-- Existing rows keep the position COUNT(*) WHERE id <= ... gave them
+UPDATE waitlist w
+SET position = ranked.position
+FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS position FROM waitlist) ranked
+WHERE w.id = ranked.id AND w.position IS NULL;
+
+INSERT INTO waitlist_counter (id, issued, total)
+SELECT TRUE, COALESCE(MAX(position), 0), COUNT(*) FROM waitlist
+ON CONFLICT (id) DO UPDATE SET issued = EXCLUDED.issued, total = EXCLUDED.total, updated_at = NOW();
+
+CREATE OR REPLACE FUNCTION waitlist_take_position() RETURNS trigger AS $$
+BEGIN
+    UPDATE waitlist_counter
+    SET issued = issued + 1, total = total + 1, updated_at = NOW()
+    WHERE id
+    RETURNING issued INTO NEW.position;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION waitlist_count_deleted() RETURNS trigger AS $$
+BEGIN
+    UPDATE waitlist_counter
+    SET total = GREATEST(total - (SELECT COUNT(*) FROM deleted), 0), updated_at = NOW()
+    WHERE id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS waitlist_take_position ON waitlist;
+CREATE TRIGGER waitlist_take_position
+    BEFORE INSERT ON waitlist
+    FOR EACH ROW EXECUTE FUNCTION waitlist_take_position();
+
+DROP TRIGGER IF EXISTS waitlist_count_deleted ON waitlist;
+CREATE TRIGGER waitlist_count_deleted
+    AFTER DELETE ON waitlist
+    REFERENCING OLD TABLE AS deleted
+    FOR EACH STATEMENT EXECUTE FUNCTION waitlist_count_deleted();
@@ -0,0 +1,198 @@
+"""
+ATHLYNX Query Metrics - per-statement latency histograms and slow-query log
+
+Every query that goes through database.py is timed and grouped by a
+normalized fingerprint of its SQL plus the API route that issued it.
+
+@author ATHLYNX AI Corporation
+@date January 8, 2026
+"""
+
+import os
+import re
+import time
+import asyncio
+import hashlib
+import contextvars
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any, Callable, Tuple
+
+SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '200'))
+SLOW_QUERY_LOG_SIZE = int(os.getenv('DB_SLOW_QUERY_LOG_SIZE', '200'))
+SLOW_QUERY_EXPLAIN = os.getenv('DB_SLOW_QUERY_EXPLAIN', 'false').lower() == 'true'
+EXPLAIN_COOLDOWN_SECONDS = float(os.getenv('DB_SLOW_QUERY_EXPLAIN_COOLDOWN', '300'))
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+# Route of the request being served; set by the HTTP middleware in main.py
+current_route: contextvars.ContextVar[str] = contextvars.ContextVar('current_route', default='-')
+
+# ==================== FINGERPRINTS ====================
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\$\d+")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+def normalize_query(query: str) -> str:
+    """Strip literals and placeholders so equivalent statements share one fingerprint"""
+    normalized = _STRING_LITERAL.sub('?', query)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _VALUE_LIST.sub('(?, ...)', normalized)
+    return _WHITESPACE.sub(' ', normalized).strip()
+
+def fingerprint(normalized: str) -> str:
+    """Short stable ID for a normalized statement"""
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:12]
+
+def normalize_route(path: str) -> str:
+    """Collapse numeric path segments, e.g. /profile/42 -> /profile/{id}"""
+    return _ID_SEGMENT.sub('/{id}', path)
+
+# ==================== AGGREGATION ====================
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, duration_ms: float):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, hits in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += hits
+            if seen >= target:
+                return self.max_ms if bound == float('inf') else bound
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": {
+                ("+Inf" if bound == float('inf') else str(bound)): hits
+                for bound, hits in zip(LATENCY_BUCKETS_MS, self.buckets)
+            },
+        }
+
+class QueryMetrics:
+    """Latency histograms per (fingerprint, route) plus a bounded slow-query log"""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.statements: Dict[str, str] = {}
+        self.slow_queries: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self.explain_handler: Optional[Callable] = None
+        self._last_explained: Dict[str, float] = {}
+
+    def record(self, query: str, params: Any, duration: float):
+        """Record one execution; duration is in seconds"""
+        duration_ms = duration * 1000
+        normalized = normalize_query(query)
+        fp = fingerprint(normalized)
+        route = current_route.get()
+
+        self.statements.setdefault(fp, normalized)
+        key = (fp, route)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.observe(duration_ms)
+
+        if duration_ms >= SLOW_QUERY_MS:
+            self._log_slow(fp, normalized, query, params, route, duration_ms)
+
+    def _log_slow(self, fp: str, normalized: str, query: str, params: Any, route: str, duration_ms: float):
+        entry = {
+            "fingerprint": fp,
+            "statement": normalized,
+            "route": route,
+            "duration_ms": round(duration_ms, 3),
+            "at": datetime.utcnow().isoformat(),
+            "plan": None,
+        }
+        self.slow_queries.append(entry)
+        print(f"[SLOW QUERY] {duration_ms:.1f}ms {route} {fp}: {normalized[:200]}")
+
+        if SLOW_QUERY_EXPLAIN and self.explain_handler is not None and self._should_explain(fp):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            loop.create_task(self._attach_plan(entry, query, params))
+
+    def _should_explain(self, fp: str) -> bool:
+        now = time.monotonic()
+        last = self._last_explained.get(fp)
+        if last is not None and now - last < EXPLAIN_COOLDOWN_SECONDS:
+            return False
+        self._last_explained[fp] = now
+        return True
+
+    async def _attach_plan(self, entry: Dict, query: str, params: Any):
+        try:
+            entry["plan"] = await self.explain_handler(query, params)
+        except Exception as e:
+            entry["plan"] = {"error": str(e)}
+
+    def snapshot(self, limit: int = 50) -> Dict[str, Any]:
+        """Summary for the admin metrics endpoint, slowest statements first"""
+        rows = []
+        for (fp, route), histogram in self.histograms.items():
+            row = histogram.to_dict()
+            row.update({"fingerprint": fp, "route": route, "statement": self.statements.get(fp)})
+            rows.append(row)
+        rows.sort(key=lambda r: r["mean_ms"] * r["count"], reverse=True)
+        return {
+            "slow_query_threshold_ms": SLOW_QUERY_MS,
+            "statements": rows[:limit],
+            "slow_queries": list(self.slow_queries)[-limit:],
+        }
+
+    def reset(self):
+        self.histograms.clear()
+        self.statements.clear()
+        self.slow_queries.clear()
+        self._last_explained.clear()
+
+query_metrics = QueryMetrics()
+
+class timed_query:
+    """Context manager that records the wrapped execution in query_metrics"""
+
+    def __init__(self, query: str, params: Any = None):
+        self.query = query
+        self.params = params
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        query_metrics.record(self.query, self.params, time.perf_counter() - self.start)
+        return False
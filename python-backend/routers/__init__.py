@@ -14,6 +14,8 @@ from . import notifications
 from . import transfer_portal
 from . import crm
 from . import stripe_router
+from . import admin
+from . import realtime
 
 __all__ = [
     "auth",
@@ -28,4 +30,6 @@ __all__ = [
     "transfer_portal",
     "crm",
     "stripe_router",
+    "admin",
+    "realtime",
 ]
@@ -0,0 +1,70 @@
+"""
+ATHLYNX AI Platform - Admin Router
+Operational metrics for platform administrators
+"""
+from fastapi import APIRouter, HTTPException, Cookie
+from typing import Optional
+from database import get_async_db_connection, replica_stats, pool_stats
+from query_metrics import query_metrics
+from services.counters import reconcile_counters, reconcile_stats
+from services.cache import cache_stats
+from services.realtime import realtime_hub
+from services.notifications import notification_pipeline
+from services.portal_snapshot import portal_snapshot
+from services.portal_feed import portal_feed
+from services.stats import waitlist_counts, transfer_portal_counts
+from auth import verify_jwt_token
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+async def require_admin(athlynx_token: Optional[str]) -> dict:
+    """Verify the caller is signed in with the admin role"""
+    if not athlynx_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    payload = verify_jwt_token(athlynx_token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute("SELECT role FROM users WHERE id = %s", (payload['user_id'],))
+        user = await cursor.fetchone()
+
+    if not user or user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return payload
+
+@router.get("/metrics")
+async def get_metrics(limit: int = 50, athlynx_token: Optional[str] = Cookie(None)):
+    """Query latency histograms, slow-query log, pool saturation, replica and cache status"""
+    await require_admin(athlynx_token)
+
+    return {
+        "success": True,
+        "queries": query_metrics.snapshot(limit),
+        "pools": pool_stats(),
+        "replica": replica_stats,
+        "caches": cache_stats(),
+        "realtime": realtime_hub.snapshot(),
+        "notifications": notification_pipeline.stats,
+        "portal_snapshot": portal_snapshot.snapshot(),
+        "portal_feed": portal_feed.stats,
+        "stats": {"waitlist": waitlist_counts.stats, "transfer_portal": transfer_portal_counts.stats}
+    }
+
+@router.post("/metrics/reset")
+async def reset_metrics(athlynx_token: Optional[str] = Cookie(None)):
+    """Clear collected query metrics"""
+    await require_admin(athlynx_token)
+
+    query_metrics.reset()
+    return {"success": True}
+
+@router.post("/counters/reconcile")
+async def run_counter_reconciliation(athlynx_token: Optional[str] = Cookie(None)):
+    """Recount post likes/comments and follower counts now and repair drift"""
+    await require_admin(athlynx_token)
+
+    result = await reconcile_counters()
+    return {"success": True, **result, "stats": reconcile_stats}
@@ -2,14 +2,54 @@
 ATHLYNX AI Platform - Athlete Router
 Handles athlete profiles and stats
 """
-from fastapi import APIRouter, HTTPException, Cookie
+import os
+import json
+import hashlib
+from fastapi import APIRouter, HTTPException, Cookie, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from typing import Optional
-from database import get_db_connection
+from database import get_async_db_connection, register_statement, decode_cursor, next_cursor, InvalidCursor, POOL_UNAVAILABLE_ERRORS
 from auth import verify_jwt_token
+from services.cache import ResponseCache
+from services import events, search
 
 router = APIRouter(prefix="/athlete", tags=["Athlete"])
 
+# Profiles change rarely and the same ones are viewed over and over. An
+# update drops its own entry; other workers see it within the TTL unless
+# the cache is shared.
+profile_cache = ResponseCache(
+    "athlete_profile",
+    ttl=float(os.getenv("ATHLETE_PROFILE_CACHE_TTL", "300")),
+    stale_ttl=float(os.getenv("ATHLETE_PROFILE_CACHE_STALE_TTL", "30")),
+    max_entries=int(os.getenv("ATHLETE_PROFILE_CACHE_MAX_ENTRIES", "10000")),
+    shared_path=os.getenv("ATHLETE_PROFILE_CACHE_SHARED_PATH") or None,
+)
+# How long the client may reuse a profile before revalidating with If-None-Match.
+# Private: the body includes the athlete's email, so shared caches must not keep it
+PROFILE_MAX_AGE = int(os.getenv("ATHLETE_PROFILE_MAX_AGE", "0"))
+
+def _profile_key(user_id: int) -> str:
+    return f"profile:{user_id}"
+
+def _on_athlete_updated(user_id: int, **_):
+    profile_cache.discard(_profile_key(user_id))
+
+events.subscribe(events.ATHLETE_UPDATED, _on_athlete_updated)
+
+def _etag(body: dict) -> str:
+    digest = hashlib.blake2b(json.dumps(body, sort_keys=True).encode("utf-8"), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" matches "x"
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
 class AthleteProfile(BaseModel):
     sport: str
     position: Optional[str] = None
@@ -20,119 +60,125 @@ class AthleteProfile(BaseModel):
     gpa: Optional[float] = None
     bio: Optional[str] = None
 
+ATHLETE_PROFILE = register_statement("athlete_profile", """
+    SELECT
+        u.id, u.first_name, u.last_name, u.email,
+        a.sport, a.position, a.height, a.weight, a.school,
+        a.grad_year, a.gpa, a.bio, a.nil_value
+    FROM users u
+    LEFT JOIN athlete_profiles a ON u.id = a.user_id
+    WHERE u.id = %s
+""", ("int8",))
+
 @router.get("/profile/{user_id}")
-async def get_athlete_profile(user_id: int):
-    """Get athlete profile"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            SELECT 
-                u.id, u.first_name, u.last_name, u.email,
-                a.sport, a.position, a.height, a.weight, a.school, 
-                a.grad_year, a.gpa, a.bio, a.nil_value
-            FROM users u
-            LEFT JOIN athlete_profiles a ON u.id = a.user_id
-            WHERE u.id = %s
-        """, (user_id,))
-        
-        profile = cursor.fetchone()
+async def get_athlete_profile(user_id: int, request: Request, response: Response):
+    """Get athlete profile; answers 304 when If-None-Match has the current ETag"""
+    async def load_profile():
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            await ATHLETE_PROFILE.execute(cursor, (user_id,))
+            profile = await cursor.fetchone()
+
+        # Not cached, so a profile created later shows up right away
         if not profile:
             raise HTTPException(status_code=404, detail="Athlete not found")
-        
-        return {"success": True, "profile": profile}
-        
-    finally:
-        cursor.close()
-        conn.close()
+
+        body = jsonable_encoder({"success": True, "profile": profile})
+        return {"body": body, "etag": _etag(body)}
+
+    cached = await profile_cache.get(_profile_key(user_id), load_profile)
+    headers = {"ETag": cached["etag"], "Cache-Control": f"private, max-age={PROFILE_MAX_AGE}"}
+    if _etag_matches(request.headers.get("if-none-match"), cached["etag"]):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return cached["body"]
 
 @router.post("/profile/update")
 async def update_athlete_profile(data: AthleteProfile, athlynx_token: Optional[str] = Cookie(None)):
     """Update athlete profile"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        # Check if profile exists
-        cursor.execute("SELECT id FROM athlete_profiles WHERE user_id = %s", (payload['user_id'],))
-        existing = cursor.fetchone()
-        
-        if existing:
-            # Update
-            cursor.execute("""
-                UPDATE athlete_profiles
-                SET sport = %s, position = %s, height = %s, weight = %s,
-                    school = %s, grad_year = %s, gpa = %s, bio = %s
-                WHERE user_id = %s
-            """, (data.sport, data.position, data.height, data.weight,
-                  data.school, data.grad_year, data.gpa, data.bio, payload['user_id']))
-        else:
-            # Insert
-            cursor.execute("""
-                INSERT INTO athlete_profiles 
-                (user_id, sport, position, height, weight, school, grad_year, gpa, bio, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
-            """, (payload['user_id'], data.sport, data.position, data.height, data.weight,
-                  data.school, data.grad_year, data.gpa, data.bio))
-        
-        conn.commit()
-        return {"success": True, "message": "Profile updated"}
-        
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        try:
+            # Check if profile exists
+            await cursor.execute("SELECT id FROM athlete_profiles WHERE user_id = %s", (payload['user_id'],))
+            existing = await cursor.fetchone()
+
+            if existing:
+                # Update
+                await cursor.execute("""
+                    UPDATE athlete_profiles
+                    SET sport = %s, position = %s, height = %s, weight = %s,
+                        school = %s, grad_year = %s, gpa = %s, bio = %s
+                    WHERE user_id = %s
+                """, (data.sport, data.position, data.height, data.weight,
+                      data.school, data.grad_year, data.gpa, data.bio, payload['user_id']))
+            else:
+                # Insert
+                await cursor.execute("""
+                    INSERT INTO athlete_profiles
+                    (user_id, sport, position, height, weight, school, grad_year, gpa, bio, created_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+                """, (payload['user_id'], data.sport, data.position, data.height, data.weight,
+                      data.school, data.grad_year, data.gpa, data.bio))
+
+            # Same transaction, so search never shows a profile that rolled back
+            await search.refresh_athlete(cursor, payload['user_id'])
+
+            await conn.commit()
+            events.emit(events.ATHLETE_UPDATED, user_id=payload['user_id'])
+            return {"success": True, "message": "Profile updated"}
+
+        except POOL_UNAVAILABLE_ERRORS:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/search")
 async def search_athletes(
+    q: Optional[str] = None,
     sport: Optional[str] = None,
     position: Optional[str] = None,
     school: Optional[str] = None,
-    limit: int = 20
+    limit: int = 20,
+    after: Optional[str] = Query(None, alias="cursor")
 ):
-    """Search athletes"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
+    """Search athletes, ranked by relevance when q is given"""
+    ranked = bool(q and search.match_query(q))
     try:
-        query = """
-            SELECT 
-                u.id, u.first_name, u.last_name,
-                a.sport, a.position, a.school, a.grad_year, a.nil_value
-            FROM users u
-            JOIN athlete_profiles a ON u.id = a.user_id
-            WHERE 1=1
-        """
-        params = []
-        
-        if sport:
-            query += " AND a.sport = %s"
-            params.append(sport)
-        if position:
-            query += " AND a.position = %s"
-            params.append(position)
-        if school:
-            query += " AND a.school LIKE %s"
-            params.append(f"%{school}%")
-        
-        query += " LIMIT %s"
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        athletes = cursor.fetchall()
-        
-        return {"success": True, "athletes": athletes}
-        
-    finally:
-        cursor.close()
-        conn.close()
+        key = decode_cursor(after, (float, int) if ranked else (int,)) if after else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        athletes = await search.search(cursor, q, sport, position, school, key, limit)
+
+    key_columns = ("score", "id") if ranked else ("id",)
+    return {"success": True, "athletes": athletes, "next_cursor": next_cursor(athletes, limit, key_columns)}
+
+@router.get("/search/autocomplete")
+async def autocomplete_athletes(prefix: str, limit: int = 10):
+    """Suggest athletes as the user types"""
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        suggestions = await search.autocomplete(cursor, prefix, min(limit, 25))
+
+    return {"success": True, "suggestions": suggestions}
+
+@router.get("/search/facets")
+async def athlete_search_facets(
+    q: Optional[str] = None,
+    sport: Optional[str] = None,
+    position: Optional[str] = None,
+    school: Optional[str] = None
+):
+    """Counts per sport and position for the current search"""
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        counts = await search.facets(cursor, q, sport, position, school)
+
+    return {"success": True, "facets": counts}
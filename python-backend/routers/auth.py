@@ -11,7 +11,7 @@ import bcrypt
 import jwt
 import os
 from datetime import datetime, timedelta
-from database import get_db_connection
+from database import get_async_db_connection, POOL_UNAVAILABLE_ERRORS
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -70,138 +70,129 @@ def verify_jwt_token(token: str) -> Optional[dict]:
 @router.post("/register", response_model=AuthResponse)
 async def register(data: RegisterRequest, response: Response):
     """Register new user"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        # Check if email already exists
-        cursor.execute("SELECT id FROM users WHERE email = %s", (data.email,))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
-        # Validate VIP code if provided
-        vip_code_id = None
-        if data.vip_code:
-            cursor.execute(
-                "SELECT id, uses_remaining FROM vip_codes WHERE code = %s AND is_active = 1",
-                (data.vip_code,)
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        try:
+            # Check if email already exists
+            await cursor.execute("SELECT id FROM users WHERE email = %s", (data.email,))
+            if await cursor.fetchone():
+                raise HTTPException(status_code=400, detail="Email already registered")
+
+            # Validate VIP code if provided
+            vip_code_id = None
+            if data.vip_code:
+                await cursor.execute(
+                    "SELECT id, uses_remaining FROM vip_codes WHERE code = %s AND is_active = 1",
+                    (data.vip_code,)
+                )
+                vip_result = await cursor.fetchone()
+                if not vip_result:
+                    raise HTTPException(status_code=400, detail="Invalid VIP code")
+                if vip_result['uses_remaining'] <= 0:
+                    raise HTTPException(status_code=400, detail="VIP code has no remaining uses")
+                vip_code_id = vip_result['id']
+
+            # Hash password
+            hashed_password = hash_password(data.password)
+
+            # Insert user
+            await cursor.execute("""
+                INSERT INTO users (email, phone, first_name, last_name, password_hash, role, vip_code_id, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+                RETURNING id
+            """, (data.email, data.phone, data.first_name, data.last_name, hashed_password, data.role, vip_code_id))
+
+            user_id = (await cursor.fetchone())['id']
+
+            # Update VIP code uses
+            if vip_code_id:
+                await cursor.execute(
+                    "UPDATE vip_codes SET uses_remaining = uses_remaining - 1 WHERE id = %s",
+                    (vip_code_id,)
+                )
+
+            await conn.commit()
+
+            # Create JWT token
+            token = create_jwt_token(user_id, data.email)
+
+            # Set cookie
+            response.set_cookie(
+                key="athlynx_token",
+                value=token,
+                httponly=True,
+                secure=True,
+                samesite="lax",
+                max_age=JWT_EXPIRATION_DAYS * 24 * 60 * 60
             )
-            vip_result = cursor.fetchone()
-            if not vip_result:
-                raise HTTPException(status_code=400, detail="Invalid VIP code")
-            if vip_result['uses_remaining'] <= 0:
-                raise HTTPException(status_code=400, detail="VIP code has no remaining uses")
-            vip_code_id = vip_result['id']
-        
-        # Hash password
-        hashed_password = hash_password(data.password)
-        
-        # Insert user
-        cursor.execute("""
-            INSERT INTO users (email, phone, first_name, last_name, password_hash, role, vip_code_id, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
-        """, (data.email, data.phone, data.first_name, data.last_name, hashed_password, data.role, vip_code_id))
-        
-        user_id = cursor.lastrowid
-        
-        # Update VIP code uses
-        if vip_code_id:
-            cursor.execute(
-                "UPDATE vip_codes SET uses_remaining = uses_remaining - 1 WHERE id = %s",
-                (vip_code_id,)
+
+            return AuthResponse(
+                success=True,
+                message="Registration successful",
+                user={
+                    "id": user_id,
+                    "email": data.email,
+                    "first_name": data.first_name,
+                    "last_name": data.last_name,
+                    "role": data.role
+                },
+                token=token
             )
-        
-        conn.commit()
-        
-        # Create JWT token
-        token = create_jwt_token(user_id, data.email)
-        
-        # Set cookie
-        response.set_cookie(
-            key="athlynx_token",
-            value=token,
-            httponly=True,
-            secure=True,
-            samesite="lax",
-            max_age=JWT_EXPIRATION_DAYS * 24 * 60 * 60
-        )
-        
-        return AuthResponse(
-            success=True,
-            message="Registration successful",
-            user={
-                "id": user_id,
-                "email": data.email,
-                "first_name": data.first_name,
-                "last_name": data.last_name,
-                "role": data.role
-            },
-            token=token
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
+
+        except (HTTPException, *POOL_UNAVAILABLE_ERRORS):
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 @router.post("/login", response_model=AuthResponse)
 async def login(data: LoginRequest, response: Response):
     """Login user"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        # Get user by email
-        cursor.execute(
-            "SELECT id, email, password_hash, first_name, last_name, role FROM users WHERE email = %s",
-            (data.email,)
-        )
-        user = cursor.fetchone()
-        
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid email or password")
-        
-        # Verify password
-        if not verify_password(data.password, user['password_hash']):
-            raise HTTPException(status_code=401, detail="Invalid email or password")
-        
-        # Create JWT token
-        token = create_jwt_token(user['id'], user['email'])
-        
-        # Set cookie
-        response.set_cookie(
-            key="athlynx_token",
-            value=token,
-            httponly=True,
-            secure=True,
-            samesite="lax",
-            max_age=JWT_EXPIRATION_DAYS * 24 * 60 * 60
-        )
-        
-        return AuthResponse(
-            success=True,
-            message="Login successful",
-            user={
-                "id": user['id'],
-                "email": user['email'],
-                "first_name": user['first_name'],
-                "last_name": user['last_name'],
-                "role": user['role']
-            },
-            token=token
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        try:
+            # Get user by email
+            await cursor.execute(
+                "SELECT id, email, password_hash, first_name, last_name, role FROM users WHERE email = %s",
+                (data.email,)
+            )
+            user = await cursor.fetchone()
+
+            if not user:
+                raise HTTPException(status_code=401, detail="Invalid email or password")
+
+            # Verify password
+            if not verify_password(data.password, user['password_hash']):
+                raise HTTPException(status_code=401, detail="Invalid email or password")
+
+            # Create JWT token
+            token = create_jwt_token(user['id'], user['email'])
+
+            # Set cookie
+            response.set_cookie(
+                key="athlynx_token",
+                value=token,
+                httponly=True,
+                secure=True,
+                samesite="lax",
+                max_age=JWT_EXPIRATION_DAYS * 24 * 60 * 60
+            )
+
+            return AuthResponse(
+                success=True,
+                message="Login successful",
+                user={
+                    "id": user['id'],
+                    "email": user['email'],
+                    "first_name": user['first_name'],
+                    "last_name": user['last_name'],
+                    "role": user['role']
+                },
+                token=token
+            )
+
+        except (HTTPException, *POOL_UNAVAILABLE_ERRORS):
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
 
 @router.post("/logout")
 async def logout(response: Response):
@@ -214,26 +205,19 @@ async def get_current_user(athlynx_token: Optional[str] = Cookie(None)):
     """Get current authenticated user"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute(
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(
             "SELECT id, email, first_name, last_name, role, created_at FROM users WHERE id = %s",
             (payload['user_id'],)
         )
-        user = cursor.fetchone()
-        
+        user = await cursor.fetchone()
+
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        
+
         return {"success": True, "user": user}
-        
-    finally:
-        cursor.close()
-        conn.close()
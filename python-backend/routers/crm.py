@@ -1,97 +1,148 @@
 """
 ATHLYNX AI Platform - CRM Router
 """
-from fastapi import APIRouter, HTTPException, Cookie
-from typing import Optional
-from database import get_db_connection
+from fastapi import APIRouter, HTTPException, Cookie, Depends, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, EmailStr
+from typing import Optional, Literal
+import csv
+import io
+from database import stream_query_async, DbSession, get_read_session
 from auth import verify_jwt_token
+from routers.admin import require_admin
+from services.ingest import track_signup
 
 router = APIRouter(prefix="/crm", tags=["CRM"])
 
+# Exportable datasets: name -> (columns, table)
+EXPORTS = {
+    "signups": ([
+        "id", "full_name", "email", "phone", "role", "sport",
+        "referral_source", "utm_source", "utm_medium", "utm_campaign",
+        "signup_type", "created_at"
+    ], "signup_analytics"),
+    "waitlist": ([
+        "id", "full_name", "email", "phone", "role", "sport", "referral_code", "created_at"
+    ], "waitlist"),
+}
+
+class SignupEvent(BaseModel):
+    fullName: str
+    email: EmailStr
+    phone: Optional[str] = None
+    role: Optional[str] = None
+    sport: Optional[str] = None
+    referralSource: Optional[str] = None
+    utmSource: Optional[str] = None
+    utmMedium: Optional[str] = None
+    utmCampaign: Optional[str] = None
+    signupType: Optional[Literal["waitlist", "vip", "direct", "referral"]] = None
+
+@router.post("/track-signup")
+async def track_signup_event(data: SignupEvent, request: Request):
+    """Record a signup for CRM analytics; buffered and written in batches"""
+    forwarded = request.headers.get("x-forwarded-for", "").split(",")[0].strip()
+    ip_address = forwarded or request.headers.get("x-real-ip") or (request.client.host if request.client else None)
+
+    await track_signup({
+        **data.model_dump(),
+        "ipAddress": ip_address,
+        "userAgent": request.headers.get("user-agent"),
+    })
+    return {"success": True}
+
 @router.get("/dashboard")
-async def get_crm_dashboard(athlynx_token: Optional[str] = Cookie(None)):
+async def get_crm_dashboard(athlynx_token: Optional[str] = Cookie(None), db: DbSession = Depends(get_read_session)):
     """Get CRM dashboard data"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
+
+    db.user_id = payload['user_id']
+    users, waitlist, recent_signups, users_by_role = await db.gather(
         # Total users
-        cursor.execute("SELECT COUNT(*) as total FROM users")
-        total_users = cursor.fetchone()['total']
-        
+        ("SELECT COUNT(*) as total FROM users", None),
         # Total waitlist
-        cursor.execute("SELECT COUNT(*) as total FROM waitlist")
-        total_waitlist = cursor.fetchone()['total']
-        
+        ("SELECT COUNT(*) as total FROM waitlist", None),
         # Recent signups
-        cursor.execute("""
+        ("""
             SELECT id, email, first_name, last_name, created_at
             FROM users
             ORDER BY created_at DESC
             LIMIT 10
-        """)
-        recent_signups = cursor.fetchall()
-        
+        """, None),
         # Users by role
-        cursor.execute("""
+        ("""
             SELECT role, COUNT(*) as count
             FROM users
             GROUP BY role
-        """)
-        users_by_role = cursor.fetchall()
-        
-        return {
-            "success": True,
-            "total_users": total_users,
-            "total_waitlist": total_waitlist,
-            "recent_signups": recent_signups,
-            "users_by_role": users_by_role
-        }
-        
-    finally:
-        cursor.close()
-        conn.close()
+        """, None),
+    )
+
+    return {
+        "success": True,
+        "total_users": users[0]['total'],
+        "total_waitlist": waitlist[0]['total'],
+        "recent_signups": recent_signups,
+        "users_by_role": users_by_role
+    }
 
 @router.get("/analytics")
-async def get_analytics(athlynx_token: Optional[str] = Cookie(None)):
+async def get_analytics(athlynx_token: Optional[str] = Cookie(None), db: DbSession = Depends(get_read_session)):
     """Get platform analytics"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
+
+    db.user_id = payload['user_id']
+    posts, messages, athletes = await db.gather(
         # Total posts
-        cursor.execute("SELECT COUNT(*) as total FROM posts")
-        total_posts = cursor.fetchone()['total']
-        
+        ("SELECT COUNT(*) as total FROM posts", None),
         # Total messages
-        cursor.execute("SELECT COUNT(*) as total FROM messages")
-        total_messages = cursor.fetchone()['total']
-        
+        ("SELECT COUNT(*) as total FROM messages", None),
         # Active athletes
-        cursor.execute("SELECT COUNT(*) as total FROM athlete_profiles")
-        active_athletes = cursor.fetchone()['total']
-        
-        return {
-            "success": True,
-            "total_posts": total_posts,
-            "total_messages": total_messages,
-            "active_athletes": active_athletes
-        }
-        
-    finally:
-        cursor.close()
-        conn.close()
+        ("SELECT COUNT(*) as total FROM athlete_profiles", None),
+    )
+
+    return {
+        "success": True,
+        "total_posts": posts[0]['total'],
+        "total_messages": messages[0]['total'],
+        "active_athletes": athletes[0]['total']
+    }
+
+async def _csv_stream(columns, table):
+    """Encode a streamed query as CSV chunks, one chunk per fetched batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    query = f"SELECT {', '.join(columns)} FROM {table} ORDER BY id"
+    async for batch in stream_query_async(query, row_format='tuple'):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    yield buffer.getvalue()
+
+@router.get("/export/{dataset}")
+async def export_dataset(dataset: str, athlynx_token: Optional[str] = Cookie(None)):
+    """Export a CRM dataset as CSV; contains contact details, so admins only"""
+    await require_admin(athlynx_token)
+
+    if dataset not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+
+    columns, table = EXPORTS[dataset]
+    return StreamingResponse(
+        _csv_stream(columns, table),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.csv"'}
+    )
@@ -2,14 +2,34 @@
 ATHLYNX AI Platform - Social Feed Router
 Handles social feed posts, likes, comments
 """
-from fastapi import APIRouter, HTTPException, Cookie
+import os
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Cookie, Query
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from typing import Optional, List
-from database import get_db_connection
+from typing import Optional, List, Dict
+from database import get_async_db_connection, register_statement, decode_cursor, next_cursor, InvalidCursor, POOL_UNAVAILABLE_ERRORS
 from auth import verify_jwt_token
+from services.counters import adjust_comments
+from services.likes import like_buffer, LIKE_WRITE_BEHIND
+from services.timeline import home_timeline, page_ids_query, page_params
+from services.cache import ResponseCache
+from services import events
 
 router = APIRouter(prefix="/feed", tags=["Feed"])
 
+# Pages of the global feed, shared by every caller. Any post, like or
+# comment makes all cached pages stale.
+feed_cache = ResponseCache(
+    "feed",
+    ttl=float(os.getenv("FEED_CACHE_TTL", "5")),
+    stale_ttl=float(os.getenv("FEED_CACHE_STALE_TTL", "30")),
+    max_entries=int(os.getenv("FEED_CACHE_MAX_ENTRIES", "512")),
+    shared_path=os.getenv("FEED_CACHE_SHARED_PATH") or None,
+)
+for event in (events.POST_CREATED, events.POST_LIKED, events.COMMENT_CREATED):
+    events.subscribe(event, feed_cache.invalidate)
+
 class CreatePost(BaseModel):
     content: str
     media_url: Optional[str] = None
@@ -19,157 +39,302 @@ class CreateComment(BaseModel):
     post_id: int
     content: str
 
+FEED_COLUMNS = """
+    p.id, p.content, p.media_url, p.media_type, p.created_at,
+    u.id as user_id, u.first_name, u.last_name, u.email,
+    COALESCE(s.likes_count, 0) as likes_count,
+    COALESCE(s.comments_count, 0) as comments_count
+"""
+
+# Counts come from the denormalized post_stats row (services/counters.py)
+FEED_FROM = """
+    FROM posts p
+    JOIN users u ON p.user_id = u.id
+    LEFT JOIN post_stats s ON s.post_id = p.id
+"""
+
+FEED_LIST = register_statement("feed_list", f"""
+    SELECT {FEED_COLUMNS}
+    {FEED_FROM}
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT %s OFFSET %s
+""", ("int4", "int4"))
+
+# Keyset page: seeks past the (created_at, id) of the previous page's last post
+FEED_LIST_AFTER = register_statement("feed_list_after", f"""
+    SELECT {FEED_COLUMNS}
+    {FEED_FROM}
+    WHERE (p.created_at, p.id) < (%s, %s)
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT %s
+""", ("timestamptz", "int8", "int4"))
+
+FEED_CURSOR_KEY = ("created_at", "id")
+FEED_CURSOR_TYPES = (datetime, int)
+
+def _home_statement(name: str, seek: bool):
+    page_query, page_types = page_ids_query(seek)
+    return register_statement(name, f"""
+        WITH page AS ({page_query})
+        SELECT {FEED_COLUMNS}
+        FROM page
+        JOIN posts p ON p.id = page.post_id
+        JOIN users u ON p.user_id = u.id
+        LEFT JOIN post_stats s ON s.post_id = p.id
+        ORDER BY p.created_at DESC, p.id DESC
+    """, page_types)
+
+# Home timeline of the people the caller follows (services/timeline.py)
+HOME_FEED = _home_statement("home_feed", seek=False)
+HOME_FEED_AFTER = _home_statement("home_feed_after", seek=True)
+
 @router.get("/list")
-async def get_feed(limit: int = 20, offset: int = 0):
+async def get_feed(limit: int = 20, offset: int = 0, after: Optional[str] = Query(None, alias="cursor")):
     """Get social feed posts"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
     try:
-        cursor.execute("""
-            SELECT 
-                p.id, p.content, p.media_url, p.media_type, p.created_at,
-                u.id as user_id, u.first_name, u.last_name, u.email,
-                (SELECT COUNT(*) FROM post_likes WHERE post_id = p.id) as likes_count,
-                (SELECT COUNT(*) FROM post_comments WHERE post_id = p.id) as comments_count
-            FROM posts p
-            JOIN users u ON p.user_id = u.id
-            ORDER BY p.created_at DESC
-            LIMIT %s OFFSET %s
-        """, (limit, offset))
-        
-        posts = cursor.fetchall()
-        return {"success": True, "posts": posts}
-        
-    finally:
-        cursor.close()
-        conn.close()
+        key = decode_cursor(after, FEED_CURSOR_TYPES) if after else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def load_page():
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            if key:
+                await FEED_LIST_AFTER.execute(cursor, (*key, limit))
+            else:
+                await FEED_LIST.execute(cursor, (limit, offset))
+
+            posts = await cursor.fetchall()
+            return jsonable_encoder({"success": True, "posts": posts, "next_cursor": next_cursor(posts, limit, FEED_CURSOR_KEY)})
+
+    cache_key = f"list:{limit}:{after}" if key else f"list:{limit}:{offset}"
+    return await feed_cache.get(cache_key, load_page)
+
+# Like or unlike in one round-trip: deletes the like if present, otherwise
+# inserts it, and moves the post's counter in the same statement. The unique
+# (post_id, user_id) index makes a concurrent double-click settle on "liked".
+LIKE_TOGGLE = register_statement("like_toggle", """
+    WITH removed AS (
+        DELETE FROM post_likes WHERE post_id = %s AND user_id = %s
+        RETURNING post_id
+    ), added AS (
+        INSERT INTO post_likes (post_id, user_id, created_at)
+        SELECT %s, %s, NOW()
+        WHERE NOT EXISTS (SELECT 1 FROM removed)
+        ON CONFLICT (post_id, user_id) DO NOTHING
+        RETURNING post_id
+    ), change AS (
+        SELECT (SELECT COUNT(*) FROM added) - (SELECT COUNT(*) FROM removed) AS delta
+    ), counted AS (
+        INSERT INTO post_stats (post_id, likes_count, updated_at)
+        SELECT %s, GREATEST(delta, 0), NOW() FROM change WHERE delta <> 0
+        ON CONFLICT (post_id) DO UPDATE
+        SET likes_count = GREATEST(post_stats.likes_count + (SELECT delta FROM change), 0),
+            updated_at = NOW()
+    )
+    SELECT CASE WHEN EXISTS (SELECT 1 FROM removed) THEN 'unliked' ELSE 'liked' END AS action
+""", ("int4", "int4", "int4", "int4", "int4"))
+
+@router.get("/home")
+async def get_home_feed(limit: int = 20, after: Optional[str] = Query(None, alias="cursor"), athlynx_token: Optional[str] = Cookie(None)):
+    """Get the caller's home timeline"""
+    if not athlynx_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    payload = verify_jwt_token(athlynx_token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    try:
+        key = decode_cursor(after, FEED_CURSOR_TYPES) if after else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    statement = HOME_FEED_AFTER if key else HOME_FEED
+    async with get_async_db_connection(read_only=True, user_id=payload['user_id']) as conn, conn.cursor() as cursor:
+        await statement.execute(cursor, page_params(payload['user_id'], key, limit))
+        posts = await cursor.fetchall()
+        return {"success": True, "posts": posts, "next_cursor": next_cursor(posts, limit, FEED_CURSOR_KEY)}
 
 @router.post("/create")
 async def create_post(data: CreatePost, athlynx_token: Optional[str] = Cookie(None)):
     """Create a new post"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            INSERT INTO posts (user_id, content, media_url, media_type, created_at)
-            VALUES (%s, %s, %s, %s, NOW())
-        """, (payload['user_id'], data.content, data.media_url, data.media_type))
-        
-        post_id = cursor.lastrowid
-        conn.commit()
-        
-        return {"success": True, "post_id": post_id}
-        
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        try:
+            await cursor.execute("""
+                INSERT INTO posts (user_id, content, media_url, media_type, created_at)
+                VALUES (%s, %s, %s, %s, NOW())
+                RETURNING id, created_at
+            """, (payload['user_id'], data.content, data.media_url, data.media_type))
+
+            post = await cursor.fetchone()
+            post_id = post['id']
+            await cursor.execute("INSERT INTO post_stats (post_id) VALUES (%s)", (post_id,))
+            await conn.commit()
+
+            # Push into followers' home timelines once committed
+            home_timeline.post_created(post_id, payload['user_id'], post['created_at'])
+            events.emit(events.POST_CREATED, post_id=post_id, user_id=payload['user_id'])
+
+            return {"success": True, "post_id": post_id}
+
+        except POOL_UNAVAILABLE_ERRORS:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/like/{post_id}")
 async def like_post(post_id: int, athlynx_token: Optional[str] = Cookie(None)):
     """Like a post"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        # Check if already liked
-        cursor.execute("""
-            SELECT id FROM post_likes WHERE post_id = %s AND user_id = %s
-        """, (post_id, payload['user_id']))
-        
-        if cursor.fetchone():
-            # Unlike
-            cursor.execute("""
-                DELETE FROM post_likes WHERE post_id = %s AND user_id = %s
-            """, (post_id, payload['user_id']))
-            action = "unliked"
-        else:
-            # Like
-            cursor.execute("""
-                INSERT INTO post_likes (post_id, user_id, created_at)
-                VALUES (%s, %s, NOW())
-            """, (post_id, payload['user_id']))
-            action = "liked"
-        
-        conn.commit()
+
+    if LIKE_WRITE_BEHIND:
+        # Coalesced with other toggles and written on the next flush
+        action = await like_buffer.toggle(post_id, payload['user_id'])
+        events.emit(events.LIKE_TOGGLED, post_id=post_id, user_id=payload['user_id'], action=action)
         return {"success": True, "action": action}
-        
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        try:
+            await LIKE_TOGGLE.execute(cursor, (post_id, payload['user_id'], post_id, payload['user_id'], post_id))
+            action = (await cursor.fetchone())['action']
+
+            await conn.commit()
+            events.emit(events.POST_LIKED, post_id=post_id, user_id=payload['user_id'], action=action)
+            events.emit(events.LIKE_TOGGLED, post_id=post_id, user_id=payload['user_id'], action=action)
+            return {"success": True, "action": action}
+
+        except POOL_UNAVAILABLE_ERRORS:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/comment")
 async def create_comment(data: CreateComment, athlynx_token: Optional[str] = Cookie(None)):
     """Comment on a post"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            INSERT INTO post_comments (post_id, user_id, content, created_at)
-            VALUES (%s, %s, %s, NOW())
-        """, (data.post_id, payload['user_id'], data.content))
-        
-        comment_id = cursor.lastrowid
-        conn.commit()
-        
-        return {"success": True, "comment_id": comment_id}
-        
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        try:
+            await cursor.execute("""
+                INSERT INTO post_comments (post_id, user_id, content, created_at)
+                VALUES (%s, %s, %s, NOW())
+                RETURNING id
+            """, (data.post_id, payload['user_id'], data.content))
+
+            comment_id = (await cursor.fetchone())['id']
+            await adjust_comments(cursor, data.post_id, 1)
+            await conn.commit()
+            events.emit(events.COMMENT_CREATED, post_id=data.post_id, comment_id=comment_id, user_id=payload['user_id'])
+
+            return {"success": True, "comment_id": comment_id}
+
+        except POOL_UNAVAILABLE_ERRORS:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+
+COMMENT_COLUMNS = """
+    c.id, c.content, c.created_at,
+    u.id as user_id, u.first_name, u.last_name
+"""
+
+# Threads read oldest first; keyset pages seek past (created_at, id)
+COMMENT_THREAD = register_statement("comment_thread", f"""
+    SELECT {COMMENT_COLUMNS}
+    FROM post_comments c
+    JOIN users u ON c.user_id = u.id
+    WHERE c.post_id = %s
+    ORDER BY c.created_at ASC, c.id ASC
+    LIMIT %s
+""", ("int4", "int4"))
+
+COMMENT_THREAD_AFTER = register_statement("comment_thread_after", f"""
+    SELECT {COMMENT_COLUMNS}
+    FROM post_comments c
+    JOIN users u ON c.user_id = u.id
+    WHERE c.post_id = %s AND (c.created_at, c.id) > (%s, %s)
+    ORDER BY c.created_at ASC, c.id ASC
+    LIMIT %s
+""", ("int4", "timestamptz", "int8", "int4"))
+
+# First K comments of each requested post, one index range scan per post
+COMMENT_PREVIEWS = f"""
+    SELECT ids.post_id, {COMMENT_COLUMNS}
+    FROM unnest(%s::int[]) AS ids(post_id)
+    CROSS JOIN LATERAL (
+        SELECT id, content, created_at, user_id
+        FROM post_comments
+        WHERE post_id = ids.post_id
+        ORDER BY created_at ASC, id ASC
+        LIMIT %s
+    ) c
+    JOIN users u ON c.user_id = u.id
+    ORDER BY ids.post_id, c.created_at ASC, c.id ASC
+"""
+
+COMMENT_CURSOR_KEY = ("created_at", "id")
+COMMENT_CURSOR_TYPES = (datetime, int)
+MAX_COMMENT_PAGE = 100
+MAX_BATCH_POSTS = 100
+
+@router.get("/comments/batch")
+async def get_comments_batch(post_ids: List[int] = Query(...), per_post: int = Query(3, ge=1, le=20)):
+    """Get the first comments of many posts at once"""
+    post_ids = list(dict.fromkeys(post_ids))
+    if len(post_ids) > MAX_BATCH_POSTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_POSTS} posts per request")
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute(COMMENT_PREVIEWS, (post_ids, per_post))
+        rows = await cursor.fetchall()
+
+    comments: Dict[int, List[dict]] = {post_id: [] for post_id in post_ids}
+    for row in rows:
+        comments[row.pop('post_id')].append(row)
+
+    return {
+        "success": True,
+        "comments": comments,
+        # Cursor to continue each thread with /comments/{post_id}
+        "next_cursors": {
+            post_id: next_cursor(thread, per_post, COMMENT_CURSOR_KEY)
+            for post_id, thread in comments.items()
+        }
+    }
 
 @router.get("/comments/{post_id}")
-async def get_comments(post_id: int):
+async def get_comments(post_id: int, limit: int = Query(50, ge=1, le=MAX_COMMENT_PAGE), after: Optional[str] = Query(None, alias="cursor")):
     """Get comments for a post"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
     try:
-        cursor.execute("""
-            SELECT 
-                c.id, c.content, c.created_at,
-                u.id as user_id, u.first_name, u.last_name
-            FROM post_comments c
-            JOIN users u ON c.user_id = u.id
-            WHERE c.post_id = %s
-            ORDER BY c.created_at ASC
-        """, (post_id,))
-        
-        comments = cursor.fetchall()
-        return {"success": True, "comments": comments}
-        
-    finally:
-        cursor.close()
-        conn.close()
+        key = decode_cursor(after, COMMENT_CURSOR_TYPES) if after else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        if key:
+            await COMMENT_THREAD_AFTER.execute(cursor, (post_id, *key, limit))
+        else:
+            await COMMENT_THREAD.execute(cursor, (post_id, limit))
+
+        comments = await cursor.fetchall()
+        return {"success": True, "comments": comments, "next_cursor": next_cursor(comments, limit, COMMENT_CURSOR_KEY)}
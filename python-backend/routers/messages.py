@@ -2,11 +2,14 @@
 ATHLYNX AI Platform - Messages Router
 Handles private messaging
 """
-from fastapi import APIRouter, HTTPException, Cookie
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Cookie, Query
 from pydantic import BaseModel
 from typing import Optional
-from database import get_db_connection
+from database import get_async_db_connection, register_statement, decode_cursor, next_cursor, InvalidCursor, POOL_UNAVAILABLE_ERRORS
 from auth import verify_jwt_token
+from services.realtime import realtime_hub
+from services import events
 
 router = APIRouter(prefix="/messages", tags=["Messages"])
 
@@ -14,127 +17,269 @@ class SendMessage(BaseModel):
     recipient_id: int
     content: str
 
+PREVIEW_LENGTH = 200
+MAX_PAGE = 100
+# Unread counts stop counting here; clients show "999+"
+UNREAD_COUNT_CAP = 999
+
+# Stores the message and refreshes both participants' conversation
+# summaries in one statement. Parameters: sender, recipient, content,
+# preview length (twice).
+SEND_MESSAGE = register_statement("messages_send", """
+    WITH sent AS (
+        INSERT INTO messages (sender_id, recipient_id, content, created_at)
+        VALUES (%s, %s, %s, NOW())
+        RETURNING id, sender_id, recipient_id, content, created_at
+    ), summarized AS (
+        INSERT INTO conversation_summaries (
+            user_id, peer_id, last_message_id, last_sender_id, last_message_preview, last_message_at
+        )
+        SELECT sides.user_id, sides.peer_id, sent.id, sent.sender_id, LEFT(sent.content, %s), sent.created_at
+        FROM sent
+        CROSS JOIN LATERAL (
+            VALUES (sent.sender_id, sent.recipient_id), (sent.recipient_id, sent.sender_id)
+        ) AS sides(user_id, peer_id)
+        ORDER BY sides.user_id
+        ON CONFLICT (user_id, peer_id) DO UPDATE
+        SET last_message_id = EXCLUDED.last_message_id,
+            last_sender_id = EXCLUDED.last_sender_id,
+            last_message_preview = EXCLUDED.last_message_preview,
+            last_message_at = EXCLUDED.last_message_at
+    )
+    SELECT id, created_at, LEFT(content, %s) AS preview FROM sent
+""", ("int4", "int4", "text", "int4", "int4"))
+
+# Unread = messages from the peer past the conversation's read watermark,
+# an index range on (recipient_id, sender_id, id)
+INBOX_COLUMNS = f"""
+    s.peer_id, s.last_message_id, s.last_sender_id, s.last_message_preview,
+    s.last_message_at, s.last_read_message_id,
+    (SELECT COUNT(*) FROM (
+        SELECT 1 FROM messages
+        WHERE recipient_id = s.user_id AND sender_id = s.peer_id AND id > s.last_read_message_id
+        LIMIT {UNREAD_COUNT_CAP}
+    ) unread) AS unread_count,
+    u.first_name, u.last_name
+"""
+
+INBOX = register_statement("messages_inbox", f"""
+    SELECT {INBOX_COLUMNS}
+    FROM conversation_summaries s
+    JOIN users u ON s.peer_id = u.id
+    WHERE s.user_id = %s
+    ORDER BY s.last_message_at DESC, s.peer_id DESC
+    LIMIT %s
+""", ("int4", "int4"))
+
+INBOX_AFTER = register_statement("messages_inbox_after", f"""
+    SELECT {INBOX_COLUMNS}
+    FROM conversation_summaries s
+    JOIN users u ON s.peer_id = u.id
+    WHERE s.user_id = %s AND (s.last_message_at, s.peer_id) < (%s, %s)
+    ORDER BY s.last_message_at DESC, s.peer_id DESC
+    LIMIT %s
+""", ("int4", "timestamptz", "int8", "int4"))
+
+INBOX_CURSOR_KEY = ("last_message_at", "peer_id")
+INBOX_CURSOR_TYPES = (datetime, int)
+
+def _thread_statement(name: str, seek: bool):
+    # One index range per direction instead of an OR across both
+    seek_clause = "AND (created_at, id) < (%s, %s)" if seek else ""
+    seek_types = ("timestamptz", "int8") if seek else ()
+    direction = f"""
+        SELECT id, sender_id, recipient_id, content, created_at
+        FROM messages
+        WHERE sender_id = %s AND recipient_id = %s {seek_clause}
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s
+    """
+    return register_statement(name, f"""
+        SELECT
+            m.id, m.content, m.created_at,
+            m.id <= COALESCE(r.last_read_message_id, 0) AS is_read,
+            m.sender_id, m.recipient_id,
+            u.first_name, u.last_name
+        FROM (({direction}) UNION ALL ({direction})) m
+        JOIN users u ON m.sender_id = u.id
+        LEFT JOIN conversation_summaries r ON r.user_id = m.recipient_id AND r.peer_id = m.sender_id
+        ORDER BY m.created_at DESC, m.id DESC
+        LIMIT %s
+    """, ("int4", "int4", *seek_types, "int4") * 2 + ("int4",))
+
+# Newest page first; the cursor walks back to older messages
+THREAD = _thread_statement("messages_thread", seek=False)
+THREAD_AFTER = _thread_statement("messages_thread_after", seek=True)
+
+THREAD_CURSOR_KEY = ("created_at", "id")
+THREAD_CURSOR_TYPES = (datetime, int)
+
+# Moves a conversation's watermark forward to up_to, or to its last message
+# when up_to is NULL. Never moves it back. Parameters: up_to, user, peer.
+MARK_CONVERSATION_READ = register_statement("messages_mark_read", f"""
+    UPDATE conversation_summaries s
+    SET last_read_message_id = GREATEST(s.last_read_message_id, LEAST(COALESCE(%s, s.last_message_id), s.last_message_id))
+    WHERE s.user_id = %s AND s.peer_id = %s
+    RETURNING
+        s.peer_id, s.last_read_message_id,
+        (SELECT COUNT(*) FROM (
+            SELECT 1 FROM messages
+            WHERE recipient_id = s.user_id AND sender_id = s.peer_id AND id > s.last_read_message_id
+            LIMIT {UNREAD_COUNT_CAP}
+        ) unread) AS unread_count
+""", ("int4", "int4", "int4"))
+
 @router.post("/send")
 async def send_message(data: SendMessage, athlynx_token: Optional[str] = Cookie(None)):
     """Send a private message"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            INSERT INTO messages (sender_id, recipient_id, content, created_at)
-            VALUES (%s, %s, %s, NOW())
-        """, (payload['user_id'], data.recipient_id, data.content))
-        
-        message_id = cursor.lastrowid
-        conn.commit()
-        
-        return {"success": True, "message_id": message_id}
-        
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+
+    if data.recipient_id == payload['user_id']:
+        raise HTTPException(status_code=400, detail="Cannot message yourself")
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        try:
+            await SEND_MESSAGE.execute(cursor, (payload['user_id'], data.recipient_id, data.content, PREVIEW_LENGTH, PREVIEW_LENGTH))
+
+            sent = await cursor.fetchone()
+            message_id = sent['id']
+            await conn.commit()
+
+            await realtime_hub.publish(data.recipient_id, "message", {
+                "id": message_id,
+                "sender_id": payload['user_id'],
+                "preview": sent['preview'],
+                "created_at": sent['created_at'],
+            })
+            events.emit(events.MESSAGE_SENT, message_id=message_id, sender_id=payload['user_id'], recipient_id=data.recipient_id)
+
+            return {"success": True, "message_id": message_id}
+
+        except POOL_UNAVAILABLE_ERRORS:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/inbox")
-async def get_inbox(athlynx_token: Optional[str] = Cookie(None)):
-    """Get user's inbox"""
+async def get_inbox(limit: int = Query(20, ge=1, le=MAX_PAGE), after: Optional[str] = Query(None, alias="cursor"), athlynx_token: Optional[str] = Cookie(None)):
+    """Get user's conversations, most recent first"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
+
     try:
-        cursor.execute("""
-            SELECT 
-                m.id, m.content, m.created_at, m.is_read,
-                u.id as sender_id, u.first_name, u.last_name
-            FROM messages m
-            JOIN users u ON m.sender_id = u.id
-            WHERE m.recipient_id = %s
-            ORDER BY m.created_at DESC
-        """, (payload['user_id'],))
-        
-        messages = cursor.fetchall()
-        return {"success": True, "messages": messages}
-        
-    finally:
-        cursor.close()
-        conn.close()
+        key = decode_cursor(after, INBOX_CURSOR_TYPES) if after else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        if key:
+            await INBOX_AFTER.execute(cursor, (payload['user_id'], *key, limit))
+        else:
+            await INBOX.execute(cursor, (payload['user_id'], limit))
+
+        conversations = await cursor.fetchall()
+        return {
+            "success": True,
+            "conversations": conversations,
+            "next_cursor": next_cursor(conversations, limit, INBOX_CURSOR_KEY)
+        }
 
 @router.get("/conversation/{user_id}")
-async def get_conversation(user_id: int, athlynx_token: Optional[str] = Cookie(None)):
-    """Get conversation with a specific user"""
+async def get_conversation(user_id: int, limit: int = Query(50, ge=1, le=MAX_PAGE), after: Optional[str] = Query(None, alias="cursor"), athlynx_token: Optional[str] = Cookie(None)):
+    """Get conversation with a specific user, one page at a time"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
+
     try:
-        cursor.execute("""
-            SELECT 
-                m.id, m.content, m.created_at, m.is_read,
-                m.sender_id, m.recipient_id,
-                u.first_name, u.last_name
-            FROM messages m
-            JOIN users u ON (m.sender_id = u.id OR m.recipient_id = u.id)
-            WHERE (m.sender_id = %s AND m.recipient_id = %s)
-               OR (m.sender_id = %s AND m.recipient_id = %s)
-            ORDER BY m.created_at ASC
-        """, (payload['user_id'], user_id, user_id, payload['user_id']))
-        
-        messages = cursor.fetchall()
-        return {"success": True, "messages": messages}
-        
-    finally:
-        cursor.close()
-        conn.close()
+        key = decode_cursor(after, THREAD_CURSOR_TYPES) if after else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    me = payload['user_id']
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        if key:
+            await THREAD_AFTER.execute(cursor, (me, user_id, *key, limit, user_id, me, *key, limit, limit))
+        else:
+            await THREAD.execute(cursor, (me, user_id, limit, user_id, me, limit, limit))
+
+        page = await cursor.fetchall()
+        return {
+            "success": True,
+            # Oldest first within the page, as the thread is displayed
+            "messages": page[::-1],
+            # Cursor for the next older page
+            "next_cursor": next_cursor(page, limit, THREAD_CURSOR_KEY)
+        }
+
+@router.post("/conversation/{user_id}/read")
+async def mark_conversation_read(user_id: int, up_to: Optional[int] = None, athlynx_token: Optional[str] = Cookie(None)):
+    """Mark every message from user_id up to message up_to (default: all of them) as read"""
+    if not athlynx_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    payload = verify_jwt_token(athlynx_token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        try:
+            await MARK_CONVERSATION_READ.execute(cursor, (up_to, payload['user_id'], user_id))
+            state = await cursor.fetchone()
+            if not state:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+
+            await conn.commit()
+            return {
+                "success": True,
+                "last_read_message_id": state['last_read_message_id'],
+                "unread_count": state['unread_count']
+            }
+
+        except (HTTPException, *POOL_UNAVAILABLE_ERRORS):
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/mark-read/{message_id}")
 async def mark_message_read(message_id: int, athlynx_token: Optional[str] = Cookie(None)):
-    """Mark message as read"""
+    """Mark message as read, along with everything before it in its conversation"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            UPDATE messages
-            SET is_read = 1
-            WHERE id = %s AND recipient_id = %s
-        """, (message_id, payload['user_id']))
-        
-        conn.commit()
-        return {"success": True}
-        
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        try:
+            await cursor.execute("""
+                UPDATE conversation_summaries s
+                SET last_read_message_id = GREATEST(s.last_read_message_id, m.id)
+                FROM messages m
+                WHERE m.id = %s AND m.recipient_id = %s
+                  AND s.user_id = m.recipient_id AND s.peer_id = m.sender_id
+            """, (message_id, payload['user_id']))
+
+            await conn.commit()
+            return {"success": True}
+
+        except POOL_UNAVAILABLE_ERRORS:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
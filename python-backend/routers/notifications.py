@@ -3,66 +3,118 @@ ATHLYNX AI Platform - Notifications Router
 """
 from fastapi import APIRouter, HTTPException, Cookie
 from typing import Optional
-from database import get_db_connection
+from database import get_async_db_connection, register_statement, POOL_UNAVAILABLE_ERRORS
 from auth import verify_jwt_token
+from services.notifications import unread_counts
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
+# Unread counts stop counting here; clients show "999+"
+UNREAD_COUNT_CAP = 999
+
+# Read state is a per-user watermark: every notification with an id at or
+# below last_read_notification_id is read
+NOTIFICATION_LIST = register_statement("notifications_list", """
+    WITH state AS (
+        SELECT COALESCE(MAX(last_read_notification_id), 0) AS watermark
+        FROM notification_read_state WHERE user_id = %s
+    )
+    SELECT n.id, n.type, n.title, n.message, n.id <= state.watermark AS is_read, n.created_at
+    FROM state
+    JOIN notifications n ON n.user_id = %s
+    ORDER BY n.id DESC
+    LIMIT 50
+""", ("int4", "int4"))
+
+# Only run when the unread count is not cached (services/notifications.py)
+UNREAD_COUNT = register_statement("notifications_unread_count", f"""
+    SELECT COUNT(*) AS unread_count FROM (
+        SELECT 1 FROM notifications
+        WHERE user_id = %s AND id > (
+            SELECT COALESCE(MAX(last_read_notification_id), 0)
+            FROM notification_read_state WHERE user_id = %s
+        )
+        LIMIT {UNREAD_COUNT_CAP}
+    ) unread
+""", ("int4", "int4"))
+
+# Moves the watermark forward to up_to, or to the newest notification when
+# up_to is NULL. Never moves it back, nor past the user's newest
+# notification. Parameters: user, up_to, user.
+MARK_NOTIFICATIONS_READ = register_statement("notifications_mark_read", """
+    INSERT INTO notification_read_state (user_id, last_read_notification_id, updated_at)
+    SELECT %s, COALESCE(LEAST(COALESCE(%s, MAX(id)), MAX(id)), 0), NOW()
+    FROM notifications WHERE user_id = %s
+    ON CONFLICT (user_id) DO UPDATE
+    SET last_read_notification_id = GREATEST(
+            notification_read_state.last_read_notification_id, EXCLUDED.last_read_notification_id
+        ),
+        updated_at = NOW()
+    RETURNING last_read_notification_id
+""", ("int4", "int4", "int4"))
+
 @router.get("/list")
 async def get_notifications(athlynx_token: Optional[str] = Cookie(None)):
     """Get user notifications"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
+
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        user_id = payload['user_id']
+        await NOTIFICATION_LIST.execute(cursor, (user_id, user_id))
+        notifications = await cursor.fetchall()
+
+        unread_count = unread_counts.get(user_id)
+        if unread_count is None:
+            await UNREAD_COUNT.execute(cursor, (user_id, user_id))
+            unread_count = (await cursor.fetchone())['unread_count']
+            unread_counts.set(user_id, unread_count)
+
+        return {"success": True, "notifications": notifications, "unread_count": unread_count}
+
+async def _advance_watermark(user_id: int, up_to: Optional[int]) -> int:
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        await MARK_NOTIFICATIONS_READ.execute(cursor, (user_id, up_to, user_id))
+        watermark = (await cursor.fetchone())['last_read_notification_id']
+    unread_counts.invalidate(user_id)
+    return watermark
+
+@router.post("/mark-read")
+async def mark_notifications_read(up_to: Optional[int] = None, athlynx_token: Optional[str] = Cookie(None)):
+    """Mark every notification up to up_to (default: all of them) as read"""
+    if not athlynx_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    payload = verify_jwt_token(athlynx_token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
     try:
-        cursor.execute("""
-            SELECT id, type, title, message, is_read, created_at
-            FROM notifications
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-            LIMIT 50
-        """, (payload['user_id'],))
-        
-        notifications = cursor.fetchall()
-        return {"success": True, "notifications": notifications}
-        
-    finally:
-        cursor.close()
-        conn.close()
+        watermark = await _advance_watermark(payload['user_id'], up_to)
+        return {"success": True, "last_read_notification_id": watermark}
+    except POOL_UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/mark-read/{notification_id}")
 async def mark_notification_read(notification_id: int, athlynx_token: Optional[str] = Cookie(None)):
-    """Mark notification as read"""
+    """Mark notification as read, along with everything older"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
+
     try:
-        cursor.execute("""
-            UPDATE notifications
-            SET is_read = 1
-            WHERE id = %s AND user_id = %s
-        """, (notification_id, payload['user_id']))
-        
-        conn.commit()
+        await _advance_watermark(payload['user_id'], notification_id)
         return {"success": True}
-        
+    except POOL_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
@@ -0,0 +1,75 @@
+"""
+ATHLYNX AI Platform - Real-Time Router
+Pushes new messages and notifications to connected clients over
+Server-Sent Events or WebSocket
+"""
+import json
+import asyncio
+from fastapi import APIRouter, HTTPException, Cookie, Request, WebSocket
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from auth import verify_jwt_token
+from services.realtime import realtime_hub, json_default
+
+router = APIRouter(prefix="/realtime", tags=["Real-Time"])
+
+# Idle connections get a keep-alive this often so proxies don't close them
+HEARTBEAT_SECONDS = 15
+
+@router.get("/stream")
+async def event_stream(request: Request, athlynx_token: Optional[str] = Cookie(None)):
+    """Server-Sent Events stream of the caller's messages and notifications"""
+    if not athlynx_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    payload = verify_jwt_token(athlynx_token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    subscription = realtime_hub.subscribe(payload['user_id'])
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.next(HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event['data'], default=json_default)}\n\n"
+        finally:
+            realtime_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws")
+async def event_socket(websocket: WebSocket):
+    """WebSocket stream of the caller's messages and notifications"""
+    token = websocket.cookies.get("athlynx_token")
+    payload = verify_jwt_token(token) if token else None
+    if not payload:
+        await websocket.close(code=4401)
+        return
+
+    await websocket.accept()
+    subscription = realtime_hub.subscribe(payload['user_id'])
+
+    async def send_events():
+        while True:
+            event = await subscription.next(HEARTBEAT_SECONDS)
+            await websocket.send_text(json.dumps(event or {"type": "ping"}, default=json_default))
+
+    sender = asyncio.create_task(send_events())
+    try:
+        # Clients don't send anything; keep reading until they disconnect
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        sender.cancel()
+        realtime_hub.unsubscribe(subscription)
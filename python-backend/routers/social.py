@@ -4,97 +4,114 @@ Handles social connections and followers
 """
 from fastapi import APIRouter, HTTPException, Cookie
 from typing import Optional
-from database import get_db_connection
+from database import get_async_db_connection, register_statement, POOL_UNAVAILABLE_ERRORS
 from auth import verify_jwt_token
+from services.timeline import home_timeline
+from services import events
 
 router = APIRouter(prefix="/social", tags=["Social"])
 
+# Follow or unfollow in one round-trip, moving both users' counts in the
+# same statement. The unique (follower_id, following_id) index makes a
+# concurrent double-click settle on "followed". Parameters, in order:
+# follower, following, follower, following, following, follower,
+# following, follower.
+FOLLOW_TOGGLE = register_statement("follow_toggle", """
+    WITH removed AS (
+        DELETE FROM user_connections WHERE follower_id = %s AND following_id = %s
+        RETURNING follower_id
+    ), added AS (
+        INSERT INTO user_connections (follower_id, following_id, created_at)
+        SELECT %s, %s, NOW()
+        WHERE NOT EXISTS (SELECT 1 FROM removed)
+        ON CONFLICT (follower_id, following_id) DO NOTHING
+        RETURNING follower_id
+    ), change AS (
+        SELECT (SELECT COUNT(*) FROM added) - (SELECT COUNT(*) FROM removed) AS delta
+    ), counted AS (
+        INSERT INTO user_stats (user_id, followers_count, following_count, updated_at)
+        SELECT counts.user_id, GREATEST(counts.followers, 0), GREATEST(counts.following, 0), NOW()
+        FROM change
+        CROSS JOIN LATERAL (
+            VALUES (%s, change.delta, 0), (%s, 0, change.delta)
+        ) AS counts(user_id, followers, following)
+        WHERE change.delta <> 0
+        ORDER BY counts.user_id
+        ON CONFLICT (user_id) DO UPDATE
+        SET followers_count = GREATEST(user_stats.followers_count
+                + CASE WHEN user_stats.user_id = %s THEN (SELECT delta FROM change) ELSE 0 END, 0),
+            following_count = GREATEST(user_stats.following_count
+                + CASE WHEN user_stats.user_id = %s THEN (SELECT delta FROM change) ELSE 0 END, 0),
+            updated_at = NOW()
+    )
+    SELECT CASE WHEN EXISTS (SELECT 1 FROM removed) THEN 'unfollowed' ELSE 'followed' END AS action
+""", ("int4",) * 8)
+
 @router.post("/follow/{user_id}")
 async def follow_user(user_id: int, athlynx_token: Optional[str] = Cookie(None)):
     """Follow a user"""
     if not athlynx_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     payload = verify_jwt_token(athlynx_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
+
     if payload['user_id'] == user_id:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        # Check if already following
-        cursor.execute("""
-            SELECT id FROM user_connections 
-            WHERE follower_id = %s AND following_id = %s
-        """, (payload['user_id'], user_id))
-        
-        if cursor.fetchone():
-            # Unfollow
-            cursor.execute("""
-                DELETE FROM user_connections 
-                WHERE follower_id = %s AND following_id = %s
-            """, (payload['user_id'], user_id))
-            action = "unfollowed"
-        else:
-            # Follow
-            cursor.execute("""
-                INSERT INTO user_connections (follower_id, following_id, created_at)
-                VALUES (%s, %s, NOW())
-            """, (payload['user_id'], user_id))
-            action = "followed"
-        
-        conn.commit()
-        return {"success": True, "action": action}
-        
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+
+    follower, following = payload['user_id'], user_id
+    async with get_async_db_connection(user_id=payload['user_id']) as conn, conn.cursor() as cursor:
+        try:
+            await FOLLOW_TOGGLE.execute(cursor, (
+                follower, following, follower, following, following, follower, following, follower
+            ))
+            action = (await cursor.fetchone())['action']
+
+            await conn.commit()
+
+            if action == "followed":
+                home_timeline.followed(payload['user_id'], user_id)
+            else:
+                home_timeline.unfollowed(payload['user_id'], user_id)
+            events.emit(events.USER_FOLLOWED, follower_id=follower, following_id=following, action=action)
+            return {"success": True, "action": action}
+
+        except POOL_UNAVAILABLE_ERRORS:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+
+def _viewer_id(athlynx_token: Optional[str]) -> Optional[int]:
+    """User ID of the caller, if signed in"""
+    payload = verify_jwt_token(athlynx_token) if athlynx_token else None
+    return payload['user_id'] if payload else None
 
 @router.get("/followers/{user_id}")
-async def get_followers(user_id: int):
+async def get_followers(user_id: int, athlynx_token: Optional[str] = Cookie(None)):
     """Get user's followers"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
+    async with get_async_db_connection(read_only=True, user_id=_viewer_id(athlynx_token)) as conn, conn.cursor() as cursor:
+        await cursor.execute("""
             SELECT u.id, u.first_name, u.last_name, u.email
             FROM user_connections c
             JOIN users u ON c.follower_id = u.id
             WHERE c.following_id = %s
         """, (user_id,))
-        
-        followers = cursor.fetchall()
+
+        followers = await cursor.fetchall()
         return {"success": True, "followers": followers}
-        
-    finally:
-        cursor.close()
-        conn.close()
 
 @router.get("/following/{user_id}")
-async def get_following(user_id: int):
+async def get_following(user_id: int, athlynx_token: Optional[str] = Cookie(None)):
     """Get users that this user follows"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
+    async with get_async_db_connection(read_only=True, user_id=_viewer_id(athlynx_token)) as conn, conn.cursor() as cursor:
+        await cursor.execute("""
             SELECT u.id, u.first_name, u.last_name, u.email
             FROM user_connections c
             JOIN users u ON c.following_id = u.id
             WHERE c.follower_id = %s
         """, (user_id,))
-        
-        following = cursor.fetchall()
+
+        following = await cursor.fetchall()
         return {"success": True, "following": following}
-        
-    finally:
-        cursor.close()
-        conn.close()
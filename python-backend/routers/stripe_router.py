@@ -6,7 +6,7 @@ from pydantic import BaseModel
 from typing import Optional
 import os
 import stripe
-from database import get_db_connection
+from database import get_async_db_connection, POOL_UNAVAILABLE_ERRORS
 from auth import verify_jwt_token
 
 router = APIRouter(prefix="/stripe", tags=["Payments"])
@@ -31,27 +31,22 @@ async def create_checkout_session(data: CreateCheckoutSession, athlynx_token: Op
     
     try:
         # Get or create Stripe customer
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("SELECT stripe_customer_id, email FROM users WHERE id = %s", (payload['user_id'],))
-        user = cursor.fetchone()
-        
-        stripe_customer_id = user['stripe_customer_id']
-        if not stripe_customer_id:
-            # Create Stripe customer
-            customer = stripe.Customer.create(email=user['email'])
-            stripe_customer_id = customer.id
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT stripe_customer_id, email FROM users WHERE id = %s", (payload['user_id'],))
+            user = await cursor.fetchone()
             
-            # Save to database
-            cursor.execute(
-                "UPDATE users SET stripe_customer_id = %s WHERE id = %s",
-                (stripe_customer_id, payload['user_id'])
-            )
-            conn.commit()
-        
-        cursor.close()
-        conn.close()
+            stripe_customer_id = user['stripe_customer_id']
+            if not stripe_customer_id:
+                # Create Stripe customer
+                customer = stripe.Customer.create(email=user['email'])
+                stripe_customer_id = customer.id
+                
+                # Save to database
+                await cursor.execute(
+                    "UPDATE users SET stripe_customer_id = %s WHERE id = %s",
+                    (stripe_customer_id, payload['user_id'])
+                )
+                await conn.commit()
         
         # Create checkout session
         session = stripe.checkout.Session.create(
@@ -68,6 +63,8 @@ async def create_checkout_session(data: CreateCheckoutSession, athlynx_token: Op
         
         return {"success": True, "session_id": session.id, "url": session.url}
         
+    except POOL_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -81,17 +78,14 @@ async def get_subscription(athlynx_token: Optional[str] = Cookie(None)):
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute("""
             SELECT stripe_customer_id, stripe_subscription_id, subscription_status, subscription_tier
             FROM users
             WHERE id = %s
         """, (payload['user_id'],))
         
-        user = cursor.fetchone()
+        user = await cursor.fetchone()
         
         return {
             "success": True,
@@ -99,10 +93,6 @@ async def get_subscription(athlynx_token: Optional[str] = Cookie(None)):
             "subscription_tier": user['subscription_tier'],
             "has_subscription": bool(user['stripe_subscription_id'])
         }
-        
-    finally:
-        cursor.close()
-        conn.close()
 
 @router.post("/webhook")
 async def stripe_webhook(request: dict):
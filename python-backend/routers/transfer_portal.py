@@ -1,120 +1,181 @@
 """
 ATHLYNX AI Platform - Transfer Portal Router
 """
-from fastapi import APIRouter, HTTPException
+import json
+from decimal import Decimal
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional
-from database import get_db_connection
+from database import get_async_db_connection, register_statement, encode_cursor, decode_cursor, InvalidCursor
+from services.portal_snapshot import portal_snapshot
+from services.portal_feed import portal_feed, FeedKey
+from services.stats import transfer_portal_counts, count_rows
+from services.realtime import json_default
 
 router = APIRouter(prefix="/transfer-portal", tags=["Transfer Portal"])
 
-@router.get("/players")
-async def get_transfer_players(
-    sport: Optional[str] = None,
-    position: Optional[str] = None,
-    school: Optional[str] = None,
-    min_rating: Optional[int] = None,
-    limit: int = 20
-):
-    """Get transfer portal players"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
+# Idle change streams get a keep-alive this often so proxies don't close them
+HEARTBEAT_SECONDS = 15
+MAX_CHANGES_PER_PAGE = 1000
+
+def _decode_feed_cursor(token: str) -> FeedKey:
     try:
+        return decode_cursor(token, (int, int))
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _players_from_db(sport, position, school, min_rating, key, limit, offset):
+    async with get_async_db_connection(read_only=True) as conn, conn.cursor() as cursor:
         query = """
-            SELECT 
+            SELECT
                 id, name, sport, position, current_school, stars, height, weight,
                 nil_value, grad_year, status, entered_portal_date
             FROM transfer_portal_players
             WHERE status = 'active'
         """
         params = []
-        
+        filters = []
+        types = []
+
         if sport:
             query += " AND sport = %s"
             params.append(sport)
+            filters.append("sport")
+            types.append("text")
         if position:
             query += " AND position = %s"
             params.append(position)
+            filters.append("position")
+            types.append("text")
         if school:
             query += " AND current_school LIKE %s"
             params.append(f"%{school}%")
+            filters.append("school")
+            types.append("text")
         if min_rating:
             query += " AND stars >= %s"
             params.append(min_rating)
-        
-        query += " ORDER BY stars DESC, nil_value DESC LIMIT %s"
+            filters.append("min_rating")
+            types.append("int4")
+        if key:
+            # Seek past the previous page's (stars, nil_value, id)
+            query += " AND (COALESCE(stars, 0), COALESCE(nil_value, 0), id) < (%s, %s, %s)"
+            params.extend(key)
+            filters.append("after")
+            types.extend(["int4", "numeric", "int8"])
+
+        query += " ORDER BY COALESCE(stars, 0) DESC, COALESCE(nil_value, 0) DESC, id DESC LIMIT %s"
         params.append(limit)
-        
-        cursor.execute(query, params)
-        players = cursor.fetchall()
-        
-        return {"success": True, "players": players}
-        
-    finally:
-        cursor.close()
-        conn.close()
+        types.append("int4")
+        if not key and offset:
+            query += " OFFSET %s"
+            params.append(offset)
+            filters.append("offset")
+            types.append("int4")
+
+        # One named statement per filter combination
+        statement = register_statement("transfer_players:" + ",".join(filters), query, tuple(types))
+        await statement.execute(cursor, tuple(params))
+        return await cursor.fetchall()
+
+@router.get("/players")
+async def get_transfer_players(
+    sport: Optional[str] = None,
+    position: Optional[str] = None,
+    school: Optional[str] = None,
+    min_rating: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+    after: Optional[str] = Query(None, alias="cursor")
+):
+    """Get transfer portal players"""
+    try:
+        key = decode_cursor(after, (int, Decimal, int)) if after else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Served from the in-memory snapshot once it has loaded
+    if portal_snapshot.ready:
+        players = portal_snapshot.select(sport, position, school, min_rating, key, limit, offset)
+    else:
+        players = await _players_from_db(sport, position, school, min_rating, key, limit, offset)
+
+    next_key = None
+    if len(players) == limit:
+        last = players[-1]
+        next_key = encode_cursor((last['stars'] or 0, last['nil_value'] or 0, last['id']))
+
+    return {"success": True, "players": players, "next_cursor": next_key}
+
+@router.get("/changes")
+async def get_transfer_portal_changes(limit: int = 100, after: Optional[str] = Query(None, alias="cursor")):
+    """
+    Players entered, updated or withdrawn since cursor, oldest first. Without
+    a cursor, returns no changes and the cursor to start from: take it
+    before loading /players, then poll with it.
+    """
+    if not after:
+        return {"success": True, "changes": [], "next_cursor": encode_cursor(await portal_feed.head()), "has_more": False}
+
+    limit = min(limit, MAX_CHANGES_PER_PAGE)
+    changes, key = await portal_feed.changes_since(_decode_feed_cursor(after), limit)
+    return {"success": True, "changes": changes, "next_cursor": encode_cursor(key), "has_more": len(changes) == limit}
+
+@router.get("/changes/stream")
+async def stream_transfer_portal_changes(request: Request, after: Optional[str] = Query(None, alias="cursor")):
+    """
+    Server-Sent Events push of the change feed. Each event's id is the
+    cursor after it, so a reconnecting EventSource resumes where it left off.
+    """
+    token = request.headers.get("last-event-id") or after
+    key = _decode_feed_cursor(token) if token else await portal_feed.head()
+
+    async def events():
+        nonlocal key
+        yield f"retry: 3000\nid: {encode_cursor(key)}\n\n"
+        while not await request.is_disconnected():
+            changes, next_key = await portal_feed.changes_since(key, MAX_CHANGES_PER_PAGE)
+            for change in changes:
+                yield f"event: {change['type']}\ndata: {json.dumps(change['player'], default=json_default)}\n\n"
+            if next_key != key:
+                key = next_key
+                yield f"id: {encode_cursor(key)}\n\n"
+            if changes:
+                continue
+            if not await portal_feed.wait(key, HEARTBEAT_SECONDS):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/player/{player_id}")
 async def get_transfer_player(player_id: int):
     """Get single transfer portal player"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute("""
             SELECT *
             FROM transfer_portal_players
             WHERE id = %s
         """, (player_id,))
-        
-        player = cursor.fetchone()
+
+        player = await cursor.fetchone()
         if not player:
             raise HTTPException(status_code=404, detail="Player not found")
-        
+
         return {"success": True, "player": player}
-        
-    finally:
-        cursor.close()
-        conn.close()
 
 @router.get("/stats")
 async def get_transfer_portal_stats():
     """Get transfer portal statistics"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        # Total players
-        cursor.execute("SELECT COUNT(*) as total FROM transfer_portal_players WHERE status = 'active'")
-        total = cursor.fetchone()['total']
-        
-        # By sport
-        cursor.execute("""
-            SELECT sport, COUNT(*) as count
-            FROM transfer_portal_players
-            WHERE status = 'active'
-            GROUP BY sport
-        """)
-        by_sport = cursor.fetchall()
-        
-        # By position
-        cursor.execute("""
-            SELECT position, COUNT(*) as count
-            FROM transfer_portal_players
-            WHERE status = 'active'
-            GROUP BY position
-            ORDER BY count DESC
-            LIMIT 10
-        """)
-        by_position = cursor.fetchall()
-        
-        return {
-            "success": True,
-            "total": total,
-            "by_sport": by_sport,
-            "by_position": by_position
-        }
-        
-    finally:
-        cursor.close()
-        conn.close()
+    # Tallied from the snapshot when loaded, otherwise one cached GROUPING SETS scan
+    counts = portal_snapshot.counts() if portal_snapshot.ready else await transfer_portal_counts.get()
+
+    return {
+        "success": True,
+        "total": counts["total"],
+        "by_sport": count_rows(counts["sport"], "sport"),
+        "by_position": count_rows(counts["position"], "position", limit=10)
+    }
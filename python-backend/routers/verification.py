@@ -7,6 +7,7 @@ SMS and Email verification endpoints
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 import sys
@@ -15,7 +16,7 @@ import os
 # Add parent directory to path to import verification service
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from sdk.python.athlynx.verification import send_verification_code as send_code_aws, send_sms, send_email
-from database import save_verification_code, get_verification_code, mark_code_verified
+from database import save_verification_code, get_verification_code, mark_code_verified, POOL_UNAVAILABLE_ERRORS
 
 router = APIRouter()
 
@@ -51,10 +52,11 @@ async def send_verification_code(request: SendCodeRequest):
     """
     try:
         # Generate and send code via AWS
-        result = send_code_aws(request.email, request.phone)
+        result = await run_in_threadpool(send_code_aws, request.email, request.phone)
         
         # Save to database
-        save_verification_code(
+        await run_in_threadpool(
+            save_verification_code,
             email=request.email,
             phone=request.phone,
             code=result['code'],
@@ -67,6 +69,8 @@ async def send_verification_code(request: SendCodeRequest):
             smsSent=result['sms_sent']
         )
         
+    except POOL_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
         print(f"[Verification Error] {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -81,7 +85,7 @@ async def verify_code(request: VerifyCodeRequest):
     """
     try:
         # Check code in database
-        verification = get_verification_code(request.email, request.code)
+        verification = await run_in_threadpool(get_verification_code, request.email, request.code)
         
         if not verification:
             return VerifyCodeResponse(
@@ -90,10 +94,12 @@ async def verify_code(request: VerifyCodeRequest):
             )
         
         # Mark as verified
-        mark_code_verified(verification['id'])
+        await run_in_threadpool(mark_code_verified, verification['id'])
         
         return VerifyCodeResponse(valid=True)
         
+    except POOL_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
         print(f"[Verification Error] {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,14 +2,28 @@
 ATHLYNX AI Platform - Waitlist Router
 Handles waitlist signups and management
 """
-from fastapi import APIRouter, HTTPException
+import os
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime
-from database import get_db_connection
+from psycopg import errors, IntegrityError, DataError
+from database import get_async_db_connection, POOL_UNAVAILABLE_ERRORS
+from services.ingest import waitlist_ingestor, utcnow
+from services.stats import waitlist_counts, count_rows
+from services.cache import ResponseCache
 
 router = APIRouter(prefix="/waitlist", tags=["Waitlist"])
 
+# Landing pages poll the count; a few seconds behind is fine
+count_cache = ResponseCache(
+    "waitlist_count",
+    ttl=float(os.getenv("WAITLIST_COUNT_CACHE_TTL", "5")),
+    stale_ttl=float(os.getenv("WAITLIST_COUNT_CACHE_STALE_TTL", "30")),
+    max_entries=1,
+)
+COUNT_MAX_AGE = int(os.getenv("WAITLIST_COUNT_MAX_AGE", "5"))
+
 class WaitlistSignup(BaseModel):
     fullName: str
     email: EmailStr
@@ -21,95 +35,65 @@ class WaitlistSignup(BaseModel):
 @router.post("/join")
 async def join_waitlist(data: WaitlistSignup):
     """Join the waitlist"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
     try:
         # Check if email already exists
-        cursor.execute("SELECT id FROM waitlist WHERE email = %s", (data.email,))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Email already on waitlist")
-        
-        # Insert into waitlist
-        cursor.execute("""
-            INSERT INTO waitlist (full_name, email, phone, role, sport, referral_code, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, NOW())
-        """, (data.fullName, data.email, data.phone, data.role, data.sport, data.referralCode))
-        
-        waitlist_id = cursor.lastrowid
-        
-        # Get position in waitlist
-        cursor.execute("SELECT COUNT(*) as position FROM waitlist WHERE id <= %s", (waitlist_id,))
-        position = cursor.fetchone()['position']
-        
-        conn.commit()
-        
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT id FROM waitlist WHERE email = %s", (data.email,))
+            if await cursor.fetchone():
+                raise HTTPException(status_code=400, detail="Email already on waitlist")
+
+        # Insert into waitlist, batched with concurrent signups; returns once committed
+        created = await waitlist_ingestor.add({
+            "full_name": data.fullName,
+            "email": data.email,
+            "phone": data.phone,
+            "role": data.role,
+            "sport": data.sport,
+            "referral_code": data.referralCode,
+            "created_at": utcnow(),
+        })
+        waitlist_id = created['id']
+        # Stamped from the waitlist counter as the row was inserted
+        position = created['position']
+        waitlist_counts.record(role=data.role, sport=data.sport)
+
         return {
             "success": True,
             "message": "Successfully joined waitlist",
             "position": position,
             "waitlist_id": waitlist_id
         }
-        
-    except HTTPException:
+
+    except (HTTPException, *POOL_UNAVAILABLE_ERRORS):
         raise
+    except errors.UniqueViolation:
+        # Same email joined concurrently, after the check above
+        raise HTTPException(status_code=409, detail="Email already on waitlist")
+    except (IntegrityError, DataError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid waitlist signup: {str(e)}")
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to join waitlist: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
 
 @router.get("/count")
-async def get_waitlist_count():
+async def get_waitlist_count(response: Response):
     """Get total waitlist count"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("SELECT COUNT(*) as count FROM waitlist")
-        result = cursor.fetchone()
-        return {"success": True, "count": result['count']}
-    finally:
-        cursor.close()
-        conn.close()
+    async def load_count():
+        async with get_async_db_connection(read_only=True) as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT total FROM waitlist_counter WHERE id")
+            result = await cursor.fetchone()
+            return {"success": True, "count": result['total'] if result else 0}
+
+    response.headers["Cache-Control"] = f"public, max-age={COUNT_MAX_AGE}"
+    return await count_cache.get("count", load_count)
 
 @router.get("/stats")
 async def get_waitlist_stats():
     """Get waitlist statistics"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        # Total count
-        cursor.execute("SELECT COUNT(*) as total FROM waitlist")
-        total = cursor.fetchone()['total']
-        
-        # By role
-        cursor.execute("""
-            SELECT role, COUNT(*) as count 
-            FROM waitlist 
-            GROUP BY role
-        """)
-        by_role = cursor.fetchall()
-        
-        # By sport
-        cursor.execute("""
-            SELECT sport, COUNT(*) as count 
-            FROM waitlist 
-            WHERE sport IS NOT NULL
-            GROUP BY sport
-            ORDER BY count DESC
-            LIMIT 10
-        """)
-        by_sport = cursor.fetchall()
-        
-        return {
-            "success": True,
-            "total": total,
-            "by_role": by_role,
-            "by_sport": by_sport
-        }
-    finally:
-        cursor.close()
-        conn.close()
+    counts = await waitlist_counts.get()
+
+    return {
+        "success": True,
+        "total": counts["total"],
+        "by_role": count_rows(counts["role"], "role"),
+        "by_sport": count_rows(counts["sport"], "sport", limit=10, skip_none=True)
+    }
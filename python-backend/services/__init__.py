@@ -0,0 +1,31 @@
+"""
+ATHLYNX AI Platform - Services Package
+Background and in-process services shared by the routers
+"""
+from . import ingest
+from . import counters
+from . import timeline
+from . import events
+from . import cache
+from . import likes
+from . import realtime
+from . import notifications
+from . import search
+from . import portal_snapshot
+from . import stats
+from . import portal_feed
+
+__all__ = [
+    "ingest",
+    "counters",
+    "timeline",
+    "events",
+    "cache",
+    "likes",
+    "realtime",
+    "notifications",
+    "search",
+    "portal_snapshot",
+    "stats",
+    "portal_feed",
+]
@@ -0,0 +1,232 @@
+"""
+ATHLYNX AI Platform - Response Cache
+Caches endpoint responses with TTL + LRU eviction, generation-based
+invalidation, per-key eviction, stale-while-revalidate and single-flight
+loading
+"""
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict, namedtuple
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+CacheEntry = namedtuple("CacheEntry", ["value", "stored_at", "generation"])
+
+
+# ==================== BACKENDS ====================
+
+class MemoryBackend:
+    """Per-process LRU store"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._generation = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def generation(self) -> int:
+        return self._generation
+
+    def bump_generation(self):
+        self._generation += 1
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SharedBackend:
+    """
+    LRU store in a SQLite file, shared by every worker on the host. Point
+    it at tmpfs (e.g. /dev/shm) so it never touches disk. Values must be
+    JSON-serializable. An invalidation in one worker is seen by all of them.
+    """
+
+    EVICT_EVERY = 64
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY, value TEXT, stored_at REAL, generation INTEGER, accessed_at REAL
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=0.05, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, stored_at, generation FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(json.loads(row[0]), row[1], row[2])
+
+    def set(self, key: str, entry: CacheEntry):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, stored_at, generation, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, json.dumps(entry.value), entry.stored_at, entry.generation, time.time())
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            conn.execute("""
+                DELETE FROM entries WHERE key IN (
+                    SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def generation(self) -> int:
+        return self._conn().execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+    def bump_generation(self):
+        self._conn().execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+# ==================== CACHE ====================
+
+caches: Dict[str, "ResponseCache"] = {}
+
+
+class ResponseCache:
+    """
+    Entries are fresh for ttl seconds and never outlive an invalidation as
+    fresh. Past that, an entry younger than ttl + stale_ttl is still served
+    while one background load refreshes it; older entries are reloaded
+    before answering. Concurrent misses for one key share a single load.
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float, max_entries: int, shared_path: Optional[str] = None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = SharedBackend(shared_path, max_entries) if shared_path else MemoryBackend(max_entries)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Loads started before their key was discarded; their result is not stored
+        self._superseded: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "loads": 0, "load_errors": 0, "invalidations": 0}
+        caches[name] = self
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value for key, calling loader() to fill or refresh it"""
+        try:
+            entry = self.backend.get(key)
+            generation = self.backend.generation()
+        except sqlite3.Error as e:
+            # A busy or broken shared cache must not take the endpoint down
+            print(f"[Cache] {self.name} read failed: {e}")
+            return await loader()
+
+        if entry is not None:
+            age = time.time() - entry.stored_at
+            if entry.generation == generation and age < self.ttl:
+                self.stats["hits"] += 1
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self.stats["stale_hits"] += 1
+                self._load(key, loader, generation)
+                return entry.value
+
+        self.stats["misses"] += 1
+        return await asyncio.shield(self._load(key, loader, generation))
+
+    def _load(self, key: str, loader: Callable[[], Awaitable[Any]], generation: int) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fill(key, loader, generation))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._loaded(key, t))
+        return task
+
+    async def _fill(self, key: str, loader: Callable[[], Awaitable[Any]], generation: int) -> Any:
+        self.stats["loads"] += 1
+        value = await loader()
+        if asyncio.current_task() in self._superseded:
+            return value
+        # Stored under the generation seen before loading: if an invalidation
+        # lands mid-load, the entry is already stale
+        try:
+            self.backend.set(key, CacheEntry(value, time.time(), generation))
+        except sqlite3.Error as e:
+            print(f"[Cache] {self.name} write failed: {e}")
+        return value
+
+    def _loaded(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["load_errors"] += 1
+
+    def invalidate(self, **_):
+        """Mark every current entry stale"""
+        self.stats["invalidations"] += 1
+        try:
+            self.backend.bump_generation()
+        except sqlite3.Error as e:
+            print(f"[Cache] {self.name} invalidation failed: {e}")
+
+    def discard(self, key: str):
+        """Drop one entry, including a load of it already in flight"""
+        self.stats["invalidations"] += 1
+        task = self._inflight.pop(key, None)
+        if task is not None:
+            self._superseded.add(task)
+        try:
+            self.backend.delete(key)
+        except sqlite3.Error as e:
+            print(f"[Cache] {self.name} discard of {key} failed: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        try:
+            size = self.backend.size()
+        except sqlite3.Error:
+            size = None
+        return {
+            **self.stats,
+            "entries": size,
+            "inflight": len(self._inflight),
+            "shared": isinstance(self.backend, SharedBackend),
+        }
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Stats for every registered cache"""
+    return {name: cache.snapshot() for name, cache in caches.items()}
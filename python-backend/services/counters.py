@@ -0,0 +1,194 @@
+"""
+ATHLYNX AI Platform - Post Counter Service
+Keeps the denormalized like/comment counts in post_stats, the follower
+counts in user_stats and the waitlist counter in step with the tables
+they summarize
+"""
+import os
+import asyncio
+from datetime import datetime
+from typing import Optional, Dict, Tuple
+from database import get_async_db_connection
+
+RECONCILE_INTERVAL = float(os.getenv("COUNTER_RECONCILE_INTERVAL", "3600"))
+RECONCILE_BATCH_SIZE = int(os.getenv("COUNTER_RECONCILE_BATCH_SIZE", "1000"))
+# Rows touched this recently may belong to a transaction that committed after
+# the recount's snapshot; leave them for the next pass
+RECONCILE_GRACE_SECONDS = int(os.getenv("COUNTER_RECONCILE_GRACE_SECONDS", "60"))
+
+
+# ==================== TRANSACTIONAL UPDATES ====================
+# Call these on the same cursor as the comment write so the counter change
+# commits or rolls back with it. Like and follow toggles update their
+# counters inside the toggle statement itself (routers/feed.py, social.py).
+
+async def adjust_comments(cursor, post_id: int, delta: int):
+    """Add delta to a post's comment count"""
+    await cursor.execute("""
+        INSERT INTO post_stats (post_id, comments_count, updated_at)
+        VALUES (%s, GREATEST(%s, 0), NOW())
+        ON CONFLICT (post_id) DO UPDATE
+        SET comments_count = GREATEST(post_stats.comments_count + %s, 0),
+            updated_at = NOW()
+    """, (post_id, delta, delta))
+
+
+# ==================== RECONCILIATION ====================
+
+RECONCILE_BATCH = """
+    WITH batch AS (
+        SELECT id FROM posts WHERE id > %s ORDER BY id LIMIT %s
+    ), actual AS (
+        SELECT
+            b.id AS post_id,
+            (SELECT COUNT(*) FROM post_likes WHERE post_id = b.id) AS likes_count,
+            (SELECT COUNT(*) FROM post_comments WHERE post_id = b.id) AS comments_count
+        FROM batch b
+    ), repaired AS (
+        INSERT INTO post_stats (post_id, likes_count, comments_count, updated_at)
+        SELECT post_id, likes_count, comments_count, NOW() FROM actual
+        ON CONFLICT (post_id) DO UPDATE
+        SET likes_count = EXCLUDED.likes_count,
+            comments_count = EXCLUDED.comments_count,
+            updated_at = NOW()
+        WHERE (post_stats.likes_count, post_stats.comments_count)
+                IS DISTINCT FROM (EXCLUDED.likes_count, EXCLUDED.comments_count)
+          AND post_stats.updated_at < NOW() - make_interval(secs => %s)
+        RETURNING post_id
+    )
+    SELECT
+        (SELECT MAX(id) FROM batch) AS last_id,
+        (SELECT COUNT(*) FROM batch) AS scanned,
+        (SELECT COUNT(*) FROM repaired) AS repaired
+"""
+
+RECONCILE_USER_BATCH = """
+    WITH batch AS (
+        SELECT id FROM users WHERE id > %s ORDER BY id LIMIT %s
+    ), actual AS (
+        SELECT
+            b.id AS user_id,
+            (SELECT COUNT(*) FROM user_connections WHERE following_id = b.id) AS followers_count,
+            (SELECT COUNT(*) FROM user_connections WHERE follower_id = b.id) AS following_count
+        FROM batch b
+    ), repaired AS (
+        INSERT INTO user_stats (user_id, followers_count, following_count, updated_at)
+        SELECT user_id, followers_count, following_count, NOW() FROM actual
+        ON CONFLICT (user_id) DO UPDATE
+        SET followers_count = EXCLUDED.followers_count,
+            following_count = EXCLUDED.following_count,
+            updated_at = NOW()
+        WHERE (user_stats.followers_count, user_stats.following_count)
+                IS DISTINCT FROM (EXCLUDED.followers_count, EXCLUDED.following_count)
+          AND user_stats.updated_at < NOW() - make_interval(secs => %s)
+        RETURNING user_id
+    )
+    SELECT
+        (SELECT MAX(id) FROM batch) AS last_id,
+        (SELECT COUNT(*) FROM batch) AS scanned,
+        (SELECT COUNT(*) FROM repaired) AS repaired
+"""
+
+# The counter row is locked first, so the count that follows sees every
+# signup committed before it and none can commit until it is written.
+# Signups wait for the duration of the COUNT.
+RECONCILE_WAITLIST = """
+    UPDATE waitlist_counter c
+    SET total = actual.total,
+        issued = GREATEST(c.issued, actual.max_position),
+        updated_at = NOW()
+    FROM (SELECT COUNT(*) AS total, COALESCE(MAX(position), 0) AS max_position FROM waitlist) actual
+    WHERE c.id
+      AND (c.total, c.issued) IS DISTINCT FROM (actual.total, GREATEST(c.issued, actual.max_position))
+    RETURNING c.total
+"""
+
+reconcile_stats: Dict[str, Optional[object]] = {
+    "runs": 0,
+    "last_run_at": None,
+    "last_scanned": 0,
+    "last_repaired": 0,
+    "total_repaired": 0,
+}
+
+
+async def _reconcile(statement: str, batch_size: int) -> Tuple[int, int]:
+    """Run a reconcile statement over the whole table, one short transaction per id batch"""
+    last_id, scanned, repaired = 0, 0, 0
+    while True:
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(statement, (last_id, batch_size, RECONCILE_GRACE_SECONDS))
+            result = await cursor.fetchone()
+
+        if not result['scanned']:
+            break
+        last_id = result['last_id']
+        scanned += result['scanned']
+        repaired += result['repaired']
+        if result['scanned'] < batch_size:
+            break
+    return scanned, repaired
+
+
+async def reconcile_waitlist() -> bool:
+    """Recount the waitlist and fix waitlist_counter; True if it had drifted"""
+    async with get_async_db_connection() as conn, conn.cursor() as cursor:
+        await cursor.execute("SELECT total FROM waitlist_counter WHERE id FOR UPDATE")
+        await cursor.execute(RECONCILE_WAITLIST)
+        return await cursor.fetchone() is not None
+
+
+async def reconcile_counters(batch_size: int = RECONCILE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Recount likes, comments, followers and the waitlist and fix any
+    post_stats, user_stats or waitlist_counter row that has drifted
+    """
+    post_scanned, post_repaired = await _reconcile(RECONCILE_BATCH, batch_size)
+    user_scanned, user_repaired = await _reconcile(RECONCILE_USER_BATCH, batch_size)
+    waitlist_repaired = int(await reconcile_waitlist())
+    scanned = post_scanned + user_scanned
+    repaired = post_repaired + user_repaired + waitlist_repaired
+
+    reconcile_stats["runs"] += 1
+    reconcile_stats["last_run_at"] = datetime.utcnow().isoformat()
+    reconcile_stats["last_scanned"] = scanned
+    reconcile_stats["last_repaired"] = repaired
+    reconcile_stats["total_repaired"] += repaired
+    if repaired:
+        print(f"[Counters] Repaired {post_repaired} post, {user_repaired} user and {waitlist_repaired} waitlist counters")
+    return {"scanned": scanned, "repaired": repaired}
+
+
+_reconcile_task: Optional[asyncio.Task] = None
+_closing = asyncio.Event()
+
+
+async def _run_reconciler():
+    while not _closing.is_set():
+        try:
+            await asyncio.wait_for(_closing.wait(), timeout=RECONCILE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        if _closing.is_set():
+            break
+        try:
+            await reconcile_counters()
+        except Exception as e:
+            print(f"[Counters] Reconciliation failed: {e}")
+
+
+def start_counter_reconciler():
+    """Start the periodic reconciliation job"""
+    global _reconcile_task
+    if _reconcile_task is None and RECONCILE_INTERVAL > 0:
+        _closing.clear()
+        _reconcile_task = asyncio.create_task(_run_reconciler())
+
+
+async def stop_counter_reconciler():
+    """Stop the reconciliation job, letting a pass in progress finish"""
+    global _reconcile_task
+    if _reconcile_task is not None:
+        _closing.set()
+        await _reconcile_task
+        _reconcile_task = None
@@ -0,0 +1,33 @@
+"""
+ATHLYNX AI Platform - In-Process Events
+Routers emit named events after a write commits; caches and other
+services subscribe to the ones they care about
+"""
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+# Event names
+POST_CREATED = "post.created"
+POST_LIKED = "post.liked"
+COMMENT_CREATED = "comment.created"
+# A like/unlike as the user made it; POST_LIKED fires once the counter moved
+LIKE_TOGGLED = "like.toggled"
+USER_FOLLOWED = "user.followed"
+MESSAGE_SENT = "message.sent"
+ATHLETE_UPDATED = "athlete.updated"
+
+_subscribers: Dict[str, List[Callable]] = defaultdict(list)
+
+
+def subscribe(event: str, handler: Callable):
+    """Call handler(**payload) every time event is emitted"""
+    _subscribers[event].append(handler)
+
+
+def emit(event: str, **payload):
+    """Notify subscribers; a failing subscriber does not stop the others"""
+    for handler in _subscribers.get(event, ()):
+        try:
+            handler(**payload)
+        except Exception as e:
+            print(f"[Events] Handler for {event} failed: {e}")
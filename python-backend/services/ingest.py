@@ -0,0 +1,266 @@
+"""
+ATHLYNX AI Platform - Bulk Ingestion Service
+Buffers high-volume inserts (signups, waitlist, analytics) and writes them in batches
+"""
+import os
+import asyncio
+from enum import Enum
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Any, Tuple
+from psycopg import sql, IntegrityError, DataError
+from database import get_async_db_connection, copy_rows_async, insert_values_async
+
+# Postgres caps a single statement at 65535 bind parameters
+MAX_BIND_PARAMS = 65535
+
+
+class Durability(Enum):
+    # add() returns as soon as the row is buffered; rows still buffered when
+    # the process dies are lost
+    BUFFERED = "buffered"
+    # add() waits until the batch holding the row has committed
+    GROUP_COMMIT = "group_commit"
+
+
+class FlushMethod(Enum):
+    COPY = "copy"
+    VALUES = "values"
+
+
+class BulkIngestor:
+    """
+    Collects rows for one table and flushes them in batches.
+
+    A flush happens when flush_size rows are buffered, or every
+    flush_interval seconds, whichever comes first. COPY is the fastest
+    method. VALUES is needed when callers want RETURNING columns, such as
+    the generated id.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        columns: List[str],
+        flush_size: int = 500,
+        flush_interval: float = 0.5,
+        durability: Durability = Durability.BUFFERED,
+        method: FlushMethod = FlushMethod.COPY,
+        returning: Tuple[str, ...] = (),
+        synchronous_commit: bool = True,
+        max_buffer: int = 10000
+    ):
+        if returning and method is not FlushMethod.VALUES:
+            raise ValueError("RETURNING requires the VALUES flush method")
+
+        self.table = table
+        self.columns = list(columns)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.method = method
+        self.returning = tuple(returning)
+        self.synchronous_commit = synchronous_commit
+        self.max_buffer = max_buffer
+
+        self._rows: List[tuple] = []
+        self._waiters: List[Optional[asyncio.Future]] = []
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = asyncio.Event()
+        self.stats = {"buffered": 0, "flushed": 0, "batches": 0, "failed": 0, "retried_batches": 0}
+
+    def start(self):
+        """Start the periodic flush loop"""
+        if self._task is None:
+            self._closing.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write out anything still buffered"""
+        if self._task is not None:
+            # Let an in-flight flush finish rather than cancelling it mid-write
+            self._closing.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def add(self, row: Dict[str, Any]) -> Optional[Dict]:
+        """
+        Queue one row, given as a dict keyed by column name.
+
+        Returns the RETURNING values for the row under GROUP_COMMIT, or None
+        under BUFFERED.
+        """
+        values = tuple(row.get(column) for column in self.columns)
+        waiter = None
+        if self.durability is Durability.GROUP_COMMIT:
+            waiter = asyncio.get_running_loop().create_future()
+
+        self._rows.append(values)
+        self._waiters.append(waiter)
+        self.stats["buffered"] += 1
+
+        if len(self._rows) >= self.flush_size or len(self._rows) >= self.max_buffer:
+            await self.flush()
+
+        if waiter is not None:
+            return await waiter
+        return None
+
+    async def add_many(self, rows: List[Dict[str, Any]]):
+        """Queue many rows, flushing as batches fill up"""
+        for row in rows:
+            self._rows.append(tuple(row.get(column) for column in self.columns))
+            self._waiters.append(None)
+            self.stats["buffered"] += 1
+            if len(self._rows) >= self.flush_size:
+                await self.flush()
+
+    async def flush(self):
+        """Write all buffered rows in as few statements as possible"""
+        async with self._flush_lock:
+            if not self._rows:
+                return
+            rows, self._rows = self._rows, []
+            waiters, self._waiters = self._waiters, []
+
+            try:
+                results = await self._write(rows)
+            except (IntegrityError, DataError) as e:
+                # A rejected row (duplicate email, bad role) aborts the whole
+                # statement; write the rows singly so only it fails
+                self.stats["retried_batches"] += 1
+                print(f"[Ingest] Batch to {self.table} rejected ({len(rows)} rows), retrying row by row: {e}")
+                await self._write_each(rows, waiters)
+                return
+            except Exception as e:
+                self.stats["failed"] += len(rows)
+                print(f"[Ingest] Flush to {self.table} failed ({len(rows)} rows): {e}")
+                for waiter in waiters:
+                    if waiter is not None and not waiter.done():
+                        waiter.set_exception(e)
+                return
+
+            self.stats["flushed"] += len(rows)
+            self.stats["batches"] += 1
+            for i, waiter in enumerate(waiters):
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(results[i] if results else None)
+
+    async def _write_each(self, rows: List[tuple], waiters: List[Optional[asyncio.Future]]):
+        """Write rows one per transaction, failing only the waiters of rows the database rejects"""
+        for row, waiter in zip(rows, waiters):
+            try:
+                results = await self._write([row])
+            except Exception as e:
+                self.stats["failed"] += 1
+                if waiter is not None and not waiter.done():
+                    waiter.set_exception(e)
+                else:
+                    print(f"[Ingest] Row for {self.table} rejected: {e}")
+                continue
+
+            self.stats["flushed"] += 1
+            if waiter is not None and not waiter.done():
+                waiter.set_result(results[0] if results else None)
+
+    async def _write(self, rows: List[tuple]) -> List[Dict]:
+        async with get_async_db_connection() as conn:
+            if not self.synchronous_commit:
+                # Commit without waiting for the WAL flush: a crash may lose
+                # the last few batches, but the database stays consistent
+                await conn.execute(sql.SQL("SET LOCAL synchronous_commit = off"))
+
+            if self.method is FlushMethod.COPY:
+                await copy_rows_async(conn, self.table, self.columns, rows)
+                return []
+
+            results = []
+            chunk = max(1, MAX_BIND_PARAMS // len(self.columns))
+            for start in range(0, len(rows), chunk):
+                returned = await insert_values_async(
+                    conn, self.table, self.columns, rows[start:start + chunk], self.returning
+                )
+                if 'id' in self.returning:
+                    # Ids come from a sequence, so within one statement they
+                    # increase in VALUES order
+                    returned = sorted(returned, key=lambda r: r['id'])
+                results.extend(returned)
+            return results
+
+    async def _run(self):
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[Ingest] Periodic flush of {self.table} failed: {e}")
+
+
+def utcnow() -> datetime:
+    """Timestamp for buffered rows; COPY cannot evaluate NOW() per row"""
+    return datetime.now(timezone.utc)
+
+
+# ==================== INGESTORS ====================
+
+signup_ingestor = BulkIngestor(
+    table="signup_analytics",
+    columns=[
+        "full_name", "email", "phone", "role", "sport",
+        "referral_source", "utm_source", "utm_medium", "utm_campaign",
+        "signup_type", "ip_address", "user_agent", "created_at",
+    ],
+    flush_size=int(os.getenv("INGEST_SIGNUP_FLUSH_SIZE", "1000")),
+    flush_interval=float(os.getenv("INGEST_SIGNUP_FLUSH_INTERVAL", "1.0")),
+    durability=Durability(os.getenv("INGEST_SIGNUP_DURABILITY", "buffered")),
+    method=FlushMethod.COPY,
+    synchronous_commit=os.getenv("INGEST_SIGNUP_SYNCHRONOUS_COMMIT", "false").lower() == "true",
+)
+
+waitlist_ingestor = BulkIngestor(
+    table="waitlist",
+    columns=["full_name", "email", "phone", "role", "sport", "referral_code", "created_at"],
+    flush_size=int(os.getenv("INGEST_WAITLIST_FLUSH_SIZE", "200")),
+    flush_interval=float(os.getenv("INGEST_WAITLIST_FLUSH_INTERVAL", "0.05")),
+    durability=Durability.GROUP_COMMIT,
+    method=FlushMethod.VALUES,
+    # position is stamped by a trigger from waitlist_counter (migrations/010)
+    returning=("id", "position"),
+)
+
+INGESTORS = [signup_ingestor, waitlist_ingestor]
+
+
+async def track_signup(data: Dict[str, Any]):
+    """Buffer one signup_analytics row; data is keyed like the CRM trackSignup input"""
+    await signup_ingestor.add({
+        "full_name": data.get('fullName'),
+        "email": data.get('email'),
+        "phone": data.get('phone'),
+        "role": data.get('role'),
+        "sport": data.get('sport'),
+        "referral_source": data.get('referralSource'),
+        "utm_source": data.get('utmSource'),
+        "utm_medium": data.get('utmMedium'),
+        "utm_campaign": data.get('utmCampaign'),
+        "signup_type": data.get('signupType'),
+        "ip_address": data.get('ipAddress'),
+        "user_agent": data.get('userAgent'),
+        "created_at": utcnow(),
+    })
+
+
+def start_ingestors():
+    """Start background flushing for every ingestor"""
+    for ingestor in INGESTORS:
+        ingestor.start()
+
+
+async def stop_ingestors():
+    """Flush and stop every ingestor"""
+    for ingestor in INGESTORS:
+        await ingestor.stop()
@@ -0,0 +1,198 @@
+"""
+ATHLYNX AI Platform - Like Write-Behind Buffer
+Coalesces bursts of like/unlike toggles per (user, post) and writes only
+the final state, in batches
+"""
+import os
+import asyncio
+from typing import Optional, Dict, List, Set, Tuple
+from psycopg import IntegrityError
+from database import get_async_db_connection
+from services import events
+
+LIKE_WRITE_BEHIND = os.getenv("LIKE_WRITE_BEHIND", "false").lower() == "true"
+# Consecutive failed flushes after which the buffered toggles are dropped
+LIKE_FLUSH_ATTEMPTS = int(os.getenv("LIKE_FLUSH_ATTEMPTS", "3"))
+
+# Sets each (post, user) pair to its final liked state and moves every
+# touched post's counter once. Pairs arrive sorted so concurrent flushes
+# take row locks in the same order; pairs for deleted posts are skipped.
+APPLY_LIKES = """
+    WITH desired AS (
+        SELECT d.post_id, d.user_id, d.liked
+        FROM unnest(%s::int[], %s::int[], %s::bool[]) AS d(post_id, user_id, liked)
+        JOIN posts p ON p.id = d.post_id
+    ), removed AS (
+        DELETE FROM post_likes l
+        USING desired d
+        WHERE NOT d.liked AND l.post_id = d.post_id AND l.user_id = d.user_id
+        RETURNING l.post_id
+    ), added AS (
+        INSERT INTO post_likes (post_id, user_id, created_at)
+        SELECT post_id, user_id, NOW() FROM desired WHERE liked
+        ON CONFLICT (post_id, user_id) DO NOTHING
+        RETURNING post_id
+    ), deltas AS (
+        SELECT post_id, SUM(change) AS delta
+        FROM (
+            SELECT post_id, 1 AS change FROM added
+            UNION ALL
+            SELECT post_id, -1 FROM removed
+        ) changes
+        GROUP BY post_id
+    )
+    INSERT INTO post_stats (post_id, likes_count, updated_at)
+    SELECT post_id, GREATEST(delta, 0), NOW() FROM deltas WHERE delta <> 0
+    ORDER BY post_id
+    ON CONFLICT (post_id) DO UPDATE
+    SET likes_count = GREATEST(post_stats.likes_count + (SELECT delta FROM deltas WHERE deltas.post_id = EXCLUDED.post_id), 0),
+        updated_at = NOW()
+    RETURNING post_id
+"""
+
+
+class LikeBuffer:
+    """
+    Holds the latest liked/unliked state of each (post, user) pair touched
+    since the last flush. A toggle reads the committed state only the first
+    time a pair is seen in a window; any further toggles flip the buffered
+    state in memory, so a like/unlike burst costs one write at flush time.
+    A pair the database rejects is dropped on its own; after other errors
+    the toggles are kept for the next flush, up to LIKE_FLUSH_ATTEMPTS
+    failures in a row. Pending toggles are lost if the process dies before
+    they are written.
+    """
+
+    def __init__(self, flush_size: int = 500, flush_interval: float = 0.5):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple[int, int], bool] = {}
+        # States being written by the flush in progress
+        self._flushing: Dict[Tuple[int, int], bool] = {}
+        self._failed_flushes = 0
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = asyncio.Event()
+        self.stats = {"toggles": 0, "coalesced": 0, "flushed": 0, "batches": 0, "failed": 0, "retried": 0}
+
+    def start(self):
+        """Start the periodic flush loop"""
+        if self._task is None:
+            self._closing.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write out anything still buffered"""
+        if self._task is not None:
+            self._closing.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def toggle(self, post_id: int, user_id: int) -> str:
+        """Flip the pair's liked state; returns 'liked' or 'unliked'"""
+        key = (post_id, user_id)
+        self.stats["toggles"] += 1
+        if key not in self._pending:
+            liked = self._flushing.get(key)
+            if liked is None:
+                liked = await self._committed_state(post_id, user_id)
+            # Another toggle for the pair may have landed while we were reading
+            self._pending.setdefault(key, liked)
+        else:
+            self.stats["coalesced"] += 1
+
+        self._pending[key] = not self._pending[key]
+        action = "liked" if self._pending[key] else "unliked"
+
+        if len(self._pending) >= self.flush_size:
+            await self.flush()
+        return action
+
+    async def _committed_state(self, post_id: int, user_id: int) -> bool:
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM post_likes WHERE post_id = %s AND user_id = %s) AS liked",
+                (post_id, user_id)
+            )
+            return (await cursor.fetchone())['liked']
+
+    async def flush(self):
+        """Write the final state of every buffered pair in one statement"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            self._flushing = pending
+            keys = sorted(pending)
+
+            try:
+                try:
+                    changed_posts = await self._apply(keys, pending)
+                    dropped = 0
+                except IntegrityError as e:
+                    # A pair whose post or user was deleted meanwhile fails the
+                    # whole statement; apply the pairs singly so only it is lost
+                    print(f"[Likes] Flush rejected ({len(keys)} toggles), retrying pair by pair: {e}")
+                    changed_posts, dropped = await self._apply_each(keys, pending)
+            except Exception as e:
+                self._failed_flushes += 1
+                if self._failed_flushes < LIKE_FLUSH_ATTEMPTS:
+                    # Applying a final state twice is harmless, and toggles
+                    # made since then are newer, so they win
+                    self.stats["retried"] += len(keys)
+                    for key in keys:
+                        self._pending.setdefault(key, pending[key])
+                    print(f"[Likes] Flush failed ({len(keys)} toggles), keeping them for the next flush: {e}")
+                else:
+                    self._failed_flushes = 0
+                    self.stats["failed"] += len(keys)
+                    print(f"[Likes] Flush failed {LIKE_FLUSH_ATTEMPTS} times, dropped {len(keys)} toggles: {e}")
+                return
+            finally:
+                self._flushing = {}
+
+            self._failed_flushes = 0
+            self.stats["flushed"] += len(keys) - dropped
+            self.stats["failed"] += dropped
+            self.stats["batches"] += 1
+            for post_id in changed_posts:
+                events.emit(events.POST_LIKED, post_id=post_id)
+
+    async def _apply(self, keys: List[Tuple[int, int]], pending: Dict[Tuple[int, int], bool]) -> Set[int]:
+        """Write the pairs in one transaction; returns the posts whose counter moved"""
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(APPLY_LIKES, (
+                [post_id for post_id, _ in keys],
+                [user_id for _, user_id in keys],
+                [pending[key] for key in keys],
+            ))
+            return {row['post_id'] for row in await cursor.fetchall()}
+
+    async def _apply_each(self, keys: List[Tuple[int, int]], pending: Dict[Tuple[int, int], bool]) -> Tuple[Set[int], int]:
+        """Write the pairs one per transaction, dropping those the database rejects"""
+        changed_posts, dropped = set(), 0
+        for key in keys:
+            try:
+                changed_posts |= await self._apply([key], pending)
+            except IntegrityError as e:
+                dropped += 1
+                print(f"[Likes] Dropped toggle of post {key[0]} by user {key[1]}: {e}")
+        return changed_posts, dropped
+
+    async def _run(self):
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[Likes] Periodic flush failed: {e}")
+
+
+like_buffer = LikeBuffer(
+    flush_size=int(os.getenv("LIKE_FLUSH_SIZE", "500")),
+    flush_interval=float(os.getenv("LIKE_FLUSH_INTERVAL", "0.5")),
+)
@@ -0,0 +1,228 @@
+"""
+ATHLYNX AI Platform - Notification Service
+Turns likes, follows, comments and messages into notifications. Events
+are queued, similar ones for the same recipient are merged within a time
+window ("12 people liked your post"), and each window is written in one
+batch. Unread counts are cached so the notification list skips the COUNT.
+"""
+import os
+import time
+import asyncio
+from typing import Optional, Dict, List, Tuple
+from database import get_async_db_connection, insert_values_async
+from services import events
+from services.realtime import realtime_hub
+from services.ingest import utcnow
+
+COALESCE_WINDOW = float(os.getenv("NOTIFICATION_COALESCE_WINDOW", "10"))
+UNREAD_CACHE_TTL = float(os.getenv("NOTIFICATION_UNREAD_CACHE_TTL", "60"))
+UNREAD_CACHE_MAX_ENTRIES = int(os.getenv("NOTIFICATION_UNREAD_CACHE_MAX_ENTRIES", "50000"))
+
+NOTIFICATION_COLUMNS = ["user_id", "type", "title", "message", "is_read", "created_at"]
+NOTIFICATION_RETURNING = ("id", "user_id", "type", "title", "message", "created_at")
+
+# kind -> (title, "<actor> ..." message, "<actor> and N others ..." message)
+TEMPLATES = {
+    "like": ("New like", "{actor} liked your post", "{actor} and {others} others liked your post"),
+    "comment": ("New comment", "{actor} commented on your post", "{actor} and {others} others commented on your post"),
+    "follow": ("New follower", "{actor} started following you", "{actor} and {others} others started following you"),
+    "message": ("New message", "{actor} sent you a message", "{actor} sent you {count} messages"),
+}
+
+
+# ==================== UNREAD COUNTS ====================
+
+class UnreadCounts:
+    """
+    Per-process cache of each user's unread notification count. Batches
+    written by this process bump cached counts; marking read drops them.
+    Writes from other workers show up once the entry's TTL runs out.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._counts: Dict[int, Tuple[int, float]] = {}
+
+    def get(self, user_id: int) -> Optional[int]:
+        entry = self._counts.get(user_id)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl:
+            return None
+        return entry[0]
+
+    def set(self, user_id: int, count: int):
+        if len(self._counts) >= self.max_entries:
+            self._evict()
+        self._counts[user_id] = (count, time.monotonic())
+
+    def add(self, user_id: int, count: int):
+        entry = self._counts.get(user_id)
+        if entry is not None:
+            self._counts[user_id] = (entry[0] + count, entry[1])
+
+    def invalidate(self, user_id: int):
+        self._counts.pop(user_id, None)
+
+    def _evict(self):
+        now = time.monotonic()
+        expired = [user_id for user_id, (_, at) in self._counts.items() if now - at >= self.ttl]
+        for user_id in expired:
+            del self._counts[user_id]
+        if len(self._counts) >= self.max_entries:
+            # Still full of live entries: drop the oldest half
+            oldest = sorted(self._counts, key=lambda user_id: self._counts[user_id][1])
+            for user_id in oldest[:len(oldest) // 2]:
+                del self._counts[user_id]
+
+
+unread_counts = UnreadCounts(UNREAD_CACHE_TTL, UNREAD_CACHE_MAX_ENTRIES)
+
+
+# ==================== PIPELINE ====================
+
+class NotificationPipeline:
+    """
+    Groups queued events by (recipient, kind, subject) until the window
+    closes, then writes one notification per group. Recipients of post
+    events are resolved in one query per window. Events still queued when
+    the process dies are lost.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        # (recipient or None for post events, kind, subject) -> {actor id: events}, in arrival order
+        self._groups: Dict[Tuple[Optional[int], str, Optional[int]], Dict[int, int]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = asyncio.Event()
+        self.stats = {"events": 0, "coalesced": 0, "written": 0, "batches": 0, "failed": 0}
+
+    def start(self):
+        """Start the periodic flush loop"""
+        if self._task is None:
+            self._closing.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write out anything still queued"""
+        if self._task is not None:
+            self._closing.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def add(self, kind: str, actor_id: int, recipient_id: Optional[int] = None, subject_id: Optional[int] = None):
+        """
+        Queue one event. Events about a post pass recipient_id=None and the
+        post as subject_id; the post's author is looked up at flush time.
+        """
+        key = (recipient_id, kind, subject_id)
+        actors = self._groups.setdefault(key, {})
+        self.stats["events"] += 1
+        if actors:
+            self.stats["coalesced"] += 1
+        actors[actor_id] = actors.pop(actor_id, 0) + 1
+
+    def retract(self, kind: str, actor_id: int, recipient_id: Optional[int] = None, subject_id: Optional[int] = None):
+        """Drop a queued event that was undone (unlike, unfollow) before it was written"""
+        actors = self._groups.get((recipient_id, kind, subject_id))
+        if actors is not None:
+            actors.pop(actor_id, None)
+
+    async def flush(self):
+        """Write one notification per queued group"""
+        async with self._flush_lock:
+            groups = {key: actors for key, actors in self._groups.items() if actors}
+            self._groups = {}
+            if not groups:
+                return
+
+            try:
+                notifications = await self._write(groups)
+            except Exception as e:
+                self.stats["failed"] += len(groups)
+                print(f"[Notifications] Flush failed ({len(groups)} groups): {e}")
+                return
+
+            self.stats["written"] += len(notifications)
+            self.stats["batches"] += 1
+            for notification in notifications:
+                unread_counts.add(notification['user_id'], 1)
+                await realtime_hub.publish(notification['user_id'], "notification", notification)
+
+    async def _write(self, groups: Dict[Tuple[Optional[int], str, Optional[int]], Dict[int, int]]) -> List[Dict]:
+        post_ids = list({post_id for (recipient, _, post_id) in groups if recipient is None})
+        # The newest actor names the notification; fetch one more in case the
+        # newest turns out to be the recipient
+        actor_ids = list({actor for actors in groups.values() for actor in list(actors)[-2:]})
+
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            authors = {}
+            if post_ids:
+                await cursor.execute("SELECT id, user_id FROM posts WHERE id = ANY(%s)", (post_ids,))
+                authors = {row['id']: row['user_id'] for row in await cursor.fetchall()}
+            await cursor.execute("SELECT id, first_name, last_name FROM users WHERE id = ANY(%s)", (actor_ids,))
+            names = {row['id']: f"{row['first_name']} {row['last_name']}".strip() for row in await cursor.fetchall()}
+
+            rows = []
+            now = utcnow()
+            for (recipient, kind, post_id), actors in groups.items():
+                if recipient is None:
+                    recipient = authors.get(post_id)
+                # Nobody is notified about their own activity
+                actors = {actor: events for actor, events in actors.items() if actor != recipient}
+                if recipient is None or not actors:
+                    continue
+                count = sum(actors.values())
+                title, single, multiple = TEMPLATES[kind]
+                # A conversation has one sender, so messages are counted, not senders
+                template = single if (count if kind == "message" else len(actors)) == 1 else multiple
+                message = template.format(
+                    actor=names.get(list(actors)[-1], "Someone"), others=len(actors) - 1, count=count
+                )
+                rows.append((recipient, kind, title, message, 0, now))
+
+            if not rows:
+                return []
+            return await insert_values_async(conn, "notifications", NOTIFICATION_COLUMNS, rows, NOTIFICATION_RETURNING)
+
+    async def _run(self):
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=self.window)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[Notifications] Periodic flush failed: {e}")
+
+
+notification_pipeline = NotificationPipeline(COALESCE_WINDOW)
+
+
+# ==================== EVENT SOURCES ====================
+
+def _on_like(post_id: int, user_id: int, action: str, **_):
+    if action == "liked":
+        notification_pipeline.add("like", user_id, subject_id=post_id)
+    else:
+        notification_pipeline.retract("like", user_id, subject_id=post_id)
+
+def _on_comment(post_id: int, user_id: int, **_):
+    notification_pipeline.add("comment", user_id, subject_id=post_id)
+
+def _on_follow(follower_id: int, following_id: int, action: str, **_):
+    if action == "followed":
+        notification_pipeline.add("follow", follower_id, recipient_id=following_id)
+    else:
+        notification_pipeline.retract("follow", follower_id, recipient_id=following_id)
+
+def _on_message(sender_id: int, recipient_id: int, **_):
+    # One group per conversation, so a burst of messages is one notification
+    notification_pipeline.add("message", sender_id, recipient_id=recipient_id, subject_id=sender_id)
+
+events.subscribe(events.LIKE_TOGGLED, _on_like)
+events.subscribe(events.COMMENT_CREATED, _on_comment)
+events.subscribe(events.USER_FOLLOWED, _on_follow)
+events.subscribe(events.MESSAGE_SENT, _on_message)
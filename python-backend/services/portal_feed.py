@@ -0,0 +1,171 @@
+"""
+ATHLYNX AI Platform - Transfer Portal Change Feed
+Players entered, updated or withdrawn since a client's cursor. One poller
+per worker follows the table and keeps the latest changes in memory, so
+clients that are caught up are answered without a query.
+"""
+import os
+import asyncio
+from bisect import bisect_right
+from typing import Optional, Dict, List, Tuple, Any
+from database import get_async_db_connection, register_statement
+
+FEED_POLL_INTERVAL = float(os.getenv("PORTAL_FEED_POLL_INTERVAL", "1"))
+FEED_BUFFER_SIZE = int(os.getenv("PORTAL_FEED_BUFFER_SIZE", "5000"))
+FEED_BATCH_SIZE = 500
+
+# Cursor key: (change_xid, change_seq) of the last change seen
+FeedKey = Tuple[int, int]
+
+# Only rows of transactions older than every running one: whatever commits
+# later sorts after them, so paging by key never skips a change
+CHANGES_SINCE = register_statement("portal_changes_since", """
+    SELECT
+        id, name, sport, position, current_school, stars, height, weight,
+        nil_value, grad_year, status, entered_portal_date,
+        change_op, change_xid::text AS change_xid, change_seq
+    FROM transfer_portal_players
+    WHERE (change_xid, change_seq) > (%s::text::xid8, %s)
+      AND change_xid < pg_snapshot_xmin(pg_current_snapshot())
+    ORDER BY change_xid, change_seq
+    LIMIT %s
+""", ("text", "int8", "int4"))
+
+FEED_HEAD = "SELECT pg_snapshot_xmin(pg_current_snapshot())::text AS xmin"
+
+
+def _change(row: Dict[str, Any]) -> Tuple[FeedKey, Dict[str, Any]]:
+    player = dict(row)
+    key = (int(player.pop('change_xid')), player.pop('change_seq'))
+    op = player.pop('change_op')
+    if player['status'] != 'active':
+        change_type = "withdrawn"
+    elif op == 'insert':
+        change_type = "entered"
+    else:
+        change_type = "updated"
+    return key, {"type": change_type, "player": player}
+
+
+async def query_changes(key: FeedKey, limit: int) -> List[Tuple[FeedKey, Dict[str, Any]]]:
+    """Changes after key, oldest first, straight from the database"""
+    async with get_async_db_connection(read_only=True) as conn, conn.cursor() as cursor:
+        await CHANGES_SINCE.execute(cursor, (str(key[0]), key[1], limit))
+        return [_change(row) for row in await cursor.fetchall()]
+
+async def query_head() -> FeedKey:
+    """Key that every change committed so far sorts before"""
+    async with get_async_db_connection(read_only=True) as conn, conn.cursor() as cursor:
+        await cursor.execute(FEED_HEAD)
+        return (int((await cursor.fetchone())['xmin']), 0)
+
+
+class PortalChangeFeed:
+    """
+    Polls for new changes and keeps the most recent buffer_size of them.
+    Cursors at or past the start of the buffer are served from memory;
+    older ones fall back to the database. Streams wait on wait() to be
+    woken by the next poll that found something.
+    """
+
+    def __init__(self, interval: float, buffer_size: int):
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self._keys: List[FeedKey] = []
+        self._changes: List[Dict[str, Any]] = []
+        # Buffer holds every change after floor; head is the newest key polled
+        self._floor: Optional[FeedKey] = None
+        self._head: Optional[FeedKey] = None
+        self._updated = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = asyncio.Event()
+        self.stats = {"polls": 0, "changes": 0, "buffer_reads": 0, "database_reads": 0, "failed": 0}
+
+    def start(self):
+        if self._task is None:
+            self._closing.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._closing.set()
+            await self._task
+            self._task = None
+
+    async def head(self) -> FeedKey:
+        """Cursor key for a client starting now"""
+        return self._head if self._head is not None else await query_head()
+
+    async def changes_since(self, key: FeedKey, limit: int) -> Tuple[List[Dict[str, Any]], FeedKey]:
+        """Up to limit changes after key and the key to continue from"""
+        if self._floor is not None and key >= self._floor:
+            self.stats["buffer_reads"] += 1
+            start = bisect_right(self._keys, key)
+            keys = self._keys[start:start + limit]
+            changes = self._changes[start:start + limit]
+        else:
+            self.stats["database_reads"] += 1
+            rows = await query_changes(key, limit)
+            keys = [row_key for row_key, _ in rows]
+            changes = [change for _, change in rows]
+            next_key = keys[-1] if keys else key
+            if len(rows) < limit and self._floor is not None and next_key < self._floor:
+                # Read everything up to the floor; continue from the buffer,
+                # or a caller with nothing to catch up on would query again
+                next_key = self._floor
+            return changes, next_key
+        return changes, (keys[-1] if keys else key)
+
+    async def wait(self, key: FeedKey, timeout: float) -> bool:
+        """True once there are changes after key, False after timeout seconds without any"""
+        if self._head is not None and self._head > key:
+            return True
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def poll(self):
+        """Append every change after the head to the buffer"""
+        if self._head is None:
+            self._head = self._floor = await query_head()
+
+        found = 0
+        while True:
+            rows = await query_changes(self._head, FEED_BATCH_SIZE)
+            for key, change in rows:
+                self._keys.append(key)
+                self._changes.append(change)
+            if rows:
+                self._head = rows[-1][0]
+                found += len(rows)
+            if len(rows) < FEED_BATCH_SIZE:
+                break
+
+        self.stats["polls"] += 1
+        if found:
+            self.stats["changes"] += found
+            overflow = len(self._keys) - self.buffer_size
+            if overflow > 0:
+                self._floor = self._keys[overflow - 1]
+                del self._keys[:overflow]
+                del self._changes[:overflow]
+            # Wake current waiters; later ones wait for the next round
+            self._updated.set()
+            self._updated = asyncio.Event()
+
+    async def _run(self):
+        while not self._closing.is_set():
+            try:
+                await self.poll()
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"[PortalFeed] Poll failed: {e}")
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+portal_feed = PortalChangeFeed(FEED_POLL_INTERVAL, FEED_BUFFER_SIZE)
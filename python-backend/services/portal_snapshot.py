@@ -0,0 +1,222 @@
+"""
+ATHLYNX AI Platform - Transfer Portal Snapshot
+In-memory columnar copy of the active transfer portal. Player listings
+filter NumPy columns instead of querying the database; the copy follows
+the table through its updated_at column (migrations/008).
+"""
+import os
+import time
+import asyncio
+from collections import Counter
+from datetime import timedelta
+from typing import Optional, Dict, List, Any
+import numpy as np
+from database import get_async_db_connection
+
+PORTAL_SNAPSHOT = os.getenv("PORTAL_SNAPSHOT", "true").lower() == "true"
+REFRESH_INTERVAL = float(os.getenv("PORTAL_SNAPSHOT_INTERVAL", "2"))
+# Deleted rows leave no updated_at behind; a periodic full load drops them
+FULL_RELOAD_INTERVAL = float(os.getenv("PORTAL_SNAPSHOT_FULL_RELOAD_INTERVAL", "300"))
+# A transaction that commits late carries an updated_at older than the
+# watermark; every refresh re-reads this much history to catch it
+WATERMARK_OVERLAP_SECONDS = float(os.getenv("PORTAL_SNAPSHOT_OVERLAP_SECONDS", "30"))
+
+PLAYER_COLUMNS = """
+    id, name, sport, position, current_school, stars, height, weight,
+    nil_value, grad_year, status, entered_portal_date, updated_at
+"""
+
+
+class PortalColumns:
+    """
+    Immutable column arrays of one version of the portal, stored in listing
+    order (stars, nil_value, id descending) so a filtered page is the first
+    matching positions and needs no sort.
+    """
+
+    def __init__(self, players: List[Dict[str, Any]]):
+        self.rows = sorted(players, key=_sort_key, reverse=True)
+        count = len(self.rows)
+        self.ids = np.fromiter((row['id'] for row in self.rows), dtype=np.int64, count=count)
+        self.stars = np.fromiter((row['stars'] or 0 for row in self.rows), dtype=np.int64, count=count)
+        self.nil = np.fromiter((float(row['nil_value'] or 0) for row in self.rows), dtype=np.float64, count=count)
+        # Sports and positions are dictionary-encoded: filters compare ints
+        self.sport_codes, self.sport = _encode([row['sport'] for row in self.rows])
+        self.position_codes, self.position = _encode([row['position'] for row in self.rows])
+        self.school = np.array([row['current_school'] or "" for row in self.rows], dtype=np.str_)
+        self._counts: Optional[Dict[str, Any]] = None
+
+    def select(self, sport: Optional[str], position: Optional[str], school: Optional[str],
+               min_rating: Optional[int], key: Optional[tuple], limit: int, offset: int) -> List[Dict[str, Any]]:
+        mask = np.ones(len(self.rows), dtype=bool)
+        if sport:
+            code = self.sport_codes.get(sport)
+            if code is None:
+                return []
+            mask &= self.sport == code
+        if position:
+            code = self.position_codes.get(position)
+            if code is None:
+                return []
+            mask &= self.position == code
+        if min_rating:
+            mask &= self.stars >= min_rating
+        if key:
+            # Rows sorting after the previous page's (stars, nil_value, id)
+            stars, nil, player_id = int(key[0]), float(key[1]), int(key[2])
+            mask &= (self.stars < stars) | (self.stars == stars) & (
+                (self.nil < nil) | (self.nil == nil) & (self.ids < player_id)
+            )
+            offset = 0
+        positions = np.flatnonzero(mask)
+        if school:
+            # Case-sensitive substring, like the LIKE '%x%' it replaces; the
+            # slowest filter, so it only scans rows the others kept
+            positions = positions[np.char.find(self.school[positions], school) >= 0]
+        return [self.rows[i] for i in positions[offset:offset + limit]]
+
+    def counts(self) -> Dict[str, Any]:
+        """Players in total and per sport and position; computed once per version"""
+        if self._counts is None:
+            self._counts = {
+                "total": len(self.rows),
+                "sport": _decode_counts(self.sport_codes, self.sport),
+                "position": _decode_counts(self.position_codes, self.position),
+            }
+        return self._counts
+
+
+def _sort_key(row: Dict[str, Any]) -> tuple:
+    return (row['stars'] or 0, row['nil_value'] or 0, row['id'])
+
+def _encode(values: List[Optional[str]]):
+    codes: Dict[Optional[str], int] = {}
+    encoded = np.fromiter((codes.setdefault(value, len(codes)) for value in values), dtype=np.int32, count=len(values))
+    return codes, encoded
+
+def _decode_counts(codes: Dict[Optional[str], int], encoded: np.ndarray) -> Counter:
+    tally = np.bincount(encoded, minlength=len(codes))
+    return Counter({value: int(tally[code]) for value, code in codes.items()})
+
+
+class PortalSnapshot:
+    """
+    Keeps the active players by id and rebuilds the columns whenever a
+    refresh changes any of them. Listings are at most one refresh interval
+    behind the table; until the first load completes, ready is False and
+    callers should query the database.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._players: Dict[int, Dict[str, Any]] = {}
+        self._columns: Optional[PortalColumns] = None
+        self._watermark = None
+        self._loaded_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._closing = asyncio.Event()
+        self.stats = {"reloads": 0, "refreshes": 0, "changed_rows": 0, "rebuilds": 0, "queries": 0, "failed": 0}
+
+    @property
+    def ready(self) -> bool:
+        return self._columns is not None
+
+    def start(self):
+        """Load the portal in the background and keep following it"""
+        if self._task is None:
+            self._closing.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._closing.set()
+            await self._task
+            self._task = None
+
+    def select(self, sport: Optional[str] = None, position: Optional[str] = None, school: Optional[str] = None,
+               min_rating: Optional[int] = None, key: Optional[tuple] = None, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """One page of active players, in the same order as the SQL listing"""
+        self.stats["queries"] += 1
+        return self._columns.select(sport, position, school, min_rating, key, limit, offset)
+
+    def counts(self) -> Dict[str, Any]:
+        """Same shape as services.stats.GroupedCounts.get()"""
+        return self._columns.counts()
+
+    async def reload(self):
+        """Replace the snapshot with every active player"""
+        # Primary, not a replica: the watermark must not run ahead of the rows read
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            # Taken before the read, so nothing committed after it is skipped
+            await cursor.execute("SELECT NOW() AS now")
+            watermark = (await cursor.fetchone())['now']
+            await cursor.execute(f"SELECT {PLAYER_COLUMNS} FROM transfer_portal_players WHERE status = 'active'")
+            rows = await cursor.fetchall()
+
+        self._players = {row['id']: _player(row) for row in rows}
+        self._watermark = watermark
+        self._loaded_at = time.monotonic()
+        self.stats["reloads"] += 1
+        self._rebuild()
+
+    async def refresh(self):
+        """Apply rows written since the watermark"""
+        since = self._watermark - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT NOW() AS now")
+            watermark = (await cursor.fetchone())['now']
+            await cursor.execute(f"SELECT {PLAYER_COLUMNS} FROM transfer_portal_players WHERE updated_at > %s", (since,))
+            rows = await cursor.fetchall()
+
+        changed = 0
+        for row in rows:
+            player = _player(row)
+            if player['status'] == 'active':
+                if self._players.get(player['id']) != player:
+                    self._players[player['id']] = player
+                    changed += 1
+            elif self._players.pop(player['id'], None) is not None:
+                changed += 1
+
+        self._watermark = watermark
+        self.stats["refreshes"] += 1
+        if changed:
+            self.stats["changed_rows"] += changed
+            self._rebuild()
+
+    def _rebuild(self):
+        # Swapped in whole: a listing never sees a half-applied refresh
+        self._columns = PortalColumns(list(self._players.values()))
+        self.stats["rebuilds"] += 1
+
+    async def _run(self):
+        while not self._closing.is_set():
+            try:
+                if self._columns is None or time.monotonic() - self._loaded_at >= FULL_RELOAD_INTERVAL:
+                    await self.reload()
+                else:
+                    await self.refresh()
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"[PortalSnapshot] Refresh failed: {e}")
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "players": len(self._players),
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+        }
+
+
+def _player(row: Dict[str, Any]) -> Dict[str, Any]:
+    # Same fields as the SQL listing
+    player = dict(row)
+    del player['updated_at']
+    return player
+
+
+portal_snapshot = PortalSnapshot(REFRESH_INTERVAL)
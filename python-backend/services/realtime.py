@@ -0,0 +1,183 @@
+"""
+ATHLYNX AI Platform - Real-Time Delivery
+In-process pub/sub that pushes per-user events (new messages,
+notifications) to connected WebSocket/SSE clients. Events cross worker
+processes through a pluggable bus.
+"""
+import os
+import json
+import asyncio
+from datetime import datetime
+from typing import Optional, Dict, Set, Callable, Any
+import psycopg
+from database import DATABASE_URL, get_async_db_connection
+
+REALTIME_BUS = os.getenv("REALTIME_BUS", "local")
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "100"))
+# NOTIFY payloads are capped at 8000 bytes; events are deltas, not documents
+MAX_EVENT_BYTES = 7900
+
+
+# ==================== BUSES ====================
+# A bus carries serialized events to the hub of every worker, including the
+# one that published them. deliver(raw) is called once per event per worker.
+
+class LocalBus:
+    """Single-process bus: delivers straight back to this worker's hub. Used in development and tests."""
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[str], None]] = None
+        self.published = 0
+
+    async def start(self, deliver: Callable[[str], None]):
+        self._deliver = deliver
+
+    async def stop(self):
+        self._deliver = None
+
+    async def publish(self, raw: str):
+        self.published += 1
+        if self._deliver is not None:
+            self._deliver(raw)
+
+
+class PostgresBus:
+    """Cross-worker bus over LISTEN/NOTIFY on the primary database"""
+
+    CHANNEL = "athlynx_realtime"
+
+    def __init__(self, conninfo: str):
+        self.conninfo = conninfo
+        self._deliver: Optional[Callable[[str], None]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+
+    async def start(self, deliver: Callable[[str], None]):
+        self._deliver = deliver
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, raw: str):
+        self.published += 1
+        async with get_async_db_connection() as conn:
+            await conn.execute("SELECT pg_notify(%s, %s)", (self.CHANNEL, raw))
+
+    async def _listen(self):
+        # A dedicated connection outside the pool: LISTEN holds it for good
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {self.CHANNEL}")
+                    async for notify in conn.notifies():
+                        self._deliver(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Realtime] Listener connection lost: {e}")
+                await asyncio.sleep(1)
+
+
+# ==================== HUB ====================
+
+class Subscription:
+    """One connected client's event queue"""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def push(self, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client fell behind: drop the backlog and tell it to refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next event, or None after timeout seconds without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RealtimeHub:
+    """Routes published events to the subscriptions of their target user"""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+    async def start(self):
+        await self.bus.start(self._deliver)
+
+    async def stop(self):
+        await self.bus.stop()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    async def publish(self, user_id: int, event_type: str, data: Dict[str, Any]):
+        """Send an event to every connection of user_id, on any worker"""
+        raw = json.dumps({"user_id": user_id, "type": event_type, "data": data}, default=json_default)
+        if len(raw.encode("utf-8")) > MAX_EVENT_BYTES:
+            # Too big to carry: clients refetch instead
+            raw = json.dumps({"user_id": user_id, "type": "resync", "data": {"reason": event_type}})
+        self.stats["published"] += 1
+        try:
+            await self.bus.publish(raw)
+        except Exception as e:
+            # Delivery is best effort; clients still catch up on their next fetch
+            self.stats["dropped"] += 1
+            print(f"[Realtime] Publish failed: {e}")
+
+    def _deliver(self, raw: str):
+        event = json.loads(raw)
+        for subscription in list(self._subscriptions.get(event["user_id"], ())):
+            subscription.push({"type": event["type"], "data": event.get("data", {})})
+            self.stats["delivered"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "bus": type(self.bus).__name__,
+            "connected_users": len(self._subscriptions),
+            "connections": sum(len(s) for s in self._subscriptions.values()),
+        }
+
+
+def json_default(value: Any) -> Any:
+    """json.dumps default for event payloads: datetimes as ISO 8601, anything else as str"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _make_bus():
+    if REALTIME_BUS == "postgres":
+        return PostgresBus(DATABASE_URL)
+    return LocalBus()
+
+
+realtime_hub = RealtimeHub(_make_bus())
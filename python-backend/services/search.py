@@ -0,0 +1,189 @@
+"""
+ATHLYNX AI Platform - Athlete Search
+Ranked full-text + trigram search, prefix autocomplete and facet counts
+over the athlete_search table (migrations/007_athlete_search.sql)
+"""
+import re
+from typing import Optional, Dict, List, Tuple
+from database import register_statement
+
+MAX_QUERY_TERMS = 8
+
+# Weighted document: name (A) > sport/position (B) > school (C)
+REFRESH_ATHLETE = """
+    INSERT INTO athlete_search (
+        user_id, first_name, last_name, sport, position, school, grad_year, nil_value, search_text, document, updated_at
+    )
+    SELECT
+        u.id, u.first_name, u.last_name, a.sport, a.position, a.school, a.grad_year, a.nil_value,
+        LOWER(CONCAT_WS(' ', u.first_name, u.last_name, a.school, a.sport, a.position)),
+        setweight(to_tsvector('simple', CONCAT_WS(' ', u.first_name, u.last_name)), 'A')
+            || setweight(to_tsvector('simple', CONCAT_WS(' ', a.sport, a.position)), 'B')
+            || setweight(to_tsvector('simple', COALESCE(a.school, '')), 'C'),
+        NOW()
+    FROM users u
+    JOIN athlete_profiles a ON a.user_id = u.id
+    WHERE u.id = %s
+    ON CONFLICT (user_id) DO UPDATE
+    SET first_name = EXCLUDED.first_name,
+        last_name = EXCLUDED.last_name,
+        sport = EXCLUDED.sport,
+        position = EXCLUDED.position,
+        school = EXCLUDED.school,
+        grad_year = EXCLUDED.grad_year,
+        nil_value = EXCLUDED.nil_value,
+        search_text = EXCLUDED.search_text,
+        document = EXCLUDED.document,
+        updated_at = NOW()
+"""
+
+AUTOCOMPLETE = register_statement("athlete_autocomplete", """
+    SELECT s.user_id AS id, s.first_name, s.last_name, s.sport, s.position, s.school
+    FROM athlete_search s, to_tsquery('simple', %s) query
+    WHERE s.document @@ query
+    ORDER BY ts_rank_cd(s.document, query) DESC, s.user_id
+    LIMIT %s
+""", ("text", "int4"))
+
+# Full-text match on whole words, or a fuzzy trigram match for typos
+RANKED_MATCHES = """
+    WITH q AS (
+        SELECT to_tsquery('simple', %s) AS query, %s::text AS term
+    ), matches AS (
+        SELECT
+            s.user_id AS id, s.first_name, s.last_name,
+            s.sport, s.position, s.school, s.grad_year, s.nil_value,
+            (ts_rank_cd(s.document, q.query) + word_similarity(q.term, s.search_text))::float8 AS score
+        FROM athlete_search s, q
+        WHERE (s.document @@ q.query OR q.term <%% s.search_text){filters}
+    )
+    SELECT * FROM matches
+"""
+
+
+# ==================== QUERY PARSING ====================
+
+def _terms(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())[:MAX_QUERY_TERMS]
+
+def match_query(text: str) -> Optional[str]:
+    """tsquery matching every word of text, or None if it has no words"""
+    terms = _terms(text)
+    return " & ".join(terms) if terms else None
+
+def prefix_query(text: str) -> Optional[str]:
+    """tsquery treating the last word of text as a prefix ("jo smi" -> jo & smi:*)"""
+    terms = _terms(text)
+    if not terms:
+        return None
+    return " & ".join(terms[:-1] + [terms[-1] + ":*"])
+
+
+# ==================== STATEMENTS ====================
+
+def _filters(sport: Optional[str], position: Optional[str], school: Optional[str]) -> Tuple[str, List[str], list]:
+    sql, names, params = "", [], []
+    if sport:
+        sql += " AND s.sport = %s"
+        names.append("sport")
+        params.append(sport)
+    if position:
+        sql += " AND s.position = %s"
+        names.append("position")
+        params.append(position)
+    if school:
+        # Substring match served by the trigram index on school
+        sql += " AND s.school ILIKE %s"
+        names.append("school")
+        params.append(f"%{school}%")
+    return sql, names, params
+
+async def search(cursor, text: Optional[str], sport: Optional[str], position: Optional[str],
+                 school: Optional[str], key: Optional[tuple], limit: int) -> List[Dict]:
+    """
+    One page of athletes. With text, pages are ordered by relevance and
+    keyed on (score, id); without it, by id as before.
+    """
+    filter_sql, names, params = _filters(sport, position, school)
+    types = ["text"] * len(params)
+    query = match_query(text) if text else None
+
+    if query:
+        sql = RANKED_MATCHES.format(filters=filter_sql)
+        names.insert(0, "ranked")
+        params = [query, text.lower()] + params
+        types = ["text", "text"] + types
+        if key:
+            sql += " WHERE score < %s OR (score = %s AND id > %s)"
+            names.append("after")
+            params += [key[0], key[0], key[1]]
+            types += ["float8", "float8", "int8"]
+        sql += " ORDER BY score DESC, id LIMIT %s"
+    else:
+        sql = f"""
+            SELECT
+                s.user_id AS id, s.first_name, s.last_name,
+                s.sport, s.position, s.school, s.grad_year, s.nil_value
+            FROM athlete_search s
+            WHERE 1=1{filter_sql}
+        """
+        if key:
+            sql += " AND s.user_id > %s"
+            names.append("after")
+            params.append(key[0])
+            types.append("int8")
+        sql += " ORDER BY s.user_id LIMIT %s"
+    params.append(limit)
+    types.append("int4")
+
+    # One named statement per filter combination
+    statement = register_statement("athlete_search:" + ",".join(names), sql, tuple(types))
+    await statement.execute(cursor, tuple(params))
+    return await cursor.fetchall()
+
+async def facets(cursor, text: Optional[str], sport: Optional[str], position: Optional[str],
+                 school: Optional[str]) -> Dict[str, List[Dict]]:
+    """Athlete counts per sport and per position among the matches, in one pass"""
+    filter_sql, names, params = _filters(sport, position, school)
+    types = ["text"] * len(params)
+    query = match_query(text) if text else None
+
+    if query:
+        source = "athlete_search s, (SELECT to_tsquery('simple', %s) AS query, %s::text AS term) q"
+        match_sql = "(s.document @@ q.query OR q.term <%% s.search_text)"
+        names.insert(0, "ranked")
+        params = [query, text.lower()] + params
+        types = ["text", "text"] + types
+    else:
+        source, match_sql = "athlete_search s", "1=1"
+
+    statement = register_statement("athlete_facets:" + ",".join(names), f"""
+        SELECT s.sport, s.position, GROUPING(s.sport) AS by_position, COUNT(*) AS count
+        FROM {source}
+        WHERE {match_sql}{filter_sql}
+        GROUP BY GROUPING SETS ((s.sport), (s.position))
+        ORDER BY count DESC
+    """, tuple(types))
+    await statement.execute(cursor, tuple(params))
+
+    result = {"sport": [], "position": []}
+    for row in await cursor.fetchall():
+        facet = "position" if row['by_position'] else "sport"
+        if row[facet] is not None:
+            result[facet].append({"value": row[facet], "count": row['count']})
+    return result
+
+async def autocomplete(cursor, text: str, limit: int) -> List[Dict]:
+    """Best athletes whose indexed words start with what was typed"""
+    query = prefix_query(text)
+    if not query:
+        return []
+    await AUTOCOMPLETE.execute(cursor, (query, limit))
+    return await cursor.fetchall()
+
+
+# ==================== INDEX MAINTENANCE ====================
+
+async def refresh_athlete(cursor, user_id: int):
+    """Rewrite one athlete's search row; call on the cursor of the profile write"""
+    await cursor.execute(REFRESH_ATHLETE, (user_id,))
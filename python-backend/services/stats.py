@@ -0,0 +1,100 @@
+"""
+ATHLYNX AI Platform - Aggregate Stats
+Totals and per-column breakdowns for the public stats endpoints, computed
+in one GROUPING SETS scan and kept between scans
+"""
+import os
+import time
+import asyncio
+from collections import Counter
+from typing import Optional, Dict, List, Tuple, Any
+from database import get_async_db_connection
+
+STATS_TTL = float(os.getenv("STATS_CACHE_TTL", "60"))
+
+
+def grouping_ids(dimensions: Tuple[str, ...]) -> Tuple[int, Dict[int, str]]:
+    """
+    GROUPING() value of the total row of GROUP BY GROUPING SETS ((), (d1),
+    (d2), ...), and of each single-dimension row mapped to its dimension.
+    GROUPING() sets one bit per dimension left out of the row's grouping,
+    most significant first.
+    """
+    total = (1 << len(dimensions)) - 1
+    by_dimension = {total ^ (1 << (len(dimensions) - 1 - i)): dimension for i, dimension in enumerate(dimensions)}
+    return total, by_dimension
+
+
+class GroupedCounts:
+    """
+    Row count of a table overall and grouped by each of its dimensions,
+    loaded at most once per ttl with concurrent callers sharing the load.
+    Rows inserted by this process can be added with record() so counts
+    stay current in between; other workers' inserts show up at the next load.
+    """
+
+    def __init__(self, table: str, dimensions: Tuple[str, ...], where: str = "TRUE", ttl: float = STATS_TTL):
+        self.dimensions = dimensions
+        self.ttl = ttl
+        columns = ", ".join(dimensions)
+        sets = ", ".join(f"({dimension})" for dimension in dimensions)
+        self.query = f"""
+            SELECT {columns}, GROUPING({columns}) AS grouping_id, COUNT(*) AS count
+            FROM {table}
+            WHERE {where}
+            GROUP BY GROUPING SETS ((), {sets})
+        """
+        self._total_id, self._dimension_ids = grouping_ids(dimensions)
+        self._counts: Optional[Dict[str, Any]] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self.stats = {"loads": 0, "hits": 0, "recorded": 0}
+
+    async def get(self) -> Dict[str, Any]:
+        """{"total": n, <dimension>: Counter, ...}"""
+        if self._fresh():
+            self.stats["hits"] += 1
+            return self._counts
+        async with self._lock:
+            if not self._fresh():
+                self._counts = await self._load()
+                self._loaded_at = time.monotonic()
+                self.stats["loads"] += 1
+        return self._counts
+
+    def record(self, **values):
+        """Count one inserted row"""
+        if self._counts is None:
+            return
+        self.stats["recorded"] += 1
+        self._counts["total"] += 1
+        for dimension in self.dimensions:
+            self._counts[dimension][values.get(dimension)] += 1
+
+    def _fresh(self) -> bool:
+        return self._counts is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    async def _load(self) -> Dict[str, Any]:
+        async with get_async_db_connection(read_only=True) as conn, conn.cursor() as cursor:
+            await cursor.execute(self.query)
+            rows = await cursor.fetchall()
+
+        counts: Dict[str, Any] = {"total": 0, **{dimension: Counter() for dimension in self.dimensions}}
+        for row in rows:
+            if row['grouping_id'] == self._total_id:
+                counts["total"] = row['count']
+            else:
+                dimension = self._dimension_ids[row['grouping_id']]
+                counts[dimension][row[dimension]] = row['count']
+        return counts
+
+
+def count_rows(counts: Counter, name: str, limit: Optional[int] = None, skip_none: bool = False) -> List[Dict[str, Any]]:
+    """[{name: value, "count": n}, ...] from most to least common"""
+    items = [(value, count) for value, count in counts.items() if count > 0 and not (skip_none and value is None)]
+    items.sort(key=lambda item: item[1], reverse=True)
+    return [{name: value, "count": count} for value, count in items[:limit]]
+
+
+waitlist_counts = GroupedCounts("waitlist", ("role", "sport"))
+transfer_portal_counts = GroupedCounts("transfer_portal_players", ("sport", "position"), where="status = 'active'")
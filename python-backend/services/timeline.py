@@ -0,0 +1,266 @@
+"""
+ATHLYNX AI Platform - Home Timeline Service
+Pushes each new post into its author's followers' home_timeline rows
+(fan-out-on-write). Posts by accounts with very large followings are not
+pushed; followers pull those at read time instead (fan-out-on-read).
+"""
+import os
+import asyncio
+from datetime import datetime
+from typing import Optional, List, Tuple, Set
+from database import get_async_db_connection
+
+TIMELINE_MAX_LENGTH = int(os.getenv("HOME_TIMELINE_MAX_LENGTH", "800"))
+# Authors with at least this many followers are read on demand, not fanned out
+FANOUT_FOLLOWER_LIMIT = int(os.getenv("HOME_TIMELINE_FANOUT_LIMIT", "10000"))
+FANOUT_BATCH_SIZE = int(os.getenv("HOME_TIMELINE_FANOUT_BATCH_SIZE", "1000"))
+# Recent posts copied into a timeline when its owner follows someone new
+FOLLOW_BACKFILL_POSTS = int(os.getenv("HOME_TIMELINE_BACKFILL_POSTS", "50"))
+TRIM_INTERVAL = float(os.getenv("HOME_TIMELINE_TRIM_INTERVAL", "60"))
+TRIM_BATCH_SIZE = 500
+
+
+# ==================== READ PATH ====================
+
+def page_ids_query(seek: bool) -> Tuple[str, Tuple[str, ...]]:
+    """
+    SQL selecting one page of (post_id, created_at) for a viewer's home
+    timeline, newest first, and its parameter types.
+
+    Merges the viewer's stored timeline with the latest posts of followed
+    high-follower authors (and the viewer's own, if they are one). Each
+    branch reads at most one page through an index, so the cost is
+    O(page size) rather than O(follow graph).
+
+    Parameters: viewer, [created_at, id,] limit, viewer, viewer,
+    fan-out limit, [created_at, id,] limit, limit.
+    """
+    stored_seek = "AND (created_at, post_id) < (%s, %s)" if seek else ""
+    pulled_seek = "AND (created_at, id) < (%s, %s)" if seek else ""
+    seek_types = ("timestamptz", "int8") if seek else ()
+
+    query = f"""
+        (SELECT post_id, created_at FROM home_timeline
+         WHERE user_id = %s {stored_seek}
+         ORDER BY created_at DESC, post_id DESC
+         LIMIT %s)
+        UNION
+        (SELECT pulled.id, pulled.created_at
+         FROM (
+             SELECT following_id AS author_id FROM user_connections WHERE follower_id = %s
+             UNION SELECT %s
+         ) authors
+         JOIN user_stats us ON us.user_id = authors.author_id AND us.followers_count >= %s
+         CROSS JOIN LATERAL (
+             SELECT id, created_at FROM posts
+             WHERE user_id = authors.author_id {pulled_seek}
+             ORDER BY created_at DESC, id DESC
+             LIMIT %s
+         ) pulled)
+        ORDER BY created_at DESC, post_id DESC
+        LIMIT %s
+    """
+    types = ("int4", *seek_types, "int4", "int4", "int4", "int4", *seek_types, "int4", "int4")
+    return query, types
+
+
+def page_params(viewer_id: int, key: Optional[tuple], limit: int) -> tuple:
+    """Parameters for page_ids_query, in placeholder order"""
+    seek = tuple(key) if key else ()
+    return (viewer_id, *seek, limit, viewer_id, viewer_id, FANOUT_FOLLOWER_LIMIT, *seek, limit, limit)
+
+
+# ==================== WRITE PATH ====================
+
+FANOUT_BATCH = """
+    WITH batch AS (
+        SELECT follower_id FROM user_connections
+        WHERE following_id = %s AND follower_id > %s
+        ORDER BY follower_id
+        LIMIT %s
+    ), written AS (
+        INSERT INTO home_timeline (user_id, post_id, author_id, created_at)
+        SELECT follower_id, %s, %s, %s FROM batch
+        ON CONFLICT DO NOTHING
+        RETURNING user_id
+    )
+    SELECT
+        (SELECT MAX(follower_id) FROM batch) AS last_id,
+        ARRAY(SELECT user_id FROM written) AS written
+"""
+
+BACKFILL = """
+    INSERT INTO home_timeline (user_id, post_id, author_id, created_at)
+    SELECT %s, id, user_id, created_at
+    FROM posts
+    WHERE user_id = %s
+    ORDER BY created_at DESC, id DESC
+    LIMIT %s
+    ON CONFLICT DO NOTHING
+"""
+
+TRIM = """
+    WITH cutoff AS (
+        SELECT owners.user_id, oldest.created_at, oldest.post_id
+        FROM unnest(%s::int[]) AS owners(user_id)
+        CROSS JOIN LATERAL (
+            SELECT created_at, post_id FROM home_timeline
+            WHERE user_id = owners.user_id
+            ORDER BY created_at DESC, post_id DESC
+            OFFSET %s LIMIT 1
+        ) oldest
+    )
+    DELETE FROM home_timeline h
+    USING cutoff c
+    WHERE h.user_id = c.user_id AND (h.created_at, h.post_id) <= (c.created_at, c.post_id)
+"""
+
+
+class HomeTimelineService:
+    """
+    Applies timeline writes in the background, in the order they were
+    queued. Jobs are queued after the post/follow has committed; jobs still
+    queued when the process dies are lost, and the affected timelines only
+    pick the posts up again through a later follow backfill.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._trim_task: Optional[asyncio.Task] = None
+        self._closing = asyncio.Event()
+        # Timelines that grew since the last trim
+        self._dirty: Set[int] = set()
+        self.stats = {"fanned_out": 0, "pulled_authors": 0, "entries_written": 0, "trimmed": 0, "failed": 0}
+
+    def start(self):
+        """Start the write worker and the periodic trim"""
+        if self._task is None:
+            self._closing.clear()
+            self._task = asyncio.create_task(self._run())
+            self._trim_task = asyncio.create_task(self._run_trim())
+
+    async def stop(self):
+        """Drain queued jobs, trim once more and stop"""
+        if self._task is not None:
+            self._closing.set()
+            await self._queue.put(None)
+            await self._task
+            await self._trim_task
+            self._task = self._trim_task = None
+        await self.trim()
+
+    # ---- producers ----
+
+    def post_created(self, post_id: int, author_id: int, created_at: datetime):
+        """Queue fan-out of a committed post"""
+        self._queue.put_nowait(("post", post_id, author_id, created_at))
+
+    def followed(self, follower_id: int, following_id: int):
+        """Queue a backfill of following_id's recent posts into follower_id's timeline"""
+        self._queue.put_nowait(("follow", follower_id, following_id))
+
+    def unfollowed(self, follower_id: int, following_id: int):
+        """Queue removal of following_id's posts from follower_id's timeline"""
+        self._queue.put_nowait(("unfollow", follower_id, following_id))
+
+    # ---- worker ----
+
+    async def _run(self):
+        while True:
+            job = await self._queue.get()
+            if job is None:
+                break
+            try:
+                await self._apply(job)
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"[Timeline] {job[0]} job failed: {e}")
+
+    async def _apply(self, job: tuple):
+        kind = job[0]
+        if kind == "post":
+            await self._fan_out(*job[1:])
+        elif kind == "follow":
+            await self._backfill(*job[1:])
+        elif kind == "unfollow":
+            await self._remove(*job[1:])
+
+    async def _is_pulled(self, cursor, author_id: int) -> bool:
+        await cursor.execute("SELECT followers_count FROM user_stats WHERE user_id = %s", (author_id,))
+        row = await cursor.fetchone()
+        return bool(row) and row['followers_count'] >= FANOUT_FOLLOWER_LIMIT
+
+    async def _fan_out(self, post_id: int, author_id: int, created_at: datetime):
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            if await self._is_pulled(cursor, author_id):
+                # Followers read this author's posts directly
+                self.stats["pulled_authors"] += 1
+                return
+            # Authors see their own posts in their home timeline
+            await cursor.execute("""
+                INSERT INTO home_timeline (user_id, post_id, author_id, created_at)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT DO NOTHING
+            """, (author_id, post_id, author_id, created_at))
+        self._dirty.add(author_id)
+
+        # One short transaction per batch of followers
+        last_follower = 0
+        while True:
+            async with get_async_db_connection() as conn, conn.cursor() as cursor:
+                await cursor.execute(FANOUT_BATCH, (
+                    author_id, last_follower, FANOUT_BATCH_SIZE, post_id, author_id, created_at
+                ))
+                result = await cursor.fetchone()
+
+            if result['last_id'] is None:
+                break
+            last_follower = result['last_id']
+            self._dirty.update(result['written'])
+            self.stats["entries_written"] += len(result['written'])
+
+        self.stats["fanned_out"] += 1
+
+    async def _backfill(self, follower_id: int, following_id: int):
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            if await self._is_pulled(cursor, following_id):
+                return
+            await cursor.execute(BACKFILL, (follower_id, following_id, FOLLOW_BACKFILL_POSTS))
+            self.stats["entries_written"] += cursor.rowcount
+        self._dirty.add(follower_id)
+
+    async def _remove(self, follower_id: int, following_id: int):
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                "DELETE FROM home_timeline WHERE user_id = %s AND author_id = %s",
+                (follower_id, following_id)
+            )
+
+    # ---- trimming ----
+
+    async def trim(self):
+        """Cut every timeline that grew since the last trim back to TIMELINE_MAX_LENGTH entries"""
+        owners: List[int] = list(self._dirty)
+        self._dirty.clear()
+        for start in range(0, len(owners), TRIM_BATCH_SIZE):
+            batch = owners[start:start + TRIM_BATCH_SIZE]
+            try:
+                async with get_async_db_connection() as conn, conn.cursor() as cursor:
+                    await cursor.execute(TRIM, (batch, TIMELINE_MAX_LENGTH))
+                    self.stats["trimmed"] += cursor.rowcount
+            except Exception as e:
+                # Try these timelines again next time
+                self._dirty.update(batch)
+                print(f"[Timeline] Trim failed: {e}")
+
+    async def _run_trim(self):
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=TRIM_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            await self.trim()
+
+
+home_timeline = HomeTimelineService()
@@ -0,0 +1,62 @@
+"""
+Unit tests for the python backend. Nothing here needs a running database:
+the import-time pool opens no connections, and tests of code that queries
+swap its get_async_db_connection for FakeDatabase.connection.
+"""
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional
+
+# database.py warms up its sync pool on import
+os.environ.setdefault("DB_POOL_MIN_SIZE", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeCursor:
+    def __init__(self, db: "FakeDatabase"):
+        self.db = db
+        self._rows: List[dict] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, params=None, prepare=None):
+        self.db.executed.append((query, params))
+        result = self.db.respond(query, params)
+        if hasattr(result, "__await__"):
+            result = await result
+        self._rows = list(result or [])
+        return self
+
+    async def fetchone(self) -> Optional[dict]:
+        return self._rows[0] if self._rows else None
+
+    async def fetchall(self) -> List[dict]:
+        return self._rows
+
+
+class FakeConnection:
+    def __init__(self, db: "FakeDatabase"):
+        self.db = db
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self.db)
+
+
+class FakeDatabase:
+    """
+    Records every statement executed and answers each with the rows that
+    respond(query, params) returns; respond may be a coroutine function.
+    """
+
+    def __init__(self, respond: Callable = lambda query, params: []):
+        self.respond = respond
+        self.executed: List[tuple] = []
+
+    @asynccontextmanager
+    async def connection(self, read_only: bool = False, user_id: Optional[int] = None):
+        yield FakeConnection(self)
@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+import time
+
+import pytest
+
+from services.cache import CacheEntry, ResponseCache
+
+_names = itertools.count()
+
+
+def make_cache(ttl: float = 60, stale_ttl: float = 60, **kwargs) -> ResponseCache:
+    return ResponseCache(f"test_{next(_names)}", ttl=ttl, stale_ttl=stale_ttl, max_entries=100, **kwargs)
+
+
+class Loader:
+    """Returns 1, 2, 3, ... on successive calls, each after gate opens"""
+
+    def __init__(self):
+        self.calls = 0
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def __call__(self):
+        self.calls += 1
+        value = self.calls
+        await self.gate.wait()
+        return value
+
+
+def age(cache: ResponseCache, key: str, seconds: float):
+    entry = cache.backend.get(key)
+    cache.backend.set(key, entry._replace(stored_at=entry.stored_at - seconds))
+
+async def settle(cache: ResponseCache):
+    """Wait for background refreshes to finish"""
+    while cache._inflight:
+        await asyncio.gather(*cache._inflight.values(), return_exceptions=True)
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache, loader = make_cache(), Loader()
+        loader.gate.clear()
+        waiting = [asyncio.create_task(cache.get("k", loader)) for _ in range(5)]
+        await asyncio.sleep(0)
+        loader.gate.set()
+        return loader, await asyncio.gather(*waiting), cache
+
+    loader, results, cache = asyncio.run(scenario())
+    assert loader.calls == 1
+    assert results == [1] * 5
+    assert cache.stats["misses"] == 5 and cache.stats["loads"] == 1
+
+def test_fresh_entries_are_served_without_loading():
+    async def scenario():
+        cache, loader = make_cache(), Loader()
+        await cache.get("k", loader)
+        return loader, await cache.get("k", loader), cache
+
+    loader, value, cache = asyncio.run(scenario())
+    assert (loader.calls, value, cache.stats["hits"]) == (1, 1, 1)
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    async def scenario():
+        cache, loader = make_cache(ttl=10, stale_ttl=10), Loader()
+        await cache.get("k", loader)
+        age(cache, "k", 15)
+
+        loader.gate.clear()
+        stale = [await cache.get("k", loader) for _ in range(3)]
+        loader.gate.set()
+        await settle(cache)
+        return loader, stale, await cache.get("k", loader), cache
+
+    loader, stale, refreshed, cache = asyncio.run(scenario())
+    assert stale == [1, 1, 1]
+    assert loader.calls == 2
+    assert refreshed == 2
+    assert cache.stats["stale_hits"] == 3
+
+def test_entry_past_stale_window_is_reloaded_before_answering():
+    async def scenario():
+        cache, loader = make_cache(ttl=10, stale_ttl=10), Loader()
+        await cache.get("k", loader)
+        age(cache, "k", 25)
+        return await cache.get("k", loader)
+
+    assert asyncio.run(scenario()) == 2
+
+def test_invalidate_makes_entries_stale():
+    async def scenario():
+        cache, loader = make_cache(), Loader()
+        await cache.get("k", loader)
+        cache.invalidate()
+        served = await cache.get("k", loader)
+        await settle(cache)
+        return served, await cache.get("k", loader)
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+def test_discard_drops_entry_and_inflight_load():
+    async def scenario():
+        cache, loader = make_cache(), Loader()
+        loader.gate.clear()
+        first = asyncio.create_task(cache.get("k", loader))
+        await asyncio.sleep(0)
+        # The profile changed while it was being read
+        cache.discard("k")
+        loader.gate.set()
+        results = [await first, await cache.get("k", loader), await cache.get("k", loader)]
+        return results, cache.backend.get("k")
+
+    results, entry = asyncio.run(scenario())
+    assert results == [1, 2, 2]
+    assert entry.value == 2
+
+def test_failed_load_reaches_every_waiter_and_is_not_cached():
+    async def scenario():
+        cache = make_cache()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise RuntimeError("down")
+
+        results = await asyncio.gather(*(cache.get("k", failing) for _ in range(3)), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await cache.get("k", failing)
+        return calls, results, cache
+
+    calls, results, cache = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert calls == 2
+    assert cache.stats["load_errors"] == 2
+    assert cache.backend.get("k") is None
+
+def test_memory_backend_evicts_least_recently_used():
+    cache = ResponseCache(f"test_{next(_names)}", ttl=60, stale_ttl=0, max_entries=2)
+    for key in ("a", "b"):
+        cache.backend.set(key, CacheEntry(key, time.time(), 0))
+    cache.backend.get("a")
+    cache.backend.set("c", CacheEntry("c", time.time(), 0))
+    assert cache.backend.get("b") is None
+    assert cache.backend.get("a").value == "a"
+
+def test_shared_backend_is_seen_by_every_cache_on_the_file(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = make_cache(shared_path=path), make_cache(shared_path=path)
+
+    async def scenario():
+        await first.get("k", Loader())
+        return await second.get("k", Loader())
+
+    assert asyncio.run(scenario()) == 1
+    first.invalidate()
+    assert second.backend.generation() == 1
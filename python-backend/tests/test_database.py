@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from psycopg.types.numeric import Int4, Int8, Float8
+
+from database import (
+    InvalidCursor, PreparedStatement, decode_cursor, encode_cursor, next_cursor, register_statement
+)
+
+
+# ==================== CURSORS ====================
+
+def test_cursor_round_trip():
+    key = (datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc), Decimal("1250.50"), 0.75, 42, "qb")
+    assert decode_cursor(encode_cursor(key), (datetime, Decimal, float, int, str)) == key
+
+def test_cursor_is_url_safe():
+    token = encode_cursor(("??>>~~", 1))
+    assert "=" not in token and "+" not in token and "/" not in token
+
+def test_cursor_accepts_int_for_float_and_decimal():
+    assert decode_cursor(encode_cursor((3, 0, 7)), (float, Decimal, int)) == (3.0, Decimal(0), 7)
+
+@pytest.mark.parametrize("values, types", [
+    (("2026-03-01T12:30:00+00:00", "7"), (datetime, int)),
+    (("not a date", 7), (datetime, int)),
+    ((5, 7), (datetime, int)),
+    ((True, 7), (int, int)),
+    ((1.5, 7), (int, int)),
+    ((3, "abc", 7), (int, Decimal, int)),
+    ((3, "NaN", 7), (int, Decimal, int)),
+    ((1, 2), (int,)),
+    ((1,), (int, int)),
+])
+def test_cursor_rejects_wrong_types_and_lengths(values, types):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(values), types)
+
+@pytest.mark.parametrize("token", ["", "@@@", "not-base64!", "eyJhIjogMX0", "bnVsbA", "w6k"])
+def test_cursor_rejects_garbage(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, (int,))
+
+def test_next_cursor_only_for_full_pages():
+    rows = [{"created_at": datetime(2026, 1, i + 1, tzinfo=timezone.utc), "id": i} for i in range(3)]
+    assert next_cursor(rows, 4, ("created_at", "id")) is None
+    assert next_cursor([], 0, ("id",)) is None
+
+    token = next_cursor(rows, 3, ("created_at", "id"))
+    assert decode_cursor(token, (datetime, int)) == (rows[-1]["created_at"], rows[-1]["id"])
+
+
+# ==================== PREPARED STATEMENTS ====================
+
+def test_bind_coerces_to_declared_types():
+    statement = PreparedStatement(
+        "test_bind", "SELECT %s, %s, %s, %s, %s, %s, %s",
+        ("int4", "int8", "float8", "text", "bool", "numeric", "timestamptz"),
+    )
+    bound = statement.bind((1, 2, 3, "x", 1, "9.99", "2026-03-01T12:30:00+00:00"))
+
+    assert [type(value) for value in bound[:3]] == [Int4, Int8, Float8]
+    assert bound[3:6] == ("x", True, Decimal("9.99"))
+    assert bound[6] == datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+
+def test_bind_passes_none_and_datetimes_through():
+    when = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    statement = PreparedStatement("test_bind_none", "SELECT %s, %s", ("int4", "timestamptz"))
+    assert statement.bind((None, when)) == (None, when)
+
+def test_bind_checks_parameter_count():
+    statement = PreparedStatement("test_bind_count", "SELECT %s", ("int4",))
+    with pytest.raises(ValueError):
+        statement.bind((1, 2))
+
+def test_statement_definition_is_validated():
+    with pytest.raises(ValueError):
+        PreparedStatement("test_placeholders", "SELECT %s, %s", ("int4",))
+    with pytest.raises(ValueError):
+        PreparedStatement("test_unknown_type", "SELECT %s", ("uuid",))
+    # %% is a literal percent sign, not a placeholder
+    PreparedStatement("test_literal_percent", "SELECT 'a' LIKE 'a%%' AND %s", ("bool",))
+
+def test_register_statement_reuses_identical_definitions():
+    first = register_statement("test_registry", "SELECT %s", ("int4",))
+    assert register_statement("test_registry", "SELECT %s", ("int4",)) is first
+    with pytest.raises(ValueError):
+        register_statement("test_registry", "SELECT %s", ("int8",))
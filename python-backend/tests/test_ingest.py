@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from psycopg import errors
+
+from services import ingest
+from services.ingest import BulkIngestor, Durability, FlushMethod
+
+
+def make_ingestor(monkeypatch, taken_emails=(), failure=None):
+    """Waitlist-style ingestor whose writes reject taken emails the way a unique index would"""
+    ingestor = BulkIngestor(
+        table="waitlist", columns=["email"], flush_size=100,
+        durability=Durability.GROUP_COMMIT, method=FlushMethod.VALUES, returning=("id",),
+    )
+    statements = []
+
+    async def write(rows):
+        statements.append(len(rows))
+        if failure is not None:
+            raise failure
+        if any(email in taken_emails for (email,) in rows):
+            raise errors.UniqueViolation("duplicate key value violates unique constraint")
+        return [{"id": email} for (email,) in rows]
+
+    monkeypatch.setattr(ingestor, "_write", write)
+    return ingestor, statements
+
+async def add_all(ingestor, emails):
+    waiting = [asyncio.create_task(ingestor.add({"email": email})) for email in emails]
+    await asyncio.sleep(0)
+    await ingestor.flush()
+    return await asyncio.gather(*waiting, return_exceptions=True)
+
+
+def test_batch_is_one_statement(monkeypatch):
+    ingestor, statements = make_ingestor(monkeypatch)
+    results = asyncio.run(add_all(ingestor, ["a", "b", "c"]))
+    assert results == [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    assert statements == [3]
+
+def test_rejected_row_fails_only_its_waiter(monkeypatch):
+    ingestor, statements = make_ingestor(monkeypatch, taken_emails={"b"})
+    results = asyncio.run(add_all(ingestor, ["a", "b", "c"]))
+
+    assert results[0] == {"id": "a"} and results[2] == {"id": "c"}
+    assert isinstance(results[1], errors.UniqueViolation)
+    # The batch, then each row on its own
+    assert statements == [3, 1, 1, 1]
+    assert ingestor.stats["flushed"] == 2 and ingestor.stats["failed"] == 1
+    assert ingestor.stats["retried_batches"] == 1
+
+@pytest.mark.parametrize("failure", [ConnectionError("server closed the connection"), errors.QueryCanceled("timeout")])
+def test_other_failures_fail_the_batch_without_retrying(monkeypatch, failure):
+    ingestor, statements = make_ingestor(monkeypatch, failure=failure)
+    results = asyncio.run(add_all(ingestor, ["a", "b"]))
+
+    assert all(result is failure for result in results)
+    assert statements == [2]
+    assert ingestor.stats["failed"] == 2
+
+def test_track_signup_buffers_one_analytics_row(monkeypatch):
+    written = []
+
+    async def write(rows):
+        written.extend(rows)
+        return []
+
+    monkeypatch.setattr(ingest.signup_ingestor, "_write", write)
+
+    async def scenario():
+        await ingest.track_signup({
+            "fullName": "Jo Smith", "email": "jo@example.com", "role": "athlete",
+            "referralSource": "direct", "utmSource": "ig", "signupType": "waitlist",
+            "ipAddress": "10.0.0.1", "userAgent": "Mozilla",
+        })
+        buffered = len(written)
+        await ingest.signup_ingestor.flush()
+        return buffered
+
+    assert asyncio.run(scenario()) == 0
+    row = dict(zip(ingest.signup_ingestor.columns, written[0]))
+    assert row["full_name"] == "Jo Smith" and row["referral_source"] == "direct"
+    assert row["utm_source"] == "ig" and row["utm_medium"] is None
+    assert row["signup_type"] == "waitlist" and row["ip_address"] == "10.0.0.1"
+    assert row["created_at"] is not None
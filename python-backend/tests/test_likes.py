@@ -0,0 +1,168 @@
+import asyncio
+
+from psycopg import errors
+
+from services import events, likes
+from services.likes import LikeBuffer
+from conftest import FakeDatabase
+
+
+def like_database(liked_pairs=(), changed_posts=()):
+    """Answers committed-state reads from liked_pairs and flushes with changed_posts"""
+    def respond(query, params):
+        if query is likes.APPLY_LIKES:
+            return [{"post_id": post_id} for post_id in changed_posts]
+        return [{"liked": tuple(params) in liked_pairs}]
+    return FakeDatabase(respond)
+
+def flushed(db: FakeDatabase):
+    return [params for query, params in db.executed if query is likes.APPLY_LIKES]
+
+def reads(db: FakeDatabase) -> int:
+    return sum(1 for query, _ in db.executed if query is not likes.APPLY_LIKES)
+
+
+def test_toggle_burst_reads_once_and_writes_final_state(monkeypatch):
+    db = like_database(liked_pairs={(1, 9)})
+    monkeypatch.setattr(likes, "get_async_db_connection", db.connection)
+    buffer = LikeBuffer()
+
+    async def scenario():
+        actions = [await buffer.toggle(1, 9) for _ in range(3)]
+        await buffer.flush()
+        return actions
+
+    assert asyncio.run(scenario()) == ["unliked", "liked", "unliked"]
+    assert reads(db) == 1
+    assert flushed(db) == [([1], [9], [False])]
+    assert buffer.stats["coalesced"] == 2
+
+def test_flush_writes_pairs_in_key_order_and_emits_for_changed_posts(monkeypatch):
+    db = like_database(changed_posts=(3,))
+    monkeypatch.setattr(likes, "get_async_db_connection", db.connection)
+    emitted = []
+    monkeypatch.setitem(events._subscribers, events.POST_LIKED, [lambda post_id: emitted.append(post_id)])
+    buffer = LikeBuffer()
+
+    async def scenario():
+        for post_id, user_id in [(5, 1), (3, 2), (3, 1)]:
+            await buffer.toggle(post_id, user_id)
+        await buffer.flush()
+        # Nothing buffered: no statement
+        await buffer.flush()
+
+    asyncio.run(scenario())
+    assert flushed(db) == [([3, 3, 5], [1, 2, 1], [True, True, True])]
+    assert emitted == [3]
+    assert buffer.stats["flushed"] == 3 and buffer.stats["batches"] == 1
+
+def test_full_buffer_flushes_on_toggle(monkeypatch):
+    db = like_database()
+    monkeypatch.setattr(likes, "get_async_db_connection", db.connection)
+    buffer = LikeBuffer(flush_size=2)
+
+    async def scenario():
+        await buffer.toggle(1, 1)
+        assert flushed(db) == []
+        await buffer.toggle(2, 1)
+
+    asyncio.run(scenario())
+    assert flushed(db) == [([1, 2], [1, 1], [True, True])]
+
+def test_toggle_during_flush_starts_from_the_state_being_written(monkeypatch):
+    buffer = LikeBuffer()
+    during_flush = []
+
+    async def respond(query, params):
+        if query is likes.APPLY_LIKES and not during_flush:
+            during_flush.append(await buffer.toggle(1, 9))
+            return []
+        return [{"liked": False}]
+
+    db = FakeDatabase(respond)
+    monkeypatch.setattr(likes, "get_async_db_connection", db.connection)
+
+    async def scenario():
+        await buffer.toggle(1, 9)
+        await buffer.flush()
+        await buffer.flush()
+
+    asyncio.run(scenario())
+    # The first flush writes "liked"; the toggle made meanwhile flips that,
+    # without reading the not-yet-committed row
+    assert during_flush == ["unliked"]
+    assert reads(db) == 1
+    assert flushed(db) == [([1], [9], [True]), ([1], [9], [False])]
+
+def test_rejected_pair_is_dropped_alone(monkeypatch):
+    def respond(query, params):
+        if query is likes.APPLY_LIKES:
+            if 404 in params[0]:
+                raise errors.ForeignKeyViolation("violates foreign key constraint")
+            return [{"post_id": post_id} for post_id in params[0]]
+        return [{"liked": False}]
+
+    db = FakeDatabase(respond)
+    monkeypatch.setattr(likes, "get_async_db_connection", db.connection)
+    emitted = []
+    monkeypatch.setitem(events._subscribers, events.POST_LIKED, [lambda post_id: emitted.append(post_id)])
+    buffer = LikeBuffer()
+
+    async def scenario():
+        for post_id in (3, 404, 5):
+            await buffer.toggle(post_id, 9)
+        await buffer.flush()
+
+    asyncio.run(scenario())
+    # The batch, then each pair on its own
+    assert [params[0] for params in flushed(db)] == [[3, 5, 404], [3], [5], [404]]
+    assert sorted(emitted) == [3, 5]
+    assert buffer.stats["flushed"] == 2 and buffer.stats["failed"] == 1
+    assert buffer._pending == {}
+
+def test_transient_failure_keeps_toggles_for_the_next_flush(monkeypatch):
+    failures = [errors.DeadlockDetected("deadlock detected")]
+
+    def respond(query, params):
+        if query is likes.APPLY_LIKES:
+            if failures:
+                raise failures.pop()
+            return [{"post_id": post_id} for post_id in params[0]]
+        return [{"liked": False}]
+
+    db = FakeDatabase(respond)
+    monkeypatch.setattr(likes, "get_async_db_connection", db.connection)
+    buffer = LikeBuffer()
+
+    async def scenario():
+        await buffer.toggle(1, 9)
+        await buffer.toggle(2, 9)
+        await buffer.flush()
+        # Toggled again while waiting for the retry: the newer state wins
+        await buffer.toggle(2, 9)
+        await buffer.flush()
+
+    asyncio.run(scenario())
+    assert flushed(db) == [([1, 2], [9, 9], [True, True]), ([1, 2], [9, 9], [True, False])]
+    assert buffer.stats["retried"] == 2 and buffer.stats["failed"] == 0
+    assert buffer.stats["flushed"] == 2
+
+def test_toggles_are_dropped_after_repeated_failures(monkeypatch):
+    def respond(query, params):
+        if query is likes.APPLY_LIKES:
+            raise errors.DeadlockDetected("deadlock detected")
+        return [{"liked": False}]
+
+    db = FakeDatabase(respond)
+    monkeypatch.setattr(likes, "get_async_db_connection", db.connection)
+    buffer = LikeBuffer()
+
+    async def scenario():
+        await buffer.toggle(1, 9)
+        for _ in range(likes.LIKE_FLUSH_ATTEMPTS):
+            await buffer.flush()
+
+    asyncio.run(scenario())
+    assert len(flushed(db)) == likes.LIKE_FLUSH_ATTEMPTS
+    assert buffer.stats["failed"] == 1
+    assert buffer._pending == {} and buffer._flushing == {}
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from services import notifications
+from services.notifications import NotificationPipeline
+from conftest import FakeDatabase
+
+USERS = {1: ("Ann", "Lee"), 2: ("Bo", "Kim"), 3: ("Cy", "Ray")}
+
+
+@pytest.fixture
+def written(monkeypatch):
+    """Rows the pipeline inserts; posts are all authored by user 9"""
+    rows = []
+
+    def respond(query, params):
+        if "FROM posts" in query:
+            return [{"id": post_id, "user_id": 9} for post_id in params[0]]
+        return [{"id": user_id, "first_name": first, "last_name": last}
+                for user_id, (first, last) in USERS.items() if user_id in params[0]]
+
+    async def insert_values(conn, table, columns, values, returning):
+        rows.extend(dict(zip(columns, value)) for value in values)
+        return []
+
+    monkeypatch.setattr(notifications, "get_async_db_connection", FakeDatabase(respond).connection)
+    monkeypatch.setattr(notifications, "insert_values_async", insert_values)
+    return rows
+
+def messages(rows):
+    return sorted(row["message"] for row in rows)
+
+
+def test_burst_of_messages_from_one_sender_is_counted(written):
+    pipeline = NotificationPipeline(window=1)
+    for _ in range(3):
+        pipeline.add("message", 1, recipient_id=9, subject_id=1)
+    pipeline.add("message", 2, recipient_id=9, subject_id=2)
+
+    asyncio.run(pipeline.flush())
+    assert messages(written) == ["Ann Lee sent you 3 messages", "Bo Kim sent you a message"]
+    assert pipeline.stats["coalesced"] == 2
+
+def test_likes_name_the_newest_actor_and_count_the_others(written):
+    pipeline = NotificationPipeline(window=1)
+    for user_id in (1, 2, 3):
+        pipeline.add("like", user_id, subject_id=5)
+    pipeline.retract("like", 3, subject_id=5)
+    # The author liking their own post is not news to them
+    pipeline.add("like", 9, subject_id=5)
+
+    asyncio.run(pipeline.flush())
+    assert [row["user_id"] for row in written] == [9]
+    assert messages(written) == ["Bo Kim and 1 others liked your post"]
@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from services import portal_feed
+from services.portal_feed import PortalChangeFeed
+
+
+class FakeTable:
+    """Change log of transfer_portal_players, keyed (xid, seq); seq starts at 1 like the sequence"""
+
+    def __init__(self, head=(100, 0)):
+        self.head = head
+        self.changes = []
+        self.queries = 0
+
+    def commit(self, count: int):
+        xid = self.head[0]
+        for seq in range(1, count + 1):
+            self.changes.append(((xid, seq), {"type": "updated", "player": {"id": len(self.changes) + 1}}))
+        self.head = (xid + 1, 0)
+
+    async def query_changes(self, key, limit):
+        self.queries += 1
+        return [change for change in self.changes if change[0] > key][:limit]
+
+    async def query_head(self):
+        return self.head
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeTable()
+    monkeypatch.setattr(portal_feed, "query_changes", table.query_changes)
+    monkeypatch.setattr(portal_feed, "query_head", table.query_head)
+    return table
+
+def player_ids(changes):
+    return [change["player"]["id"] for change in changes]
+
+
+def test_changes_after_the_first_poll_are_served_from_memory(table):
+    feed = PortalChangeFeed(interval=1, buffer_size=10)
+
+    async def scenario():
+        await feed.poll()
+        start = await feed.head()
+        table.commit(3)
+        await feed.poll()
+        queries = table.queries
+        changes, key = await feed.changes_since(start, 2)
+        more, end = await feed.changes_since(key, 10)
+        return queries, changes, key, more, end
+
+    queries, changes, key, more, end = asyncio.run(scenario())
+    assert player_ids(changes) == [1, 2]
+    assert key == (100, 2)
+    assert player_ids(more) == [3]
+    assert end == (100, 3)
+    assert table.queries == queries
+    assert feed.stats["buffer_reads"] == 2 and feed.stats["database_reads"] == 0
+
+def test_caught_up_cursor_gets_nothing_and_keeps_its_key(table):
+    feed = PortalChangeFeed(interval=1, buffer_size=10)
+
+    async def scenario():
+        table.commit(2)
+        await feed.poll()
+        return await feed.changes_since(await feed.head(), 10)
+
+    assert asyncio.run(scenario()) == ([], (101, 0))
+
+def test_overflow_raises_the_floor_and_older_cursors_read_the_database(table):
+    feed = PortalChangeFeed(interval=1, buffer_size=3)
+
+    async def scenario():
+        await feed.poll()
+        start = await feed.head()
+        table.commit(5)
+        await feed.poll()
+        old = await feed.changes_since(start, 10)
+        recent = await feed.changes_since((100, 2), 10)
+        return old, recent
+
+    (old, old_key), (recent, recent_key) = asyncio.run(scenario())
+    # Buffer keeps the last 3 changes; the floor is the newest one dropped
+    assert feed._floor == (100, 2)
+    assert feed._keys == [(100, 3), (100, 4), (100, 5)]
+    assert player_ids(old) == [1, 2, 3, 4, 5] and old_key == (100, 5)
+    assert player_ids(recent) == [3, 4, 5] and recent_key == (100, 5)
+    assert feed.stats["database_reads"] == 1 and feed.stats["buffer_reads"] == 1
+
+def test_poll_reads_every_batch(table, monkeypatch):
+    monkeypatch.setattr(portal_feed, "FEED_BATCH_SIZE", 2)
+    feed = PortalChangeFeed(interval=1, buffer_size=10)
+
+    async def scenario():
+        await feed.poll()
+        table.commit(5)
+        await feed.poll()
+
+    asyncio.run(scenario())
+    assert feed.stats["changes"] == 5
+    assert feed._head == (100, 5)
+
+def test_wait_wakes_on_new_changes_and_times_out_without(table):
+    feed = PortalChangeFeed(interval=1, buffer_size=10)
+
+    async def scenario():
+        await feed.poll()
+        key = await feed.head()
+        idle = await feed.wait(key, timeout=0.01)
+
+        waiter = asyncio.create_task(feed.wait(key, timeout=5))
+        await asyncio.sleep(0)
+        table.commit(1)
+        await feed.poll()
+        woken = await waiter
+        # Already behind the head: no wait at all
+        behind = await feed.wait(key, timeout=0)
+        return idle, woken, behind
+
+    assert asyncio.run(scenario()) == (False, True, True)
+
+def test_cursor_below_the_floor_with_nothing_after_it_moves_to_the_floor(table):
+    # Cursor handed out by another worker, before this one's first poll
+    table.head = (105, 0)
+    feed = PortalChangeFeed(interval=1, buffer_size=10)
+
+    async def scenario():
+        await feed.poll()
+        queries = table.queries
+        key, passes = (100, 0), 0
+        # What the SSE loop does when there is nothing to send
+        while passes < 100:
+            changes, key = await feed.changes_since(key, 10)
+            passes += 1
+            if not changes and not await feed.wait(key, timeout=0.01):
+                break
+        return key, passes, table.queries - queries
+
+    key, passes, queries = asyncio.run(scenario())
+    assert key == (105, 0)
+    assert passes == 1 and queries == 1
@@ -0,0 +1,101 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from services.portal_snapshot import PortalColumns
+
+SPORTS = ["football", "basketball", "baseball"]
+POSITIONS = ["QB", "WR", "PG", "SS", None]
+SCHOOLS = ["Ohio State", "Ohio University", "Texas", "Texas Tech", None]
+
+
+def make_players(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": player_id,
+            "name": f"Player {player_id}",
+            "sport": rng.choice(SPORTS),
+            "position": rng.choice(POSITIONS),
+            "current_school": rng.choice(SCHOOLS),
+            "stars": rng.choice([None, 1, 2, 3, 4, 5]),
+            # Few distinct values, so ties fall through to the next key column
+            "nil_value": rng.choice([None, Decimal("0"), Decimal("5000.00"), Decimal("25000.50")]),
+        }
+        for player_id in rng.sample(range(1, 10000), count)
+    ]
+
+def sort_key(player):
+    return (player["stars"] or 0, player["nil_value"] or 0, player["id"])
+
+def reference(players, sport=None, position=None, school=None, min_rating=None):
+    """What the SQL listing returns, in order"""
+    return [
+        player for player in sorted(players, key=sort_key, reverse=True)
+        if (not sport or player["sport"] == sport)
+        and (not position or player["position"] == position)
+        and (not school or school in (player["current_school"] or ""))
+        and (not min_rating or (player["stars"] or 0) >= min_rating)
+    ]
+
+def ids(players):
+    return [player["id"] for player in players]
+
+
+FILTERS = [
+    {},
+    {"sport": "football"},
+    {"sport": "football", "position": "QB"},
+    {"school": "Ohio"},
+    {"school": "Tech", "min_rating": 3},
+    {"sport": "baseball", "school": "Texas", "min_rating": 2},
+]
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_select_matches_sql_listing(filters):
+    players = make_players(300)
+    columns = PortalColumns(players)
+    expected = reference(players, **filters)
+
+    page = columns.select(filters.get("sport"), filters.get("position"), filters.get("school"),
+                          filters.get("min_rating"), None, limit=20, offset=10)
+    assert ids(page) == ids(expected[10:30])
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_keyset_pages_walk_the_whole_listing(filters):
+    players = make_players(300)
+    columns = PortalColumns(players)
+
+    seen, key = [], None
+    while True:
+        page = columns.select(filters.get("sport"), filters.get("position"), filters.get("school"),
+                              filters.get("min_rating"), key, limit=7, offset=0)
+        seen.extend(page)
+        if len(page) < 7:
+            break
+        last = page[-1]
+        # As decoded from the router's cursor
+        key = (last["stars"] or 0, Decimal(last["nil_value"] or 0), last["id"])
+
+    assert ids(seen) == ids(reference(players, **filters))
+
+def test_unknown_values_match_nothing():
+    columns = PortalColumns(make_players(50))
+    assert columns.select("curling", None, None, None, None, 20, 0) == []
+    assert columns.select(None, "goalie", None, None, None, 20, 0) == []
+    assert columns.select(None, None, "Nowhere", None, None, 20, 0) == []
+
+def test_counts_per_sport_and_position():
+    players = make_players(120)
+    counts = PortalColumns(players).counts()
+
+    assert counts["total"] == 120
+    for sport in SPORTS:
+        assert counts["sport"][sport] == sum(1 for player in players if player["sport"] == sport)
+    assert counts["position"][None] == sum(1 for player in players if player["position"] is None)
+
+def test_empty_portal():
+    columns = PortalColumns([])
+    assert columns.select("football", None, "Ohio", 3, None, 20, 0) == []
+    assert columns.counts()["total"] == 0
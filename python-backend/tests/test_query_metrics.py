@@ -0,0 +1,33 @@
+import pytest
+
+from query_metrics import fingerprint, normalize_query, normalize_route
+
+
+@pytest.mark.parametrize("query, normalized", [
+    ("SELECT * FROM users WHERE id = 42", "SELECT * FROM users WHERE id = ?"),
+    ("SELECT * FROM users WHERE email = 'a@b.com'", "SELECT * FROM users WHERE email = ?"),
+    ("SELECT * FROM users WHERE name = 'O''Brien'", "SELECT * FROM users WHERE name = ?"),
+    ("SELECT * FROM posts WHERE id = %s LIMIT %s", "SELECT * FROM posts WHERE id = ? LIMIT ?"),
+    ("SELECT * FROM posts WHERE id = $1", "SELECT * FROM posts WHERE id = ?"),
+    ("SELECT gpa FROM athlete_profiles WHERE gpa > 3.5", "SELECT gpa FROM athlete_profiles WHERE gpa > ?"),
+    ("SELECT * FROM users WHERE id IN (1, 2, 3)", "SELECT * FROM users WHERE id IN (?, ...)"),
+    ("INSERT INTO t (a, b) VALUES (%s, %s)", "INSERT INTO t (a, b) VALUES (?, ...)"),
+    ("SELECT id\n    FROM   users\n\tWHERE id = 1  ", "SELECT id FROM users WHERE id = ?"),
+])
+def test_normalize_query(query, normalized):
+    assert normalize_query(query) == normalized
+
+def test_identifiers_with_digits_are_kept():
+    assert normalize_query("SELECT col1 FROM table2 WHERE x = 3") == "SELECT col1 FROM table2 WHERE x = ?"
+
+def test_equivalent_statements_share_a_fingerprint():
+    first = normalize_query("SELECT * FROM users WHERE id IN (1, 2)")
+    second = normalize_query("SELECT *  FROM users WHERE id IN (7, 8, 9, 10)")
+    assert first == second
+    assert fingerprint(first) == fingerprint(second)
+    assert fingerprint(first) != fingerprint(normalize_query("SELECT * FROM posts WHERE id IN (1, 2)"))
+
+def test_normalize_route():
+    assert normalize_route("/api/athlete/profile/42") == "/api/athlete/profile/{id}"
+    assert normalize_route("/api/messages/conversation/7/read") == "/api/messages/conversation/{id}/read"
+    assert normalize_route("/api/feed/list") == "/api/feed/list"
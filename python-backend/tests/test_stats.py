@@ -0,0 +1,54 @@
+import asyncio
+from collections import Counter
+
+from services import stats
+from services.stats import GroupedCounts, count_rows, grouping_ids
+from conftest import FakeDatabase
+
+
+def test_grouping_ids_one_bit_per_left_out_dimension():
+    assert grouping_ids(("sport",)) == (1, {0: "sport"})
+    assert grouping_ids(("role", "sport")) == (3, {1: "role", 2: "sport"})
+    assert grouping_ids(("a", "b", "c")) == (7, {3: "a", 5: "b", 6: "c"})
+
+def test_load_maps_grouping_rows_to_dimensions(monkeypatch):
+    rows = [
+        {"role": None, "sport": None, "grouping_id": 3, "count": 10},
+        {"role": "athlete", "sport": None, "grouping_id": 1, "count": 7},
+        {"role": "coach", "sport": None, "grouping_id": 1, "count": 3},
+        {"role": None, "sport": "football", "grouping_id": 2, "count": 6},
+        # Rows whose sport is NULL, not the rollup
+        {"role": None, "sport": None, "grouping_id": 2, "count": 4},
+    ]
+    db = FakeDatabase(lambda query, params: rows)
+    monkeypatch.setattr(stats, "get_async_db_connection", db.connection)
+    counts = GroupedCounts("waitlist", ("role", "sport"))
+
+    result = asyncio.run(counts.get())
+    assert result == {
+        "total": 10,
+        "role": Counter({"athlete": 7, "coach": 3}),
+        "sport": Counter({"football": 6, None: 4}),
+    }
+    assert "GROUPING(role, sport)" in db.executed[0][0]
+
+def test_counts_are_shared_until_ttl_and_record_adds_rows(monkeypatch):
+    db = FakeDatabase(lambda query, params: [{"sport": None, "grouping_id": 1, "count": 0}])
+    monkeypatch.setattr(stats, "get_async_db_connection", db.connection)
+    counts = GroupedCounts("transfer_portal_players", ("sport",), ttl=60)
+
+    async def scenario():
+        await asyncio.gather(*(counts.get() for _ in range(5)))
+        counts.record(sport="football")
+        return await counts.get()
+
+    result = asyncio.run(scenario())
+    assert len(db.executed) == 1
+    assert result == {"total": 1, "sport": Counter({"football": 1})}
+
+def test_count_rows_orders_and_limits():
+    counts = Counter({"football": 5, "soccer": 9, None: 12, "golf": 0})
+    assert count_rows(counts, "sport", limit=2, skip_none=True) == [
+        {"sport": "soccer", "count": 9}, {"sport": "football", "count": 5}
+    ]
+    assert count_rows(counts, "sport")[0] == {"sport": None, "count": 12}